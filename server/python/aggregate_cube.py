@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Aggregate Cube - Agrégats précalculés par (championnat, équipe, groupe de poste, tranche d'âge)
+Construit une seule fois au chargement par groupby vectorisés, avec tous les niveaux de
+consolidation ('*'), puis servi depuis la mémoire par simple lecture de dictionnaire.
+Les cellules par équipe viennent des lignes par club; les autres (poste, championnat, âge)
+des lignes fusionnées de player_entities, pour compter une seule fois les joueurs transférés.
+"""
+
+import os
+import sys
+import json
+import re
+import pickle
+from itertools import combinations
+import pandas as pd
+
+from player_dataset import (
+    CACHE_DIR, resoudre_csv, empreinte_memorisee, groupes_postes, tranches_age,
+    normaliser_nom, motif_prefixes
+)
+from player_entities import obtenir_entites
+
+# Version des cellules (cache disque reconstruit si elle change)
+VERSION_CUBE = 2
+
+# Statistiques agrégées (sommes, moyennes, taux par 90 pondérés par les minutes, quantiles)
+STATS_CUBE = ['Gls', 'Ast', 'xG', 'xAG', 'npxG', 'PrgP', 'PrgC', 'PrgR', 'Sh', 'SoT',
+              'Cmp', 'Att', 'KP', 'Tkl', 'Int', 'CrdY', 'CrdR']
+QUANTILES = [0.25, 0.5, 0.75, 0.9]
+DIMENSIONS = ['Comp', 'Squad', 'groupe', 'tranche']
+TOUS = '*'
+
+# Identifiants de ligue soccerdata -> valeur de la colonne Comp du CSV
+CHAMPIONNATS_SOCCERDATA = {
+    'ENG-Premier League': 'eng Premier League',
+    'ESP-La Liga': 'es La Liga',
+    'ITA-Serie A': 'it Serie A',
+    'FRA-Ligue 1': 'fr Ligue 1',
+    'GER-Bundesliga': 'de Bundesliga',
+}
+
+# Minutes minimum pour entrer dans les distributions de quantiles par 90
+MIN_MINUTES_QUANTILES = 450
+
+
+def _table_travail(df, stats, comp=None):
+    """Dimensions, valeurs et taux par 90 de chaque ligne (comp: championnat imposé)"""
+    valeurs = df[stats + ['Min']].apply(pd.to_numeric, errors='coerce').fillna(0)
+    minutes = valeurs['Min'].where(valeurs['Min'] >= MIN_MINUTES_QUANTILES)
+    par_90 = valeurs[stats].div(minutes, axis=0).mul(90).add_prefix('p90_')
+
+    travail = pd.concat([
+        pd.DataFrame({
+            'Comp': pd.Series(comp, index=df.index) if comp is not None else df['Comp'],
+            'Squad': df['Squad'],
+            'groupe': groupes_postes(df['Pos']),
+            'tranche': tranches_age(pd.to_numeric(df['Age'], errors='coerce'))
+        }).fillna({'Comp': 'NA', 'Squad': 'NA'}),
+        valeurs,
+        par_90
+    ], axis=1)
+    travail['_un'] = 1
+    return travail, list(par_90.columns)
+
+
+def construire_cube(df, lignes=None, comp_lignes=None):
+    """Calcule toutes les cellules du cube (un groupby par ensemble de dimensions).
+
+    df: lignes par club (cellules par équipe); lignes: une ligne par joueur (autres
+    cellules), comp_lignes: championnat du club principal de chaque ligne. Sans lignes,
+    toutes les cellules viennent de df.
+    """
+    stats = [s for s in STATS_CUBE if s in df.columns]
+    par_club, colonnes_p90 = _table_travail(df, stats)
+    par_joueur = par_club if lignes is None else \
+        _table_travail(lignes.reset_index(drop=True), stats, comp_lignes)[0]
+
+    cellules = {}
+    for taille in range(len(DIMENSIONS) + 1):
+        for dims in combinations(DIMENSIONS, taille):
+            travail = par_club if 'Squad' in dims else par_joueur
+            mesures = _mesures_groupe(travail, list(dims), stats, colonnes_p90)
+            for cle_groupe, mesure in mesures.to_dict('index').items():
+                if not isinstance(cle_groupe, tuple):
+                    cle_groupe = (cle_groupe,)
+                valeurs_dims = dict(zip(dims, cle_groupe))
+                cle = tuple(valeurs_dims.get(d, TOUS) for d in DIMENSIONS)
+                cellules[cle] = {k: _nettoyer(v) for k, v in mesure.items()}
+    return cellules
+
+
+def _mesures_groupe(travail, dims, stats, colonnes_p90):
+    """Mesures d'un ensemble de regroupement sous forme de DataFrame indexé par les dimensions"""
+    if dims:
+        groupes = travail.groupby(dims, observed=True, sort=False)
+    else:
+        groupes = travail.assign(_tout=TOUS).groupby('_tout', sort=False)
+
+    sommes = groupes[stats + ['Min', '_un']].sum()
+    nb = sommes.pop('_un')
+
+    mesures = pd.DataFrame(index=sommes.index)
+    mesures['nb_joueurs'] = nb
+    mesures['minutes'] = sommes['Min']
+    for stat in stats:
+        mesures[f"somme_{stat}"] = sommes[stat]
+        mesures[f"moyenne_{stat}"] = sommes[stat] / nb
+        mesures[f"par_90_{stat}"] = sommes[stat].div(sommes['Min'].where(sommes['Min'] > 0)) * 90
+    if 'Cmp' in stats and 'Att' in stats:
+        mesures['passes_pct'] = sommes['Cmp'].div(sommes['Att'].where(sommes['Att'] > 0)) * 100
+
+    # Quantiles des taux par 90 (joueurs avec assez de minutes)
+    quantiles = groupes[colonnes_p90].quantile(QUANTILES).unstack(level=-1)
+    quantiles.columns = [f"q{int(q * 100)}_{col}" for col, q in quantiles.columns]
+    return mesures.join(quantiles)
+
+
+def _nettoyer(valeur):
+    """Convertit les valeurs NumPy en types Python (NaN -> None)"""
+    if pd.isna(valeur):
+        return None
+    return valeur.item() if hasattr(valeur, 'item') else valeur
+
+
+class CubeAgregats:
+    """Cube d'agrégats en mémoire: chaque consultation est une lecture de dictionnaire"""
+
+    def __init__(self, cellules, empreinte=None):
+        self.cellules = cellules
+        self.empreinte = empreinte
+        # Index des équipes: nom normalisé -> (championnat, équipe)
+        self.equipes = {
+            normaliser_nom(squad): (comp, squad)
+            for comp, squad, groupe, tranche in cellules
+            if comp != TOUS and squad != TOUS and groupe == TOUS and tranche == TOUS
+        }
+
+    def cellule(self, comp=TOUS, squad=TOUS, groupe=TOUS, tranche=TOUS):
+        """Retourne les mesures d'une cellule du cube, ou None"""
+        return self.cellules.get((comp, squad, groupe, tranche))
+
+    def trouver_equipe(self, nom, comp=None):
+        """Retrouve (championnat, équipe) à partir d'un nom exact ou partiel.
+
+        Nom normalisé exact d'abord; sinon chaque mot de la recherche doit commencer un mot
+        de l'équipe (ou l'équipe figurer en entier dans la recherche), et la correspondance
+        doit être unique: 'Real' est ambigu (Madrid, Sociedad) et retourne None.
+        """
+        nom = normaliser_nom(nom)
+        if not nom:
+            return None
+        candidats = {cle: equipe for cle, equipe in self.equipes.items()
+                     if comp is None or equipe[0] == comp}
+        if nom in candidats:
+            return candidats[nom]
+        motif = re.compile(motif_prefixes(nom))
+        mots = set(nom.split())
+        trouves = [equipe for cle, equipe in candidats.items()
+                   if motif.match(cle) or set(cle.split()) <= mots]
+        return trouves[0] if len(trouves) == 1 else None
+
+    def resume_equipe(self, comp, squad):
+        """Totaux d'une équipe et ventilation par groupe de poste"""
+        total = self.cellule(comp, squad)
+        if total is None:
+            return None
+        par_poste = {
+            groupe: cellule for (c, s, groupe, tranche), cellule in self.cellules.items()
+            if c == comp and s == squad and groupe != TOUS and tranche == TOUS
+        }
+        return {'championnat': comp, 'equipe': squad, 'totaux': total, 'par_poste': par_poste}
+
+    def position_dans_poste(self, groupe, stat, valeur_par_90, comp=TOUS):
+        """Situe un taux par 90 par rapport aux quantiles du poste (ex: 'Top 25%')"""
+        cellule = self.cellule(comp=comp, groupe=groupe)
+        if not cellule or valeur_par_90 is None:
+            return None
+        for q, libelle in [(90, 'Top 10%'), (75, 'Top 25%'), (50, 'Top 50%')]:
+            seuil = cellule.get(f"q{q}_p90_{stat}")
+            if seuil is not None and valeur_par_90 >= seuil:
+                return libelle
+        return 'Moitié inférieure'
+
+
+_CUBES = {}
+
+
+def obtenir_cube(csv_path=None, utiliser_cache_disque=True):
+    """Retourne le cube du CSV (mémoire du processus, puis cache disque, puis construction)"""
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_memorisee(csv_path)
+    if empreinte in _CUBES:
+        return _CUBES[empreinte]
+
+    chemin_cache = os.path.join(CACHE_DIR, f"cube_{empreinte}_v{VERSION_CUBE}.pkl")
+    cellules = None
+    if utiliser_cache_disque and os.path.exists(chemin_cache):
+        try:
+            with open(chemin_cache, 'rb') as f:
+                cellules = pickle.load(f)
+        except Exception:
+            cellules = None
+
+    if cellules is None:
+        entites = obtenir_entites(csv_path)
+        cellules = construire_cube(entites.par_club, entites.lignes,
+                                   entites.par_club['Comp'].to_numpy()[entites.principales()])
+        if utiliser_cache_disque:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{chemin_cache}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(cellules, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, chemin_cache)
+
+    cube = CubeAgregats(cellules, empreinte)
+    _CUBES[empreinte] = cube
+    return cube
+
+
+def obtenir_cube_disponible(csv_path=None):
+    """Comme obtenir_cube, mais retourne None si le CSV local est absent"""
+    try:
+        return obtenir_cube(csv_path)
+    except (FileNotFoundError, KeyError):
+        return None
+
+
+def main():
+    """Point d'entrée: build [csv_path] | get '<json>'"""
+    if len(sys.argv) < 2:
+        print("Usage: python aggregate_cube.py <build|get> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "build":
+        cube = obtenir_cube(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(json.dumps({"success": True, "empreinte": cube.empreinte,
+                          "nb_cellules": len(cube.cellules)}))
+
+    elif action == "get":
+        params = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+        cube = obtenir_cube(params.get('csv_path'))
+        cellule = cube.cellule(*(params.get(d, TOUS) for d in DIMENSIONS))
+        print(json.dumps({"success": cellule is not None, "cellule": cellule}, ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
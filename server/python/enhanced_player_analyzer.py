@@ -13,27 +13,89 @@ import matplotlib.patches as mpatches
 import json
 import sys
 import os
+import hashlib
+import contextlib
 from datetime import datetime
+from shared_feature_store import SharedFeatureStore
+from sqlite_backend import SQLiteBackend
+from playing_style_clusters import obtenir_styles
+from tag_index import obtenir_index_tags
+from player_entities import obtenir_entites, cle_entite
+from similarity_index import obtenir_index, saison_depuis_nom, NPROBE_DEFAUT
+from profile_store import lire_profil, ouvrir_store, filtrer_sections
+from response_version import (
+    version_reponse, version_profil, non_modifie, avec_version, injecter_version, extraire_option
+)
 import warnings
 warnings.filterwarnings('ignore')
 
+# Actions dont la réponse ne dépend que des données et des arguments (versionnées)
+ACTIONS_VERSIONNEES = {"search_player", "generate_heatmap", "query_tags"}
+
+# Profils complets servis par le store précalculé (PROFILE_STORE=0 pour désactiver)
+USE_PROFILE_STORE = os.environ.get('PROFILE_STORE', '1') != '0'
+
 # Configuration matplotlib pour les graphiques
 plt.style.use('default')
 sns.set_palette("husl")
 
+# Sections du profil complet, dans l'ordre de sortie
+PROFILE_SECTIONS = [
+    "informations_personnelles",
+    "statistiques_base",
+    "statistiques_avancees",
+    "analyse_performance",
+    "percentiles",
+    "zones_activite",
+    "note_globale",
+    "style_jeu",
+    "forces",
+    "faiblesses"
+]
+
+def resolve_sections(sections=None):
+    """Liste ordonnée des sections demandées ("a,b" ou liste); toutes si aucune"""
+    if not sections:
+        return PROFILE_SECTIONS
+    if isinstance(sections, str):
+        sections = sections.split(',')
+    requested = {s.strip() for s in sections if s.strip()}
+    unknown = requested - set(PROFILE_SECTIONS)
+    if unknown:
+        raise ValueError(f"Sections inconnues: {', '.join(sorted(unknown))} "
+                         f"(disponibles: {', '.join(PROFILE_SECTIONS)})")
+    return [s for s in PROFILE_SECTIONS if s in requested]
+
 class EnhancedPlayerAnalyzer:
-    def __init__(self, csv_path=None):
+    def __init__(self, csv_path=None, feature_store=None):
         """Initialise l'analyseur avec le fichier CSV des joueurs"""  
         self.csv_path = csv_path or "players_data-2024_2025_1751387048911.csv"
         self.df = None
         self.current_player = None
+        self.feature_store = feature_store
+        self.entites = None
+        self.styles = None
+        self.tags = None
         self.load_data()
     
     def load_data(self):
         """Charge et nettoie les données du CSV"""
+        # Store partagé publié par un processus chargeur: pas de copie privée du CSV
+        if self.feature_store is None and os.environ.get('PLAYER_FEATURE_STORE'):
+            self.feature_store = SharedFeatureStore.attacher()
+        # Base SQLite partagée: même interface (recherche indexée, percentiles par comptage)
+        if self.feature_store is None and os.environ.get('PLAYER_SQLITE_DB'):
+            self.feature_store = SQLiteBackend.ouvrir(os.environ['PLAYER_SQLITE_DB'])
+        if self.feature_store is not None:
+            self.df = pd.DataFrame()
+            print(f"✓ Store partagé attaché: {len(self.feature_store)} joueurs (v{self.feature_store.version})")
+            return
+        
         try:
             if os.path.exists(self.csv_path):
                 self.df = pd.read_csv(self.csv_path)
+                # Joueurs à plusieurs clubs: une ligne de saison fusionnée par entité
+                self.entites = obtenir_entites(self.csv_path, self.df)
                 print(f"✓ Données chargées: {len(self.df)} joueurs")
             else:
                 print(f"⚠ Fichier CSV non trouvé: {self.csv_path}")
@@ -42,37 +104,57 @@ class EnhancedPlayerAnalyzer:
             print(f"❌ Erreur lors du chargement: {e}")
             self.df = pd.DataFrame()
     
-    def search_player(self, player_name, team=None):
-        """Recherche un joueur par nom et équipe optionnelle"""
-        if self.df.empty:
+    def search_player(self, player_name, team=None, combined=None):
+        """Recherche un joueur par nom et équipe optionnelle (saison fusionnée si pas d'équipe)"""
+        if self.feature_store is not None:
+            if self.feature_store.est_perime():
+                self.feature_store.rafraichir()
+            return self.feature_store.search_player(player_name, team, combined)
+        
+        if self.entites is None:
             return None
         
-        # Recherche flexible par nom
-        mask = self.df['Player'].str.contains(player_name, case=False, na=False)
-        
-        if team:
-            mask &= self.df['Squad'].str.contains(team, case=False, na=False)
-        
-        results = self.df[mask]
-        
-        if len(results) == 0:
-            return None
-        elif len(results) == 1:
-            return results.iloc[0].to_dict()
-        else:
-            # Retourne le premier résultat si plusieurs matches
-            return results.iloc[0].to_dict()
+        return self.entites.rechercher(player_name, team, combined)
     
-    def get_player_complete_profile(self, player_name, team=None):
-        """Génère le profil complet d'un joueur"""
+    def get_player_complete_profile(self, player_name, team=None, sections=None):
+        """Génère le profil complet d'un joueur (ou seulement les sections demandées)"""
+        sections = resolve_sections(sections)
         player_data = self.search_player(player_name, team)
         if not player_data:
             return {"error": f"Joueur '{player_name}' non trouvé"}
         
+        return self.build_profile(player_data, sections=sections)
+    
+    def build_profile(self, player_data, percentiles=None, sections=None):
+        """Construit le profil à partir de la ligne du joueur (percentiles précalculables)"""
         self.current_player = player_data
         
-        # Informations personnelles
-        personal_info = {
+        # Chaque section n'est calculée qu'à la demande, une seule fois; les dépendances
+        # (ex: forces -> percentiles) sont résolues par les appels à compute()
+        builders = {
+            "informations_personnelles": lambda: self.personal_info(player_data),
+            "statistiques_base": lambda: self.base_stats(player_data),
+            "statistiques_avancees": lambda: self.advanced_stats(player_data),
+            "analyse_performance": lambda: self.analyze_performance(player_data),
+            "percentiles": lambda: percentiles if percentiles is not None else self.calculate_percentiles(player_data),
+            "zones_activite": lambda: self.generate_activity_zones(player_data),
+            "note_globale": lambda: self.calculate_overall_rating(compute("percentiles")),
+            "style_jeu": lambda: self.determine_playing_style(player_data),
+            "forces": lambda: self.identify_strengths(compute("percentiles")),
+            "faiblesses": lambda: self.identify_weaknesses(compute("percentiles"))
+        }
+        computed = {}
+        
+        def compute(section):
+            if section not in computed:
+                computed[section] = builders[section]()
+            return computed[section]
+        
+        return {section: compute(section) for section in resolve_sections(sections)}
+    
+    def personal_info(self, player_data):
+        """Informations personnelles"""
+        return {
             "nom": player_data['Player'],
             "age": int(player_data['Age']) if pd.notna(player_data['Age']) else None,
             "nationalite": player_data['Nation'],
@@ -81,9 +163,10 @@ class EnhancedPlayerAnalyzer:
             "championnat": player_data['Comp'],
             "annee_naissance": int(player_data['Born']) if pd.notna(player_data['Born']) else None
         }
-        
-        # Statistiques de base
-        stats_base = {
+    
+    def base_stats(self, player_data):
+        """Statistiques de base"""
+        return {
             "matchs_joues": int(player_data['MP']) if pd.notna(player_data['MP']) else 0,
             "titularisations": int(player_data['Starts']) if pd.notna(player_data['Starts']) else 0,
             "minutes": int(player_data['Min']) if pd.notna(player_data['Min']) else 0,
@@ -92,9 +175,10 @@ class EnhancedPlayerAnalyzer:
             "cartons_jaunes": int(player_data['CrdY']) if pd.notna(player_data['CrdY']) else 0,
             "cartons_rouges": int(player_data['CrdR']) if pd.notna(player_data['CrdR']) else 0
         }
-        
-        # Statistiques avancées
-        stats_avancees = {
+    
+    def advanced_stats(self, player_data):
+        """Statistiques avancées"""
+        return {
             "xG": float(player_data['xG']) if pd.notna(player_data['xG']) else 0.0,
             "xA": float(player_data['xAG']) if pd.notna(player_data['xAG']) else 0.0,
             "npxG": float(player_data['npxG']) if pd.notna(player_data['npxG']) else 0.0,
@@ -102,28 +186,6 @@ class EnhancedPlayerAnalyzer:
             "courses_progressives": int(player_data['PrgC']) if pd.notna(player_data['PrgC']) else 0,
             "receptions_progressives": int(player_data['PrgR']) if pd.notna(player_data['PrgR']) else 0
         }
-        
-        # Analyse des performances
-        performance_analysis = self.analyze_performance(player_data)
-        
-        # Comparaison percentile
-        percentiles = self.calculate_percentiles(player_data)
-        
-        # Zones d'activité simulées
-        activity_zones = self.generate_activity_zones(player_data)
-        
-        return {
-            "informations_personnelles": personal_info,
-            "statistiques_base": stats_base,
-            "statistiques_avancees": stats_avancees,
-            "analyse_performance": performance_analysis,
-            "percentiles": percentiles,
-            "zones_activite": activity_zones,
-            "note_globale": self.calculate_overall_rating(percentiles),
-            "style_jeu": self.determine_playing_style(player_data),
-            "forces": self.identify_strengths(percentiles),
-            "faiblesses": self.identify_weaknesses(percentiles)
-        }
     
     def analyze_performance(self, player_data):
         """Analyse détaillée des performances"""
@@ -151,14 +213,24 @@ class EnhancedPlayerAnalyzer:
     
     def calculate_percentiles(self, player_data):
         """Calcule les percentiles par rapport aux joueurs du même poste"""
-        if self.df.empty:
+        position = player_data['Pos']
+        
+        if self.feature_store is not None:
+            return {
+                stat: round(self.feature_store.percentile(position, stat, float(player_data[stat])), 1)
+                for stat in self.feature_store.index_stats
+                if stat in player_data and pd.notna(player_data[stat])
+            }
+        
+        if self.entites is None:
             return {}
         
-        position = player_data['Pos']
-        same_position = self.df[self.df['Pos'] == position]
+        # Un joueur = une ligne (saison fusionnée pour les joueurs à plusieurs clubs)
+        players = self.entites.lignes
+        same_position = players[players['Pos'] == position]
         
         if len(same_position) < 5:
-            same_position = self.df  # Utilise tous les joueurs si pas assez du même poste
+            same_position = players  # Utilise tous les joueurs si pas assez du même poste
         
         percentiles = {}
         stats_to_compare = ['Gls', 'Ast', 'xG', 'xAG', 'PrgP', 'PrgC', 'PrgR']
@@ -204,6 +276,16 @@ class EnhancedPlayerAnalyzer:
     
     def determine_playing_style(self, player_data):
         """Détermine le style de jeu du joueur"""
+        # Style issu des clusters (étiquetage de tous les joueurs en une passe, puis O(1))
+        if self.styles is None:
+            try:
+                self.styles = obtenir_styles(self.csv_path, None if self.df.empty else self.df)
+            except Exception:
+                self.styles = {}
+        style = self.styles.get((player_data['Player'], player_data['Squad']))
+        if style:
+            return style['style']
+        
         position = player_data['Pos']
         
         styles = {
@@ -267,6 +349,28 @@ class EnhancedPlayerAnalyzer:
         
         return weaknesses if weaknesses else ["Pas de faiblesse majeure"]
     
+    def query_tags(self, expression, position=None, limit=20):
+        """Recherche les joueurs par forces/faiblesses (ex: "force:PrgP AND force:PrgC")"""
+        if self.tags is None:
+            self.tags = obtenir_index_tags(self.csv_path, None if self.df.empty else self.df)
+        return self.tags.requete(expression, position, limit)
+    
+    def similar_players(self, player_name, team=None, k=10, nprobe=NPROBE_DEFAUT):
+        """Joueurs-saisons au profil par 90 le plus proche (index IVF, toutes saisons indexées)"""
+        # L'index contient les lignes fusionnées: la requête aussi, même avec une équipe
+        player_data = self.search_player(player_name, team, combined=True)
+        if player_data is None:
+            return {"error": f"Joueur '{player_name}' non trouvé"}
+        
+        index = obtenir_index(self.csv_path)
+        saison = player_data.get('Season') or saison_depuis_nom(self.csv_path)
+        vecteur = index.vectoriser(pd.DataFrame([dict(player_data)]))[0]
+        # Exclusion par entité: la ligne du joueur pour cette saison
+        cle = cle_entite(player_data['Player'], player_data.get('Born'), player_data.get('Nation'))
+        similaires = index.voisins(vecteur, k, nprobe, exclure=lambda j: (
+            str(j['saison']) == str(saison) and cle_entite(j['Player'], j.get('Born'), j.get('Nation')) == cle))
+        return {"joueur": player_data['Player'], "equipe": player_data['Squad'], "similaires": similaires}
+    
     def calculate_offensive_efficiency(self, player_data):
         """Calcule l'efficacité offensive"""
         goals = float(player_data['Gls'] or 0)
@@ -302,33 +406,120 @@ class EnhancedPlayerAnalyzer:
         """Génère des données de heatmap réalistes"""
         position = player_data['Pos']
         
+        # Aléa déterministe par joueur: même entrée, même heatmap (images cachables)
+        seed = int(hashlib.md5(f"{player_data['Player']}|{player_data['Squad']}".encode()).hexdigest(), 16) % (2 ** 32)
+        rng = np.random.default_rng(seed)
+        
         # Grille 10x10 représentant le terrain
         heatmap = np.zeros((10, 10))
         
         # Remplissage basé sur la position
         if 'DF' in position:
             # Défenseurs : activité en zone défensive
-            heatmap[7:10, 3:7] = np.random.uniform(0.7, 1.0, (3, 4))
-            heatmap[5:7, 4:6] = np.random.uniform(0.3, 0.6, (2, 2))
+            heatmap[7:10, 3:7] = rng.uniform(0.7, 1.0, (3, 4))
+            heatmap[5:7, 4:6] = rng.uniform(0.3, 0.6, (2, 2))
         elif 'MF' in position:
             # Milieux : activité au centre
-            heatmap[4:8, 3:7] = np.random.uniform(0.6, 1.0, (4, 4))
-            heatmap[2:4, 4:6] = np.random.uniform(0.3, 0.5, (2, 2))
-            heatmap[8:10, 4:6] = np.random.uniform(0.3, 0.5, (2, 2))
+            heatmap[4:8, 3:7] = rng.uniform(0.6, 1.0, (4, 4))
+            heatmap[2:4, 4:6] = rng.uniform(0.3, 0.5, (2, 2))
+            heatmap[8:10, 4:6] = rng.uniform(0.3, 0.5, (2, 2))
         elif 'FW' in position:
             # Attaquants : activité offensive
-            heatmap[0:4, 3:7] = np.random.uniform(0.7, 1.0, (4, 4))
-            heatmap[4:6, 4:6] = np.random.uniform(0.4, 0.6, (2, 2))
+            heatmap[0:4, 3:7] = rng.uniform(0.7, 1.0, (4, 4))
+            heatmap[4:6, 4:6] = rng.uniform(0.4, 0.6, (2, 2))
         
         return heatmap.tolist()
 
+def profiles_batch(params):
+    """Profils de plusieurs joueurs (mêmes sections pour tous), un dictionnaire par joueur"""
+    sections = resolve_sections(params.get('sections'))
+    players = [
+        (p, None) if isinstance(p, str) else (p.get('nom'), p.get('equipe'))
+        for p in params.get('joueurs', [])
+    ]
+    
+    store = None
+    if USE_PROFILE_STORE:
+        try:
+            store = ouvrir_store()
+        except Exception as e:
+            print(f"Store de profils indisponible: {e}", file=sys.stderr)
+    analyzer = None
+    
+    for player_name, team in players:
+        if store is not None:
+            profile = store.lire(player_name, team)
+            profile = json.loads(filtrer_sections(profile, sections)) if profile is not None else None
+        else:
+            if analyzer is None:
+                # L'analyseur affiche sa progression sur stdout, réservé au JSONL
+                with contextlib.redirect_stdout(sys.stderr):
+                    analyzer = EnhancedPlayerAnalyzer()
+            profile = analyzer.get_player_complete_profile(player_name, team, sections)
+            if "error" in profile:
+                profile = None
+        
+        if profile is None:
+            yield {"nom": player_name, "equipe": team, "error": f"Joueur '{player_name}' non trouvé"}
+        else:
+            yield {"nom": player_name, "equipe": team, "profil": profile}
+    
+    if store is not None:
+        store.close()
+
 def main():
     """Point d'entrée principal"""
+    # Option --sections=a,b: profil réduit aux sections demandées
+    sections = extraire_option(sys.argv, "sections")
+    # Option --if-none-match=<version>: "non modifié" sans calcul si la version n'a pas changé
+    if_none_match = extraire_option(sys.argv, "if-none-match")
+    
     if len(sys.argv) < 2:
-        print("Usage: python enhanced_player_analyzer.py <action> [params...]")
+        print("Usage: python enhanced_player_analyzer.py <action> [params...] [--sections=a,b] [--if-none-match=v]")
         sys.exit(1)
     
     action = sys.argv[1]
+    
+    try:
+        resolve_sections(sections)
+    except ValueError as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    
+    # Version de la réponse (instantané des données + paramètres)
+    version = None
+    if action == "get_complete_profile" and len(sys.argv) >= 3:
+        version = version_profil(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None, sections)
+    elif action in ACTIONS_VERSIONNEES:
+        version = version_reponse(action, sys.argv[2:])
+    if version is not None and if_none_match == version:
+        print(json.dumps(non_modifie(version)))
+        return
+    
+    # Profil complet: une lecture indexée dans le store, sans charger le CSV
+    if action == "get_complete_profile" and len(sys.argv) >= 3 and USE_PROFILE_STORE:
+        player_name = sys.argv[2]
+        try:
+            profile = lire_profil(player_name, sys.argv[3] if len(sys.argv) > 3 else None, sections=sections)
+        except Exception as e:
+            print(f"Store de profils indisponible: {e}", file=sys.stderr)
+        else:
+            print(injecter_version(profile, version) if profile is not None else
+                  json.dumps({"error": f"Joueur '{player_name}' non trouvé"}, ensure_ascii=False, indent=2))
+            return
+    
+    # Lot: une ligne JSON par joueur (JSONL), sans charger le CSV si le store est disponible
+    if action == "get_profiles_batch":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Paramètres JSON requis"}))
+            sys.exit(1)
+        params = json.loads(sys.argv[2])
+        if sections:
+            params['sections'] = sections
+        for line in profiles_batch(params):
+            print(json.dumps(line, ensure_ascii=False), flush=True)
+        return
+    
     analyzer = EnhancedPlayerAnalyzer()
     
     if action == "search_player":
@@ -341,7 +532,7 @@ def main():
         
         result = analyzer.search_player(player_name, team)
         if result:
-            print(json.dumps({"found": True, "player": result}))
+            print(json.dumps(avec_version({"found": True, "player": result}, version)))
         else:
             print(json.dumps({"found": False, "message": f"Joueur '{player_name}' non trouvé"}))
     
@@ -353,8 +544,8 @@ def main():
         player_name = sys.argv[2]
         team = sys.argv[3] if len(sys.argv) > 3 else None
         
-        profile = analyzer.get_player_complete_profile(player_name, team)
-        print(json.dumps(profile, ensure_ascii=False, indent=2))
+        profile = analyzer.get_player_complete_profile(player_name, team, sections)
+        print(json.dumps(avec_version(profile, version), ensure_ascii=False, indent=2))
     
     elif action == "generate_heatmap":
         if len(sys.argv) < 3:
@@ -366,10 +557,36 @@ def main():
         
         if player_data:
             heatmap_data = analyzer.generate_heatmap_data(player_data)
-            print(json.dumps({"heatmap": heatmap_data}))
+            print(json.dumps(avec_version({"heatmap": heatmap_data}, version)))
         else:
             print(json.dumps({"error": "Joueur non trouvé"}))
     
+    elif action == "query_tags":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Expression de tags requise"}))
+            sys.exit(1)
+        
+        expression = sys.argv[2]
+        position = sys.argv[3] if len(sys.argv) > 3 else None
+        limit = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+        
+        try:
+            print(json.dumps(avec_version(analyzer.query_tags(expression, position, limit), version),
+                             ensure_ascii=False))
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+    
+    elif action == "similar_players":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom du joueur requis"}))
+            sys.exit(1)
+        
+        player_name = sys.argv[2]
+        team = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
+        k = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+        
+        print(json.dumps(analyzer.similar_players(player_name, team, k), ensure_ascii=False))
+    
     else:
         print(json.dumps({"error": f"Action '{action}' non reconnue"}))
 
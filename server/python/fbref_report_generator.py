@@ -8,20 +8,37 @@ import numpy as np
 from datetime import datetime
 import os
 import time
+import hashlib
 import requests
-from bs4 import BeautifulSoup
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fbref_table_parser import extraire_tables, ids_tables
+from aggregate_cube import obtenir_cube_disponible
+from player_dataset import groupe_poste
+from report_data_resolver import ResolveurDonnees
+from playing_style_clusters import obtenir_styles
+from upstream_guard import garde, url_fbref, configurer_soccerdata, est_erreur_limitation, LimitationAmont
+from response_version import version_reponse, non_modifie, avec_version
 import warnings
 warnings.filterwarnings('ignore')
 
 try:
     import soccerdata as sd
+    configurer_soccerdata(sd)
     SOCCERDATA_AVAILABLE = True
 except ImportError:
     SOCCERDATA_AVAILABLE = False
     print("soccerdata not available, using fallback data")
 
+# Actions versionnées quand le joueur est servi par le CSV local: la réponse ne dépend alors
+# que du CSV et des paramètres (cache disque et réseau hors de l'instantané, non versionnés)
+ACTIONS_VERSIONNEES = {'generer_rapport_complet'}
+
 def rate_limited_request(url, delay=5, max_retries=3):
     """Faire une requête avec gestion du rate limiting"""
+    url = url_fbref(url)
+    # Dernier échec dû à une limitation (429 / timeout): compté par le disjoncteur
+    limitation = None
     for attempt in range(max_retries):
         try:
             print(f"Request attempt {attempt + 1}: {url}")
@@ -37,6 +54,7 @@ def rate_limited_request(url, delay=5, max_retries=3):
             response = requests.get(url, headers=headers, timeout=20)
             
             if response.status_code == 429:
+                limitation = "HTTP 429 Too Many Requests"
                 wait_time = delay * (attempt + 1) * 2  # Augmenter le délai exponentiellement
                 print(f"Rate limited (429), waiting {wait_time} seconds...")
                 time.sleep(wait_time)
@@ -44,9 +62,11 @@ def rate_limited_request(url, delay=5, max_retries=3):
             elif response.status_code == 200:
                 return response
             else:
+                limitation = None
                 print(f"HTTP {response.status_code}: {response.reason}")
                 
         except Exception as e:
+            limitation = str(e) if est_erreur_limitation(e) else None
             print(f"Request failed: {str(e)}")
             
         if attempt < max_retries - 1:
@@ -54,8 +74,91 @@ def rate_limited_request(url, delay=5, max_retries=3):
             print(f"Waiting {wait_time} seconds before retry...")
             time.sleep(wait_time)
     
+    if limitation:
+        raise LimitationAmont(f"All {max_retries} attempts failed for {url} ({limitation})")
     raise Exception(f"All {max_retries} attempts failed for {url}")
 
+def donnees_joueur_par_defaut(nom_joueur, equipe):
+    """Données par défaut pour éviter les erreurs"""
+    return {
+        'player': nom_joueur,
+        'squad': equipe or 'Unknown Team',
+        'age': 25,
+        'position': 'MF',
+        'minutes': 1800,
+        'goals': 5,
+        'assists': 3,
+        'shots': 45,
+        'shots_on_target': 18,
+        'passes': 1200,
+        'passes_completed': 1020,
+        'passes_pct': 85.0,
+        'key_passes': 24,
+        'xa': 2.8,
+        'xg': 4.2,
+        'tackles': 32,
+        'interceptions': 28,
+        'fouls': 15,
+        'cards_yellow': 2,
+        'cards_red': 0
+    }
+
+def charger_table_saison(saison):
+    """Récupérer la table des joueurs Big 5 de la saison via soccerdata"""
+    print("Attempting to fetch real data with soccerdata...")
+    
+    def recuperer():
+        # Délai avant la requête pour éviter 429
+        time.sleep(3)
+        
+        fb = sd.FBref(leagues=["Big 5 European Leagues"], seasons=[saison])
+        
+        # Délai supplémentaire
+        time.sleep(2)
+        
+        return fb.read_player_season_stats()
+    
+    # Appels concurrents coalescés; disjoncteur ouvert => dernière table connue (périmée)
+    joueurs, meta = garde('fbref').obtenir(
+        ("Big 5 European Leagues", saison, 'player_season_stats'), recuperer
+    )
+    if 'player' not in joueurs.columns:
+        joueurs = joueurs.reset_index()
+    joueurs.attrs['stale'] = meta['stale']
+    return joueurs
+
+def preparer_donnees_joueur(nom_joueur, equipe, ligne_reelle):
+    """Fusionner la ligne réelle (si trouvée) avec les données par défaut"""
+    joueur_data = donnees_joueur_par_defaut(nom_joueur, equipe)
+    
+    if ligne_reelle is None:
+        print(f"No real data found for {nom_joueur}, using enhanced simulation")
+        return enhance_simulated_data(joueur_data, nom_joueur, equipe)
+    
+    print(f"✓ Found real data for {nom_joueur}")
+    
+    # Mettre à jour avec les vraies données
+    for key in joueur_data.keys():
+        if key in ligne_reelle and pd.notna(ligne_reelle[key]):
+            joueur_data[key] = clean_value(ligne_reelle[key])
+    return joueur_data
+
+_RESOLVEUR = None
+
+def obtenir_resolveur():
+    """Résolveur de données partagé par le processus (cache mémoire compris)"""
+    global _RESOLVEUR
+    if _RESOLVEUR is None:
+        _RESOLVEUR = ResolveurDonnees(
+            charger_reseau=charger_table_saison if SOCCERDATA_AVAILABLE else None
+        )
+    return _RESOLVEUR
+
+def joueur_dans_csv(params):
+    """Vrai si le joueur est servi par le CSV local (seule source couverte par la version)"""
+    return obtenir_resolveur().ligne_csv(
+        params.get('nom_joueur', ''), params.get('equipe', ''), params.get('saison', 2024)) is not None
+
 def generer_rapport_joueur_complet(params):
     """Générer un rapport complet pour un joueur avec gestion des erreurs 429"""
     try:
@@ -65,129 +168,167 @@ def generer_rapport_joueur_complet(params):
         
         print(f"Generating complete report for: {nom_joueur}")
         
-        # Données par défaut pour éviter les erreurs
-        joueur_data = {
-            'player': nom_joueur,
-            'squad': equipe or 'Unknown Team',
-            'age': 25,
-            'position': 'MF',
-            'minutes': 1800,
-            'goals': 5,
-            'assists': 3,
-            'shots': 45,
-            'shots_on_target': 18,
-            'passes': 1200,
-            'passes_completed': 1020,
-            'passes_pct': 85.0,
-            'key_passes': 24,
-            'xa': 2.8,
-            'xg': 4.2,
-            'tackles': 32,
-            'interceptions': 28,
-            'fouls': 15,
-            'cards_yellow': 2,
-            'cards_red': 0
-        }
+        # Cache mémoire, CSV local, cache disque puis réseau (soccerdata)
+        ligne_reelle, source = obtenir_resolveur().resoudre(nom_joueur, equipe, saison)
+        joueur_data = preparer_donnees_joueur(nom_joueur, equipe, ligne_reelle)
         
-        # Essayer d'obtenir des données réelles avec soccerdata si disponible
-        if SOCCERDATA_AVAILABLE:
-            try:
-                print("Attempting to fetch real data with soccerdata...")
-                
-                # Délai avant la requête pour éviter 429
-                time.sleep(3)
-                
-                fb = sd.FBref(leagues=["Big 5 European Leagues"], seasons=[saison])
-                
-                # Délai supplémentaire
-                time.sleep(2)
-                
-                joueurs = fb.read_player_season_stats()
-                
-                # Recherche du joueur
-                joueur_trouve = joueurs[
-                    joueurs['player'].str.contains(nom_joueur, case=False, na=False)
-                ]
-                
-                if equipe:
-                    joueur_trouve = joueur_trouve[
-                        joueur_trouve['team'].str.contains(equipe, case=False, na=False)
-                    ]
-                
-                if len(joueur_trouve) > 0:
-                    joueur_real = joueur_trouve.iloc[0]
-                    print(f"✓ Found real data for {nom_joueur}")
-                    
-                    # Mettre à jour avec les vraies données
-                    for key in joueur_data.keys():
-                        if key in joueur_real.index and pd.notna(joueur_real[key]):
-                            joueur_data[key] = clean_value(joueur_real[key])
-                else:
-                    print(f"No real data found for {nom_joueur}, using enhanced simulation")
-                    joueur_data = enhance_simulated_data(joueur_data, nom_joueur, equipe)
-                    
-            except Exception as e:
-                print(f"Soccerdata failed: {str(e)}, using enhanced simulation")
-                joueur_data = enhance_simulated_data(joueur_data, nom_joueur, equipe)
-        else:
-            print("Using enhanced simulation (soccerdata not available)")
-            joueur_data = enhance_simulated_data(joueur_data, nom_joueur, equipe)
+        rapport = construire_rapport(joueur_data)
+        rapport['source_donnees'] = source or 'simulation'
+        return rapport
         
-        # Calculer les statistiques avancées
-        stats_avancees = calculer_stats_avancees(joueur_data)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f"Error generating complete report: {str(e)}"
+        }
+
+def construire_rapport(joueur_data):
+    """Assembler le rapport complet (partie CPU: percentiles, analyse, heatmap...)"""
+    # Calculer les statistiques avancées
+    stats_avancees = calculer_stats_avancees(joueur_data)
+    
+    # Générer les percentiles
+    percentiles = generer_percentiles_realistes(joueur_data)
+    
+    # Analyser les forces et faiblesses
+    analyse = analyser_performance(joueur_data, percentiles)
+    
+    # Générer les zones d'activité
+    zones_activite = generer_zones_activite(joueur_data['position'])
+    
+    # Simuler l'historique des performances
+    historique = simuler_historique_performances(joueur_data)
+    
+    return {
+        'success': True,
+        'joueur': {
+            'nom': joueur_data['player'],
+            'equipe': joueur_data['squad'],
+            'age': joueur_data['age'],
+            'position': joueur_data['position'],
+            'minutes_jouees': joueur_data['minutes']
+        },
+        'statistiques_cles': {
+            'buts': joueur_data['goals'],
+            'passes_decidees': joueur_data['assists'],
+            'tirs': joueur_data['shots'],
+            'tirs_cadres': joueur_data['shots_on_target'],
+            'passes_reussies_pct': round(joueur_data['passes_pct'], 1),
+            'passes_cles': joueur_data['key_passes'],
+            'xa': round(joueur_data['xa'], 2),
+            'xg': round(joueur_data['xg'], 2),
+            'tacles': joueur_data['tackles'],
+            'interceptions': joueur_data['interceptions'],
+            'duels_gagnes': round(joueur_data['tackles'] * 1.5, 0)
+        },
+        'stats_avancees': stats_avancees,
+        'percentiles': percentiles,
+        'analyse': analyse,
+        'zones_activite': zones_activite,
+        'historique_performances': historique,
+        'heatmap_data': generer_heatmap_data(joueur_data['position']),
+        'comparaison_poste': generer_comparaison_poste(joueur_data),
+        'note_globale': calculer_note_globale(percentiles),
+        'tendances_recentes': generer_tendances(joueur_data),
+        'recommendations': generer_recommendations(analyse)
+    }
+
+def _construire_rapport_lot(tache):
+    """Worker du pool: construire le rapport d'un joueur en isolant ses erreurs"""
+    nom_joueur, equipe, ligne_reelle, source = tache
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            joueur_data = preparer_donnees_joueur(nom_joueur, equipe, ligne_reelle)
+            rapport = construire_rapport(joueur_data)
+        rapport['source_donnees'] = source or 'simulation'
+        rapport['requete'] = {'nom_joueur': nom_joueur, 'equipe': equipe}
+        return rapport
+    except Exception as e:
+        return {
+            'success': False,
+            'requete': {'nom_joueur': nom_joueur, 'equipe': equipe},
+            'error': f"Error generating complete report: {str(e)}"
+        }
+
+def generer_rapports_lot(params):
+    """Générer les rapports d'une liste de joueurs ou d'un effectif entier en JSON Lines"""
+    try:
+        saison = params.get('saison', 2024)
+        equipe_lot = params.get('equipe', '')
+        processus = int(params.get('processus') or os.cpu_count() or 1)
+        sortie = params.get('sortie') or os.path.join(
+            'reports', f"rapports_{saison}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
         
-        # Générer les percentiles
-        percentiles = generer_percentiles_realistes(joueur_data)
+        # Normaliser la liste des joueurs: noms simples ou {nom_joueur, equipe}
+        demandes = []
+        for joueur in params.get('joueurs', []):
+            if isinstance(joueur, dict):
+                demandes.append((joueur.get('nom_joueur', ''), joueur.get('equipe', equipe_lot)))
+            else:
+                demandes.append((joueur, equipe_lot))
         
-        # Analyser les forces et faiblesses
-        analyse = analyser_performance(joueur_data, percentiles)
+        # Résolution dans le processus parent: la table de saison n'est chargée qu'une fois
+        resolveur = obtenir_resolveur()
+        taches = []
+        with contextlib.redirect_stdout(sys.stderr):
+            if not demandes:
+                if not equipe_lot:
+                    return {'success': False, 'error': "Liste 'joueurs' ou effectif 'equipe' requis"}
+                demandes = [(nom, equipe_lot) for nom in resolveur.effectif(equipe_lot, saison)]
+            
+            for nom_joueur, equipe in demandes:
+                try:
+                    ligne_reelle, source = resolveur.resoudre(nom_joueur, equipe, saison)
+                except Exception as e:
+                    print(f"Lookup failed for {nom_joueur}: {str(e)}")
+                    ligne_reelle, source = None, None
+                taches.append((nom_joueur, equipe, ligne_reelle, source))
         
-        # Générer les zones d'activité
-        zones_activite = generer_zones_activite(joueur_data['position'])
+        dossier = os.path.dirname(sortie)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
         
-        # Simuler l'historique des performances
-        historique = simuler_historique_performances(joueur_data)
+        total = len(taches)
+        reussis = 0
+        echecs = []
+        with open(sortie, 'w', encoding='utf-8') as f, \
+                ProcessPoolExecutor(max_workers=max(1, min(processus, total))) as pool:
+            futures = {pool.submit(_construire_rapport_lot, tache): tache for tache in taches}
+            for termine, future in enumerate(as_completed(futures), start=1):
+                nom_joueur, equipe, _, _ = futures[future]
+                try:
+                    rapport = future.result()
+                except Exception as e:
+                    # Processus worker tombé: on isole l'échec sur ce joueur
+                    rapport = {
+                        'success': False,
+                        'requete': {'nom_joueur': nom_joueur, 'equipe': equipe},
+                        'error': f"Worker failed: {str(e)}"
+                    }
+                
+                f.write(json.dumps(rapport, ensure_ascii=False, default=clean_value) + '\n')
+                f.flush()
+                
+                if rapport.get('success'):
+                    reussis += 1
+                else:
+                    echecs.append({'nom_joueur': nom_joueur, 'error': rapport.get('error')})
+                statut = '✓' if rapport.get('success') else '✗'
+                print(f"[{termine}/{total}] {statut} {nom_joueur}", file=sys.stderr, flush=True)
         
-        rapport_complet = {
+        return {
             'success': True,
-            'joueur': {
-                'nom': joueur_data['player'],
-                'equipe': joueur_data['squad'],
-                'age': joueur_data['age'],
-                'position': joueur_data['position'],
-                'minutes_jouees': joueur_data['minutes']
-            },
-            'statistiques_cles': {
-                'buts': joueur_data['goals'],
-                'passes_decidees': joueur_data['assists'],
-                'tirs': joueur_data['shots'],
-                'tirs_cadres': joueur_data['shots_on_target'],
-                'passes_reussies_pct': round(joueur_data['passes_pct'], 1),
-                'passes_cles': joueur_data['key_passes'],
-                'xa': round(joueur_data['xa'], 2),
-                'xg': round(joueur_data['xg'], 2),
-                'tacles': joueur_data['tackles'],
-                'interceptions': joueur_data['interceptions'],
-                'duels_gagnes': round(joueur_data['tackles'] * 1.5, 0)
-            },
-            'stats_avancees': stats_avancees,
-            'percentiles': percentiles,
-            'analyse': analyse,
-            'zones_activite': zones_activite,
-            'historique_performances': historique,
-            'heatmap_data': generer_heatmap_data(joueur_data['position']),
-            'comparaison_poste': generer_comparaison_poste(joueur_data),
-            'note_globale': calculer_note_globale(percentiles),
-            'tendances_recentes': generer_tendances(joueur_data),
-            'recommendations': generer_recommendations(analyse)
+            'sortie': os.path.abspath(sortie),
+            'total': total,
+            'reussis': reussis,
+            'echecs': echecs
         }
         
-        return rapport_complet
-        
     except Exception as e:
         return {
             'success': False,
-            'error': f"Error generating complete report: {str(e)}"
+            'error': f"Error generating batch reports: {str(e)}"
         }
 
 def enhance_simulated_data(base_data, nom_joueur, equipe):
@@ -210,7 +351,6 @@ def enhance_simulated_data(base_data, nom_joueur, equipe):
         })
     else:
         # Variation aléatoire réaliste basée sur le hash du nom
-        import hashlib
         seed = int(hashlib.md5(nom_joueur.encode()).hexdigest(), 16) % 1000
         np.random.seed(seed)
         
@@ -225,6 +365,11 @@ def enhance_simulated_data(base_data, nom_joueur, equipe):
     
     return base_data
 
+def graine_joueur(joueur_data):
+    """Graine stable dérivée du joueur et de son équipe (même joueur, même rapport)"""
+    cle = f"{joueur_data.get('player', '')}|{joueur_data.get('squad', '')}"
+    return int(hashlib.md5(cle.encode()).hexdigest(), 16) % (2 ** 32)
+
 def calculer_stats_avancees(joueur_data):
     """Calculer des statistiques avancées"""
     return {
@@ -262,14 +407,15 @@ def generer_percentiles_realistes(joueur_data):
     tackles_per_90 = (joueur_data['tackles'] / max(1, joueur_data['minutes'])) * 90
     percentiles['defense'] = min(90, max(10, tackles_per_90 * 25))
     
-    # Autres percentiles
+    # Autres percentiles (physique, mental, vitesse: absents de FBref, tirés avec une graine fixe)
+    rng = np.random.RandomState(graine_joueur(joueur_data))
     percentiles.update({
         'passes_decidees': min(90, max(15, joueur_data['assists'] * 8)),
         'tirs': min(88, max(20, (joueur_data['shots'] / max(1, joueur_data['minutes'])) * 90 * 2)),
-        'physique': np.random.randint(40, 85),
+        'physique': rng.randint(40, 85),
         'technique': min(90, max(30, joueur_data['passes_pct'] - 10)),
-        'mental': np.random.randint(50, 90),
-        'vitesse': np.random.randint(45, 88)
+        'mental': rng.randint(50, 90),
+        'vitesse': rng.randint(45, 88)
     })
     
     return {k: round(v, 1) for k, v in percentiles.items()}
@@ -294,6 +440,14 @@ def analyser_performance(joueur_data, percentiles):
 
 def determiner_style_jeu(joueur_data, percentiles):
     """Déterminer le style de jeu du joueur"""
+    # Style appris par clustering si le joueur vient du CSV local
+    try:
+        style = obtenir_styles().get((joueur_data['player'], joueur_data['squad']))
+    except Exception:
+        style = None
+    if style:
+        return style['style']
+    
     if percentiles.get('buts', 0) > 70:
         return "Finisseur clinique"
     elif percentiles.get('passes_decidees', 0) > 70:
@@ -365,11 +519,29 @@ def generer_heatmap_data(position):
 
 def generer_comparaison_poste(joueur_data):
     """Générer une comparaison avec la moyenne du poste"""
+    groupe = groupe_poste(joueur_data['position'])
+    cube = obtenir_cube_disponible()
+    cellule = cube.cellule(groupe=groupe) if cube else None
+    
+    # Sans CSV local: valeurs de référence historiques
+    if not cellule:
+        return {
+            'moyenne_poste_buts': 6.2,
+            'moyenne_poste_passes_decidees': 3.8,
+            'moyenne_poste_passes_pct': 79.5,
+            'classement_approximatif': f"Top 25% des {joueur_data['position']}"
+        }
+    
+    buts_par_90 = (joueur_data['goals'] / max(1, joueur_data['minutes'])) * 90
+    classement = cube.position_dans_poste(groupe, 'Gls', buts_par_90) or 'Top 50%'
+    
     return {
-        'moyenne_poste_buts': 6.2,
-        'moyenne_poste_passes_decidees': 3.8,
-        'moyenne_poste_passes_pct': 79.5,
-        'classement_approximatif': f"Top 25% des {joueur_data['position']}"
+        'moyenne_poste_buts': round(cellule['moyenne_Gls'], 1),
+        'moyenne_poste_passes_decidees': round(cellule['moyenne_Ast'], 1),
+        'moyenne_poste_passes_pct': round(cellule['passes_pct'] or 0, 1),
+        'moyenne_poste_buts_par_90': round(cellule['par_90_Gls'] or 0, 2),
+        'nb_joueurs_poste': cellule['nb_joueurs'],
+        'classement_approximatif': f"{classement} des {groupe}"
     }
 
 def calculer_note_globale(percentiles):
@@ -413,6 +585,33 @@ def clean_value(value):
         return float(value) if value != int(value) else int(value)
     return value
 
+def extraire_tables_page(params):
+    """Extrait des tableaux de stats d'une page FBref (url ou fichier HTML sauvegardé)"""
+    try:
+        if params.get('fichier'):
+            with open(params['fichier'], 'rb') as f:
+                html = f.read()
+            meta = {'stale': False, 'source': 'fichier'}
+        elif params.get('url'):
+            url = params['url']
+            html, meta = garde('fbref').obtenir(('page', url), lambda: rate_limited_request(url).content)
+        else:
+            return {'success': False, 'error': 'url ou fichier requis'}
+        
+        table_ids = params.get('tables') or ids_tables(html)
+        tables = extraire_tables(html, table_ids, params.get('garder_inconnues', False))
+        
+        return {
+            'success': True,
+            'stale': meta.get('stale', False),
+            'tables': {
+                table_id: None if df is None else json.loads(df.to_json(orient='records', force_ascii=False))
+                for table_id, df in tables.items()
+            }
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
 def main():
     if len(sys.argv) != 3:
         print(json.dumps({'success': False, 'error': 'Invalid arguments'}))
@@ -421,11 +620,25 @@ def main():
     action = sys.argv[1]
     params = json.loads(sys.argv[2])
     
+    # Version (données locales + paramètres): if_none_match identique -> aucun calcul
+    version = None
+    if action in ACTIONS_VERSIONNEES and joueur_dans_csv(params):
+        version = version_reponse(action, {k: v for k, v in params.items() if k != 'if_none_match'})
+        if params.get('if_none_match') == version:
+            print(json.dumps(non_modifie(version)))
+            return
+    
     if action == 'generer_rapport_complet':
         result = generer_rapport_joueur_complet(params)
+    elif action == 'generer_rapports_lot':
+        result = generer_rapports_lot(params)
+    elif action == 'extraire_tables':
+        result = extraire_tables_page(params)
     else:
         result = {'success': False, 'error': 'Unknown action'}
     
+    if version is not None:
+        result = avec_version(result, version)
     print(json.dumps(result))
 
 if __name__ == '__main__':
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+FBref Table Parser - Extraction ciblée des tableaux de statistiques des pages FBref
+Seuls les tableaux demandés (par id) sont localisés dans le HTML brut, y compris ceux
+placés dans des commentaires HTML, puis parsés avec lxml. Les colonnes (attribut
+data-stat) sont renommées vers le schéma du CSV joueurs et typées comme dans le CSV
+(indépendamment des valeurs de la page). Les tableaux parsés sont mis en cache par
+empreinte du contenu de la page.
+"""
+
+import os
+import re
+import sys
+import json
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, resoudre_csv, empreinte_memorisee
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+TABLES_CACHE_DIR = os.path.join(CACHE_DIR, 'fbref_tables')
+
+# Version du parsing (invalide le cache si la correspondance ou le typage des colonnes change)
+VERSION_PARSER = 2
+
+# Colonnes d'identité; dans le CSV, celles des tableaux autres que "standard" portent le
+# suffixe _stats_<type> (Player et Squad servent de clés de fusion et n'en ont pas)
+COLONNES_IDENTITE = {
+    'ranker': 'Rk',
+    'player': 'Player',
+    'nationality': 'Nation',
+    'position': 'Pos',
+    'team': 'Squad',
+    'comp_level': 'Comp',
+    'age': 'Age',
+    'birth_year': 'Born',
+    'minutes_90s': '90s'
+}
+CLES_FUSION = {'Player', 'Squad'}
+
+# data-stat FBref -> colonne du CSV, par type de tableau
+COLONNES_PAR_TABLE = {
+    'standard': {
+        'games': 'MP', 'games_starts': 'Starts', 'minutes': 'Min', 'goals': 'Gls',
+        'assists': 'Ast', 'goals_assists': 'G+A', 'goals_pens': 'G-PK', 'pens_made': 'PK',
+        'pens_att': 'PKatt', 'cards_yellow': 'CrdY', 'cards_red': 'CrdR', 'xg': 'xG',
+        'npxg': 'npxG', 'xg_assist': 'xAG', 'npxg_xg_assist': 'npxG+xAG',
+        'progressive_carries': 'PrgC', 'progressive_passes': 'PrgP',
+        'progressive_passes_received': 'PrgR', 'goals_assists_pens_per90': 'G+A-PK',
+        'xg_xg_assist_per90': 'xG+xAG'
+    },
+    'shooting': {
+        'goals': 'Gls_stats_shooting', 'shots': 'Sh', 'shots_on_target': 'SoT',
+        'shots_on_target_pct': 'SoT%', 'shots_per90': 'Sh/90', 'shots_on_target_per90': 'SoT/90',
+        'goals_per_shot': 'G/Sh', 'goals_per_shot_on_target': 'G/SoT',
+        'average_shot_distance': 'Dist', 'shots_free_kicks': 'FK', 'pens_made': 'PK_stats_shooting',
+        'pens_att': 'PKatt_stats_shooting', 'xg': 'xG_stats_shooting',
+        'npxg': 'npxG_stats_shooting', 'npxg_per_shot': 'npxG/Sh', 'xg_net': 'G-xG',
+        'npxg_net': 'np:G-xG'
+    },
+    'passing': {
+        'passes_completed': 'Cmp', 'passes': 'Att', 'passes_pct': 'Cmp%',
+        'passes_total_distance': 'TotDist', 'passes_progressive_distance': 'PrgDist',
+        'assists': 'Ast_stats_passing', 'xg_assist': 'xAG_stats_passing', 'pass_xa': 'xA',
+        'xg_assist_net': 'A-xAG', 'assisted_shots': 'KP', 'passes_into_final_third': '1/3',
+        'passes_into_penalty_area': 'PPA', 'crosses_into_penalty_area': 'CrsPA',
+        'progressive_passes': 'PrgP_stats_passing'
+    },
+    'gca': {
+        'sca': 'SCA', 'sca_per90': 'SCA90', 'sca_passes_live': 'PassLive',
+        'sca_passes_dead': 'PassDead', 'sca_take_ons': 'TO', 'sca_shots': 'Sh_stats_gca',
+        'sca_fouled': 'Fld', 'sca_defense': 'Def', 'gca': 'GCA', 'gca_per90': 'GCA90'
+    },
+    'defense': {
+        'tackles': 'Tkl', 'tackles_won': 'TklW', 'tackles_def_3rd': 'Def 3rd',
+        'tackles_mid_3rd': 'Mid 3rd', 'tackles_att_3rd': 'Att 3rd',
+        'challenges': 'Att_stats_defense', 'challenge_tackles_pct': 'Tkl%',
+        'challenges_lost': 'Lost', 'blocks': 'Blocks_stats_defense',
+        'blocked_shots': 'Sh_stats_defense', 'blocked_passes': 'Pass', 'interceptions': 'Int',
+        'tackles_interceptions': 'Tkl+Int', 'clearances': 'Clr', 'errors': 'Err'
+    },
+    'possession': {
+        'touches': 'Touches', 'touches_def_pen_area': 'Def Pen',
+        'touches_def_3rd': 'Def 3rd_stats_possession', 'touches_mid_3rd': 'Mid 3rd_stats_possession',
+        'touches_att_3rd': 'Att 3rd_stats_possession', 'touches_att_pen_area': 'Att Pen',
+        'touches_live_ball': 'Live_stats_possession', 'take_ons': 'Att_stats_possession',
+        'take_ons_won': 'Succ', 'take_ons_won_pct': 'Succ%', 'take_ons_tackled': 'Tkld',
+        'take_ons_tackled_pct': 'Tkld%', 'carries': 'Carries',
+        'carries_distance': 'TotDist_stats_possession',
+        'carries_progressive_distance': 'PrgDist_stats_possession',
+        'progressive_carries': 'PrgC_stats_possession',
+        'carries_into_final_third': '1/3_stats_possession',
+        'carries_into_penalty_area': 'CPA', 'miscontrols': 'Mis', 'dispossessed': 'Dis',
+        'passes_received': 'Rec', 'progressive_passes_received': 'PrgR_stats_possession'
+    },
+    'misc': {
+        'cards_yellow': 'CrdY_stats_misc', 'cards_red': 'CrdR_stats_misc',
+        'cards_yellow_red': '2CrdY', 'fouls': 'Fls', 'fouled': 'Fld_stats_misc',
+        'offsides': 'Off_stats_misc', 'crosses': 'Crs_stats_misc',
+        'interceptions': 'Int_stats_misc', 'tackles_won': 'TklW_stats_misc',
+        'pens_won': 'PKwon', 'pens_conceded': 'PKcon', 'own_goals': 'OG',
+        'ball_recoveries': 'Recov', 'aerials_won': 'Won', 'aerials_lost': 'Lost_stats_misc',
+        'aerials_won_pct': 'Won%'
+    },
+    'keeper': {
+        'gk_games': 'MP_stats_keeper', 'gk_games_starts': 'Starts_stats_keeper',
+        'gk_minutes': 'Min_stats_keeper', 'gk_goals_against': 'GA',
+        'gk_goals_against_per90': 'GA90', 'gk_shots_on_target_against': 'SoTA',
+        'gk_saves': 'Saves', 'gk_save_pct': 'Save%', 'gk_wins': 'W', 'gk_ties': 'D',
+        'gk_losses': 'L', 'gk_clean_sheets': 'CS', 'gk_clean_sheets_pct': 'CS%',
+        'gk_pens_att': 'PKatt_stats_keeper', 'gk_pens_allowed': 'PKA',
+        'gk_pens_saved': 'PKsv', 'gk_pens_missed': 'PKm'
+    }
+}
+
+COLONNES_TEXTE = {'Player', 'Nation', 'Pos', 'Squad', 'Comp'}
+
+# Lignes de tableau à ignorer (en-têtes répétés, séparateurs)
+CLASSES_IGNOREES = ('thead', 'over_header', 'spacer', 'partial_table')
+
+_TYPE_TABLE = re.compile(r'^stats_([a-z_]+?)(?:_\d+)?$')
+
+
+def type_table(table_id):
+    """'stats_shooting_9' -> 'shooting', 'stats_keeper_adv' -> 'keeper_adv'"""
+    m = _TYPE_TABLE.match(table_id)
+    return m.group(1) if m else table_id
+
+
+def correspondance_colonnes(table_id):
+    """data-stat -> colonne du CSV pour un tableau donné"""
+    type_ = type_table(table_id)
+    suffixe = '' if type_ == 'standard' else f"_stats_{type_}"
+    correspondance = {
+        stat: colonne if colonne in CLES_FUSION else colonne + suffixe
+        for stat, colonne in COLONNES_IDENTITE.items()
+    }
+    correspondance.update(COLONNES_PAR_TABLE.get(type_, {}))
+    return correspondance
+
+
+def localiser_table(html, table_id):
+    """Fragment '<table ... id="table_id"> ... </table>' du HTML brut (commentaires compris)"""
+    for guillemet in (b'"', b"'"):
+        position = html.find(b'id=' + guillemet + table_id.encode() + guillemet)
+        if position != -1:
+            break
+    else:
+        return None
+    debut = html.rfind(b'<table', 0, position)
+    fin = html.find(b'</table>', position)
+    if debut == -1 or fin == -1:
+        return None
+    return html[debut:fin + len(b'</table>')]
+
+
+def _texte_cellule(cellule):
+    # Feuille: .text direct; sinon sérialisation texte en C (plus rapide que itertext)
+    texte = cellule.text if len(cellule) == 0 else etree.tostring(
+        cellule, method='text', encoding='unicode', with_tail=False)
+    return texte.strip() or None if texte else None
+
+
+def parser_fragment(fragment, table_id, garder_inconnues=False, schema=None):
+    """Parse un fragment <table> en DataFrame typé, colonnes au schéma du CSV"""
+    schema = schema or {}
+    # Parseur lxml.etree brut: évite la surcouche d'éléments de lxml.html
+    table = etree.fromstring(fragment, etree.HTMLParser(encoding='utf-8'))
+    correspondance = correspondance_colonnes(table_id)
+
+    lignes = []
+    for tr in table.iterfind('.//tbody/tr'):
+        classes = tr.get('class')
+        if classes and any(c in classes for c in CLASSES_IGNOREES):
+            continue
+        ligne = {}
+        for cellule in tr:
+            colonne = correspondance.get(cellule.get('data-stat'))
+            if colonne is None and garder_inconnues:
+                colonne = cellule.get('data-stat')
+            if colonne is not None:
+                ligne[colonne] = _texte_cellule(cellule)
+        if ligne:
+            lignes.append(ligne)
+
+    if not lignes:
+        return pd.DataFrame()
+    # Ordre des colonnes: celui du schéma, puis les data-stat inconnus éventuels
+    presentes = dict.fromkeys(c for ligne in lignes for c in ligne)
+    colonnes = [c for c in dict.fromkeys(correspondance.values()) if c in presentes]
+    colonnes += [c for c in presentes if c not in colonnes]
+    return pd.DataFrame({
+        colonne: typer_colonne(colonne, [ligne.get(colonne) for ligne in lignes], schema.get(colonne))
+        for colonne in colonnes
+    })
+
+
+def _nombre(texte, age=False):
+    if age:
+        texte = texte.split('-')[0]
+    return float(texte.replace(',', '').rstrip('%'))
+
+
+def typer_colonne(colonne, valeurs, type_csv=None):
+    """Valeurs texte d'une colonne -> tableau typé ('1,234' -> 1234, âge '25-123' -> 25).
+    type_csv ('int64', 'float64', 'string') fixe le type sur celui du CSV; sans lui (colonne
+    hors schéma), entier si toutes les valeurs le sont, flottant sinon"""
+    base = colonne.split('_stats_')[0]
+    if type_csv is None and base in COLONNES_TEXTE:
+        type_csv = 'string'
+    if type_csv == 'string':
+        return pd.array(valeurs, dtype='string')
+    try:
+        nombres = [_nombre(v, base == 'Age') if v is not None else np.nan for v in valeurs]
+    except ValueError:
+        # Colonne conservée en texte si elle contient des valeurs non numériques
+        return pd.array(valeurs, dtype='string')
+    tableau = np.array(nombres, dtype='float64')
+    if type_csv == 'float64':
+        return tableau
+    manquants = np.isnan(tableau)
+    entiers = (tableau[~manquants] % 1 == 0).all()
+    if type_csv == 'int64' and entiers and manquants.any():
+        # Entier du CSV avec des cellules vides: entier nullable
+        return pd.array(tableau, dtype='Int64')
+    if entiers and not manquants.any():
+        return tableau.astype('int64')
+    return tableau
+
+
+_SCHEMAS = {}
+
+
+def schema_csv(csv_path=None):
+    """Type de chaque colonne du CSV joueurs ('int64', 'float64' ou 'string'), {} sans CSV"""
+    csv_path = resoudre_csv(csv_path)
+    if not os.path.exists(csv_path):
+        return {}
+    empreinte = empreinte_memorisee(csv_path)
+    if empreinte in _SCHEMAS:
+        return _SCHEMAS[empreinte]
+
+    chemin_cache = os.path.join(CACHE_DIR, f"schema_{empreinte}.json")
+    try:
+        with open(chemin_cache, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        types = pd.read_csv(csv_path).dtypes
+        schema = {colonne: 'int64' if t.kind in 'iu' else 'float64' if t.kind == 'f' else 'string'
+                  for colonne, t in types.items()}
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{chemin_cache}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(schema, f)
+        os.replace(tmp, chemin_cache)
+    _SCHEMAS[empreinte] = schema
+    return schema
+
+
+def empreinte_schema(schema):
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:8]
+
+
+def empreinte_contenu(html):
+    return hashlib.sha256(html).hexdigest()[:16]
+
+
+_CACHE = {}
+
+
+def extraire_tables(html, table_ids, garder_inconnues=False, utiliser_cache=True, schema=None):
+    """Dictionnaire table_id -> DataFrame (None si le tableau est absent de la page); types
+    des colonnes: schema, par défaut celui du CSV joueurs"""
+    if not LXML_AVAILABLE:
+        raise RuntimeError("lxml requis pour parser les pages FBref")
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    if schema is None:
+        schema = schema_csv()
+    empreinte = empreinte_contenu(html)
+    types = empreinte_schema(schema)
+
+    tables = {}
+    for table_id in table_ids:
+        cle = (empreinte, table_id, garder_inconnues, types, VERSION_PARSER)
+        chemin = os.path.join(TABLES_CACHE_DIR, f"{empreinte}_{table_id}_{int(garder_inconnues)}_"
+                                                f"{types}_v{VERSION_PARSER}.pkl")
+        if utiliser_cache and cle in _CACHE:
+            tables[table_id] = _CACHE[cle]
+            continue
+        if utiliser_cache and os.path.exists(chemin):
+            with open(chemin, 'rb') as f:
+                tables[table_id] = _CACHE[cle] = pickle.load(f)
+            continue
+
+        fragment = localiser_table(html, table_id)
+        df = parser_fragment(fragment, table_id, garder_inconnues, schema) if fragment is not None else None
+        tables[table_id] = df
+        if utiliser_cache:
+            _CACHE[cle] = df
+            os.makedirs(TABLES_CACHE_DIR, exist_ok=True)
+            tmp = f"{chemin}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, chemin)
+    return tables
+
+
+def ids_tables(html):
+    """Liste des ids de tableaux de stats présents dans la page (commentaires compris)"""
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    ids = re.findall(rb'<table[^>]*\sid="(stats_[^"]+)"', html)
+    return list(dict.fromkeys(i.decode() for i in ids))
+
+
+def main():
+    """Point d'entrée: parse <fichier.html> [table_id ...] | ids <fichier.html>"""
+    if len(sys.argv) < 3:
+        print("Usage: python fbref_table_parser.py <parse|ids> <fichier.html> [table_id ...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+    with open(sys.argv[2], 'rb') as f:
+        html = f.read()
+
+    if action == "parse":
+        table_ids = sys.argv[3:] or ids_tables(html)
+        tables = extraire_tables(html, table_ids)
+        print(json.dumps({
+            table_id: None if df is None else {
+                'lignes': len(df),
+                'colonnes': list(df.columns),
+                'apercu': json.loads(df.head(3).to_json(orient='records', force_ascii=False))
+            }
+            for table_id, df in tables.items()
+        }, ensure_ascii=False))
+
+    elif action == "ids":
+        print(json.dumps({"tables": ids_tables(html)}))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Load Replay - Rejoue un mélange d'appels aux scripts Python comme le serveur Node
+Chaque appel est un processus `python3 script.py ...` (comme spawn côté Node), lancé à un
+débit cible (boucle ouverte) ou par N travailleurs en continu (boucle fermée), dans la limite
+de la concurrence. Le mélange est synthétique (pondéré, joueurs tirés du CSV) ou enregistré
+(JSONL horodaté). Un serveur FBref factice peut remplacer fbref.com (FBREF_BASE_URL).
+Rapport JSON par action: débit, latences p50/p95/p99, CPU et RSS crête (os.wait4).
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import tempfile
+import threading
+import subprocess
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from player_dataset import REPO_ROOT, resoudre_csv
+from fbref_table_parser import COLONNES_IDENTITE, COLONNES_PAR_TABLE
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Interpréteur des processus lancés (python3, comme le serveur Node)
+PYTHON = os.environ.get('LOAD_REPLAY_PYTHON', 'python3')
+
+# ru_maxrss: kilo-octets sous Linux, octets sous macOS
+RSS_OCTETS = 1 if sys.platform == 'darwin' else 1024
+
+# Mélange par défaut, proche du trafic d'un jour de match ({joueur} / {equipe} tirés du CSV)
+MELANGE_DEFAUT = [
+    {'nom': 'analyzer.search_player', 'script': 'enhanced_player_analyzer.py',
+     'args': ['search_player', '{joueur}'], 'poids': 4},
+    {'nom': 'analyzer.get_complete_profile', 'script': 'enhanced_player_analyzer.py',
+     'args': ['get_complete_profile', '{joueur}', '{equipe}'], 'poids': 4},
+    {'nom': 'analyzer.query_tags', 'script': 'enhanced_player_analyzer.py',
+     'args': ['query_tags', 'Finition ET Passes progressives', 'FW', '10'], 'poids': 1},
+    {'nom': 'report.generer_rapport_complet', 'script': 'fbref_report_generator.py',
+     'args': ['generer_rapport_complet', {'nom_joueur': '{joueur}', 'equipe': '{equipe}'}], 'poids': 2},
+    {'nom': 'report.extraire_tables', 'script': 'fbref_report_generator.py',
+     'args': ['extraire_tables', {'url': 'https://fbref.com/en/squads/{equipe}/Stats'}], 'poids': 1},
+    {'nom': 'soccerdata.get_player_stats', 'script': 'soccerdata_collector.py',
+     'args': ['get_player_stats', {'player_name': '{joueur}'}], 'poids': 2},
+]
+
+
+# --- Serveur FBref factice ---
+
+def page_fbref_factice(joueurs, equipe):
+    """Page d'équipe FBref minimale: tableau stats_standard en commentaire, comme sur le site"""
+    colonnes = {**COLONNES_IDENTITE, **COLONNES_PAR_TABLE['standard']}
+    lignes = []
+    for ligne in joueurs:
+        if equipe and ligne.get('Squad') != equipe:
+            continue
+        cellules = ''.join(
+            f'<td data-stat="{stat}">{ligne.get(colonne, "")}</td>'
+            for stat, colonne in colonnes.items() if stat != 'player'
+        )
+        lignes.append(f'<tr><th data-stat="player">{ligne.get("Player", "")}</th>{cellules}</tr>')
+    entetes = ''.join(f'<th data-stat="{stat}">{colonne}</th>' for stat, colonne in colonnes.items())
+    return (
+        '<html><body><div id="all_stats_standard"><!--\n'
+        f'<table id="stats_standard_9"><thead><tr>{entetes}</tr></thead>'
+        f'<tbody>{"".join(lignes)}</tbody></table>\n-->'
+        '</div></body></html>'
+    ).encode('utf-8')
+
+
+class ServeurFBrefFactice:
+    """Serveur HTTP local qui imite fbref.com (latence et taux de 429 réglables)"""
+
+    def __init__(self, joueurs, latence=0.05, taux_429=0.0, fixtures=None, port=0, graine=None):
+        self.joueurs = joueurs
+        self.latence = latence
+        self.taux_429 = taux_429
+        self.fixtures = fixtures
+        self.hasard = random.Random(graine)
+        self.requetes = 0
+        self.limitees = 0
+        self._verrou = threading.Lock()
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', port), self._gestionnaire())
+        self.serveur.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.serveur.server_address[1]}"
+        self._thread = None
+
+    def _reponse(self, chemin):
+        """(statut, corps) pour un chemin demandé"""
+        with self._verrou:
+            self.requetes += 1
+            limite = self.hasard.random() < self.taux_429
+            self.limitees += limite
+        if self.latence:
+            time.sleep(self.latence)
+        if limite:
+            return 429, b'Too Many Requests'
+        if self.fixtures:
+            # Fixture enregistrée: chemin de l'URL sous le dossier (index.html pour un dossier)
+            fichier = os.path.join(self.fixtures, chemin.split('?')[0].lstrip('/'))
+            if os.path.isdir(fichier):
+                fichier = os.path.join(fichier, 'index.html')
+            if os.path.isfile(fichier):
+                with open(fichier, 'rb') as f:
+                    return 200, f.read()
+        # /en/squads/<equipe>/... -> joueurs de l'équipe, sinon tout le fichier
+        morceaux = [m for m in chemin.split('?')[0].split('/') if m]
+        equipe = morceaux[2] if len(morceaux) > 2 and morceaux[1] == 'squads' else None
+        return 200, page_fbref_factice(self.joueurs, unquote(equipe) if equipe else None)
+
+    def _gestionnaire(self):
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                statut, corps = serveur._reponse(self.path)
+                self.send_response(statut)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(corps)))
+                if statut == 429:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        return Gestionnaire
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+    def statistiques(self):
+        return {'url': self.url, 'requetes': self.requetes, 'limitees_429': self.limitees}
+
+
+# --- Construction des appels ---
+
+def charger_joueurs(csv_path=None, colonnes=None):
+    """Lignes du CSV (colonnes utiles seulement), sans pandas"""
+    colonnes = set(colonnes or ['Player', 'Squad'])
+    with open(resoudre_csv(csv_path), newline='', encoding='utf-8') as f:
+        return [{c: v for c, v in ligne.items() if c in colonnes} for ligne in csv.DictReader(f)]
+
+
+def _remplir(modele, valeurs):
+    """Remplace les {variables} dans une chaîne, une liste ou un dictionnaire"""
+    if isinstance(modele, str):
+        for cle, valeur in valeurs.items():
+            modele = modele.replace('{' + cle + '}', valeur)
+        return modele
+    if isinstance(modele, list):
+        return [_remplir(m, valeurs) for m in modele]
+    if isinstance(modele, dict):
+        return {cle: _remplir(m, valeurs) for cle, m in modele.items()}
+    return modele
+
+
+def preparer_appel(entree, valeurs=None):
+    """Appel exécutable {nom, script, args} (arguments dictionnaire -> JSON, comme le serveur)"""
+    args = _remplir(entree.get('args', []), valeurs or {})
+    return {
+        'nom': entree.get('nom') or f"{entree['script']}:{args[0] if args else ''}",
+        'script': entree['script'],
+        'args': [a if isinstance(a, str) else json.dumps(a, ensure_ascii=False) for a in args]
+    }
+
+
+def appels_synthetiques(melange, nombre, joueurs, graine=None):
+    """Tirage pondéré de `nombre` appels, joueur et équipe tirés au hasard"""
+    hasard = random.Random(graine)
+    poids = [e.get('poids', 1) for e in melange]
+    appels = []
+    for entree in hasard.choices(melange, weights=poids, k=nombre):
+        joueur = hasard.choice(joueurs) if joueurs else {}
+        appels.append(preparer_appel(entree, {'joueur': joueur.get('Player', ''),
+                                              'equipe': joueur.get('Squad', '')}))
+    return appels
+
+
+def appels_enregistres(chemin, acceleration=1.0):
+    """Appels d'un enregistrement JSONL {t, script, args[, nom]} avec leurs instants relatifs"""
+    appels = []
+    with open(chemin, 'r', encoding='utf-8') as f:
+        for ligne in f:
+            if ligne.strip():
+                entree = json.loads(ligne)
+                appels.append((float(entree.get('t', 0)), preparer_appel(entree)))
+    if not appels:
+        return []
+    origine = min(t for t, _ in appels)
+    return sorted(((t - origine) / acceleration, appel) for t, appel in appels)
+
+
+# --- Exécution ---
+
+def _en_erreur(code, sortie):
+    """Échec: code de sortie non nul ou document JSON avec success=false / error"""
+    if code != 0:
+        return True
+    texte = sortie.decode('utf-8', errors='replace').strip()
+    lignes = texte.splitlines()
+    # Certains scripts affichent leur progression avant le JSON
+    candidats = [texte, texte[texte.find('{'):] if '{' in texte else '', lignes[-1] if lignes else '']
+    for candidat in candidats:
+        try:
+            document = json.loads(candidat)
+        except ValueError:
+            continue
+        return isinstance(document, dict) and (document.get('success') is False or 'error' in document)
+    return False
+
+
+def executer(appel, env, prevu=None):
+    """Lance un processus et mesure latence, temps CPU et RSS crête (os.wait4)"""
+    debut = time.perf_counter()
+    with tempfile.TemporaryFile() as sortie, tempfile.TemporaryFile() as erreurs:
+        processus = subprocess.Popen(
+            [PYTHON, os.path.join(SCRIPTS_DIR, appel['script']), *appel['args']],
+            stdout=sortie, stderr=erreurs, stdin=subprocess.DEVNULL, cwd=REPO_ROOT, env=env)
+        _, statut, usage = os.wait4(processus.pid, 0)
+        fin = time.perf_counter()
+        processus.returncode = os.waitstatus_to_exitcode(statut)
+        sortie.seek(0)
+        erreur = _en_erreur(processus.returncode, sortie.read())
+        trace = ''
+        if erreur:
+            erreurs.seek(0)
+            trace = erreurs.read()[-500:].decode('utf-8', errors='replace')
+    return {
+        'nom': appel['nom'],
+        'debut': debut,
+        'fin': fin,
+        # Latence vue par l'appelant: depuis l'instant prévu (file d'attente comprise)
+        'latence': fin - (prevu if prevu is not None else debut),
+        'service': fin - debut,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'rss': usage.ru_maxrss * RSS_OCTETS,
+        'code': processus.returncode,
+        'erreur': erreur,
+        'trace': trace
+    }
+
+
+def rejouer(planning, concurrence, env):
+    """Exécute [(instant | None, appel)]: instants relatifs = boucle ouverte, None = au plus vite"""
+    resultats = []
+    verrou = threading.Lock()
+
+    def tache(appel, prevu):
+        resultat = executer(appel, env, prevu)
+        with verrou:
+            resultats.append(resultat)
+
+    origine = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        for instant, appel in planning:
+            prevu = None
+            if instant is not None:
+                prevu = origine + instant
+                attente = prevu - time.perf_counter()
+                if attente > 0:
+                    time.sleep(attente)
+            pool.submit(tache, appel, prevu)
+    return resultats, time.perf_counter() - origine
+
+
+# --- Rapport ---
+
+def percentile(valeurs, q):
+    """Percentile q (0-100) par interpolation linéaire"""
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    rang = (len(valeurs) - 1) * q / 100
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas)
+
+
+def _ms(valeur):
+    return None if valeur is None else round(valeur * 1000, 1)
+
+
+def resumer(resultats, duree):
+    """Agrégats d'un groupe de résultats"""
+    latences = [r['latence'] for r in resultats]
+    services = [r['service'] for r in resultats]
+    cpu = [r['cpu'] for r in resultats]
+    rss = [r['rss'] for r in resultats]
+    erreurs = [r for r in resultats if r['erreur']]
+    return {
+        'nombre': len(resultats),
+        'erreurs': len(erreurs),
+        'debit_par_s': round(len(resultats) / duree, 2) if duree else None,
+        'latence_ms': {f'p{q}': _ms(percentile(latences, q)) for q in (50, 95, 99)}
+                      | {'max': _ms(max(latences, default=None))},
+        'service_ms': {f'p{q}': _ms(percentile(services, q)) for q in (50, 95, 99)},
+        'cpu_ms': {'moyenne': _ms(sum(cpu) / len(cpu)) if cpu else None,
+                   'p95': _ms(percentile(cpu, 95)), 'total': _ms(sum(cpu))},
+        'rss_mo': {'p50': round(percentile(rss, 50) / 2**20, 1) if rss else None,
+                   'crete': round(max(rss) / 2**20, 1) if rss else None},
+        'exemples_erreurs': [{'code': r['code'], 'trace': r['trace']} for r in erreurs[:3]]
+    }
+
+
+def rapport(resultats, duree, concurrence):
+    """Rapport global et par action"""
+    par_action = {}
+    for resultat in resultats:
+        par_action.setdefault(resultat['nom'], []).append(resultat)
+    return {
+        'duree_s': round(duree, 2),
+        'concurrence': concurrence,
+        'global': resumer(resultats, duree),
+        'actions': {nom: resumer(groupe, duree) for nom, groupe in sorted(par_action.items())}
+    }
+
+
+# --- Scénario complet ---
+
+def lancer(params):
+    """Exécute un scénario de charge et retourne le rapport JSON"""
+    concurrence = int(params.get('concurrence', 4))
+    debit = float(params.get('debit', 0))
+    graine = params.get('graine')
+    joueurs = charger_joueurs(params.get('csv_path'),
+                              ['Player', 'Squad', *COLONNES_IDENTITE.values(),
+                               *COLONNES_PAR_TABLE['standard'].values()])
+
+    # Planning: enregistrement horodaté, sinon mélange synthétique
+    if params.get('enregistrement'):
+        planning = appels_enregistres(params['enregistrement'], float(params.get('acceleration', 1.0)))
+    else:
+        nombre = int(params.get('nombre') or max(1, round(debit * float(params.get('duree', 30)))))
+        appels = appels_synthetiques(params.get('melange') or MELANGE_DEFAUT, nombre, joueurs, graine)
+        planning = [(i / debit if debit > 0 else None, appel) for i, appel in enumerate(appels)]
+
+    env = dict(os.environ)
+    temporaires = []
+    serveur = None
+    options_fbref = params.get('fbref_factice', True)
+    if options_fbref:
+        options_fbref = options_fbref if isinstance(options_fbref, dict) else {}
+        serveur = ServeurFBrefFactice(
+            joueurs, latence=float(options_fbref.get('latence', 0.05)),
+            taux_429=float(options_fbref.get('taux_429', 0.0)),
+            fixtures=options_fbref.get('fixtures'), graine=graine).demarrer()
+        # Données factices: caches amont isolés pour ne pas polluer les caches réels
+        for variable in ('UPSTREAM_GUARD_DIR', 'SOCCERDATA_DIR'):
+            temporaires.append(tempfile.mkdtemp(prefix='load_replay_'))
+            env[variable] = temporaires[-1]
+        env['FBREF_BASE_URL'] = serveur.url
+    if params.get('cache_dir'):
+        env['PLAYERSTATS_CACHE_DIR'] = params['cache_dir']
+
+    try:
+        # Échauffement: un appel par action, hors mesures (caches disque construits)
+        if params.get('echauffement', True):
+            vus = {}
+            for _, appel in planning:
+                vus.setdefault(appel['nom'], appel)
+            for appel in vus.values():
+                executer(appel, env)
+
+        resultats, duree = rejouer(planning, concurrence, env)
+        resultat = rapport(resultats, duree, concurrence)
+        resultat['mode'] = ('enregistrement' if params.get('enregistrement')
+                            else 'boucle_ouverte' if debit > 0 else 'boucle_fermee')
+        if debit > 0 and not params.get('enregistrement'):
+            resultat['debit_cible'] = debit
+        if serveur:
+            resultat['fbref_factice'] = serveur.statistiques()
+        return resultat
+    finally:
+        if serveur:
+            serveur.arreter()
+        for dossier in temporaires:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+
+def main():
+    """Point d'entrée: run '<json>' | fbref [port]"""
+    if len(sys.argv) < 2:
+        print("Usage: python load_replay.py <run|fbref> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "run":
+        params = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+        resultat = lancer(params)
+        if params.get('sortie'):
+            tmp = f"{params['sortie']}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(resultat, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, params['sortie'])
+        print(json.dumps(resultat, ensure_ascii=False, indent=2))
+
+    elif action == "fbref":
+        # Serveur factice seul (FBREF_BASE_URL=<url> pour y brancher un serveur Node)
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+        serveur = ServeurFBrefFactice(charger_joueurs(), port=port).demarrer()
+        print(json.dumps({"url": serveur.url}), flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            serveur.arreter()
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Match Ingestion - Ingestion incrémentale des lignes joueur match par match
+Met à jour les totaux et taux par 90 de chaque joueur, et tient les distributions par
+poste dans des sketches de quantiles fusionnables (seaux logarithmiques type DDSketch
+indexés par un arbre de Fenwick): ajout, retrait et rang en O(log n), sans retri.
+"""
+
+import os
+import sys
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, normaliser_nom, groupe_poste, resoudre_csv
+
+ETAT_PATH = os.environ.get('INGESTION_STATE_PATH', os.path.join(CACHE_DIR, 'ingestion_state.json'))
+
+# Statistiques cumulées et suivies en taux par 90
+STATS_INGESTION = ['Gls', 'Ast', 'xG', 'xAG', 'npxG', 'PrgP', 'PrgC', 'PrgR',
+                   'Sh', 'SoT', 'KP', 'Tkl', 'Int']
+
+# Minutes minimum pour entrer dans les distributions de percentiles
+MIN_MINUTES_DISTRIBUTION = 90
+
+# Paramètres des sketches: précision relative, plage des valeurs non nulles
+PRECISION_RELATIVE = 0.01
+VALEUR_MIN = 1e-4
+VALEUR_MAX = 1e4
+
+
+class SketchQuantiles:
+    """Sketch de quantiles fusionnable à précision relative, avec retrait de valeurs"""
+
+    gamma = (1 + PRECISION_RELATIVE) / (1 - PRECISION_RELATIVE)
+    log_gamma = math.log(gamma)
+    index_min = math.ceil(math.log(VALEUR_MIN) / log_gamma)
+    index_max = math.ceil(math.log(VALEUR_MAX) / log_gamma)
+    # Seau 0 réservé aux valeurs nulles; seaux 1..taille pour les valeurs positives
+    taille = index_max - index_min + 2
+
+    def __init__(self, arbre=None, total=0):
+        self.arbre = np.zeros(self.taille + 1, dtype=np.int64) if arbre is None else arbre
+        self.total = total
+
+    def _seau(self, valeur):
+        if valeur is None or not valeur > VALEUR_MIN:
+            return 0
+        index = math.ceil(math.log(min(valeur, VALEUR_MAX)) / self.log_gamma)
+        return index - self.index_min + 1
+
+    def _valeur_seau(self, seau):
+        if seau == 0:
+            return 0.0
+        index = seau + self.index_min - 1
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def _modifier(self, seau, delta):
+        i = seau + 1
+        while i <= self.taille:
+            self.arbre[i] += delta
+            i += i & -i
+        self.total += delta
+
+    def _cumul(self, seau):
+        """Nombre de valeurs dans les seaux 0..seau-1"""
+        i, somme = seau, 0
+        while i > 0:
+            somme += self.arbre[i]
+            i -= i & -i
+        return int(somme)
+
+    def ajouter(self, valeur):
+        self._modifier(self._seau(valeur), 1)
+
+    def retirer(self, valeur):
+        self._modifier(self._seau(valeur), -1)
+
+    def percentile(self, valeur):
+        """Part des valeurs strictement inférieures (moitié du seau de la valeur comptée)"""
+        if self.total <= 0:
+            return None
+        seau = self._seau(valeur)
+        dessous = self._cumul(seau)
+        meme_seau = self._cumul(seau + 1) - dessous
+        rang = dessous + (meme_seau / 2 if seau > 0 else 0)
+        return rang / self.total * 100
+
+    def quantile(self, q):
+        """Valeur approchée du quantile q (0-1) par recherche dans l'arbre"""
+        if self.total <= 0:
+            return None
+        cible = q * (self.total - 1)
+        position, reste = 0, cible
+        pas = 1 << (self.taille.bit_length() - 1)
+        while pas:
+            suivant = position + pas
+            if suivant <= self.taille and self.arbre[suivant] <= reste:
+                position = suivant
+                reste -= self.arbre[suivant]
+            pas >>= 1
+        return self._valeur_seau(position)
+
+    def fusionner(self, autre):
+        """Fusion: l'arbre de Fenwick étant linéaire, on additionne les tableaux"""
+        return SketchQuantiles(self.arbre + autre.arbre, self.total + autre.total)
+
+    def vers_dict(self):
+        non_nuls = np.flatnonzero(self.arbre)
+        return {'total': int(self.total),
+                'arbre': {int(i): int(self.arbre[i]) for i in non_nuls}}
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        arbre = np.zeros(cls.taille + 1, dtype=np.int64)
+        for i, v in donnees['arbre'].items():
+            arbre[int(i)] = v
+        return cls(arbre, donnees['total'])
+
+
+def cle_joueur(ligne):
+    """Clé stable d'un joueur dans l'état d'ingestion"""
+    if ligne.get('cle'):
+        return ligne['cle']
+    return f"{normaliser_nom(ligne.get('Player'))}|{normaliser_nom(ligne.get('Squad'))}"
+
+
+def _nombre(valeur):
+    try:
+        valeur = float(valeur)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(valeur) else valeur
+
+
+class EtatIngestion:
+    """Totaux courants par joueur et sketches par (championnat, saison, poste, stat)"""
+
+    def __init__(self):
+        self.joueurs = {}
+        self.sketches = {}
+        self.matchs_vus = set()
+
+    # --- Distributions ---
+
+    @staticmethod
+    def _cle_sketch(joueur, stat):
+        return f"{joueur['comp']}|{joueur['saison']}|{joueur['groupe']}|{stat}"
+
+    def _sketch(self, cle):
+        if cle not in self.sketches:
+            self.sketches[cle] = SketchQuantiles()
+        return self.sketches[cle]
+
+    @staticmethod
+    def _taux(joueur, stat):
+        return joueur[stat] / joueur['Min'] * 90 if joueur['Min'] > 0 else 0.0
+
+    def _retirer_distribution(self, joueur):
+        if joueur['Min'] >= MIN_MINUTES_DISTRIBUTION:
+            for stat in STATS_INGESTION:
+                self._sketch(self._cle_sketch(joueur, stat)).retirer(self._taux(joueur, stat))
+
+    def _ajouter_distribution(self, joueur):
+        if joueur['Min'] >= MIN_MINUTES_DISTRIBUTION:
+            for stat in STATS_INGESTION:
+                self._sketch(self._cle_sketch(joueur, stat)).ajouter(self._taux(joueur, stat))
+
+    # --- Mises à jour ---
+
+    def appliquer(self, ligne, saison, remplacer=False):
+        """Ajoute une ligne (match ou total de saison) aux totaux d'un joueur"""
+        cle = cle_joueur(ligne)
+        joueur = self.joueurs.get(cle)
+        if joueur is None:
+            joueur = {
+                'joueur': ligne.get('Player'), 'equipe': ligne.get('Squad'),
+                'comp': ligne.get('Comp') or 'NA', 'saison': str(saison),
+                'groupe': groupe_poste(ligne.get('Pos')), 'matchs': 0, 'Min': 0.0,
+                **{stat: 0.0 for stat in STATS_INGESTION}
+            }
+            self.joueurs[cle] = joueur
+        else:
+            self._retirer_distribution(joueur)
+
+        if remplacer:
+            joueur['Min'] = 0.0
+            joueur.update({stat: 0.0 for stat in STATS_INGESTION})
+            joueur['matchs'] = 0
+        joueur['Min'] += _nombre(ligne.get('Min'))
+        for stat in STATS_INGESTION:
+            joueur[stat] += _nombre(ligne.get(stat))
+        joueur['matchs'] += int(_nombre(ligne.get('MP'))) if remplacer else 1
+
+        self._ajouter_distribution(joueur)
+        return cle
+
+    def ingerer_match(self, lignes, saison):
+        """Ingère les lignes joueur d'une journée; les couples (match, joueur) déjà vus sont ignorés"""
+        ingerees = 0
+        for ligne in lignes:
+            identifiant = f"{ligne.get('match_id')}|{cle_joueur(ligne)}"
+            if ligne.get('match_id') is not None and identifiant in self.matchs_vus:
+                continue
+            self.appliquer(ligne, saison)
+            if ligne.get('match_id') is not None:
+                self.matchs_vus.add(identifiant)
+            ingerees += 1
+        return ingerees
+
+    def amorcer(self, df, saison):
+        """Initialise les totaux à partir d'un CSV de saison (remplace les totaux existants)"""
+        for ligne in df.to_dict('records'):
+            self.appliquer(ligne, saison, remplacer=True)
+
+    # --- Consultation ---
+
+    def profil(self, cle):
+        """Totaux et taux par 90 courants d'un joueur"""
+        joueur = self.joueurs.get(cle)
+        if joueur is None:
+            return None
+        return {**joueur, 'par_90': {stat: round(self._taux(joueur, stat), 3)
+                                      for stat in STATS_INGESTION}}
+
+    def percentile(self, cle, stat, inter_ligues=False):
+        """Percentile du joueur dans son championnat, ou toutes ligues confondues (fusion)"""
+        joueur = self.joueurs.get(cle)
+        if joueur is None:
+            return None
+        if inter_ligues:
+            suffixe = f"|{joueur['saison']}|{joueur['groupe']}|{stat}"
+            sketch = SketchQuantiles()
+            for cle_sketch, partiel in self.sketches.items():
+                if cle_sketch.endswith(suffixe):
+                    sketch = sketch.fusionner(partiel)
+        else:
+            sketch = self.sketches.get(self._cle_sketch(joueur, stat))
+        if sketch is None:
+            return None
+        valeur = sketch.percentile(self._taux(joueur, stat))
+        return round(valeur, 1) if valeur is not None else None
+
+    def rechercher(self, nom, equipe=None):
+        """Clés des joueurs dont le nom (et l'équipe) contient la recherche"""
+        nom, equipe = normaliser_nom(nom), normaliser_nom(equipe) if equipe else None
+        return [cle for cle, j in self.joueurs.items()
+                if nom in normaliser_nom(j['joueur'])
+                and (equipe is None or equipe in normaliser_nom(j['equipe']))]
+
+    # --- Persistance ---
+
+    def sauvegarder(self, chemin=None):
+        chemin = chemin or ETAT_PATH
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        donnees = {
+            'joueurs': self.joueurs,
+            'sketches': {cle: s.vers_dict() for cle, s in self.sketches.items()},
+            'matchs_vus': sorted(self.matchs_vus)
+        }
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(donnees, f, ensure_ascii=False)
+        os.replace(tmp, chemin)
+
+    @classmethod
+    def charger(cls, chemin=None):
+        etat = cls()
+        try:
+            with open(chemin or ETAT_PATH, 'r', encoding='utf-8') as f:
+                donnees = json.load(f)
+        except FileNotFoundError:
+            return etat
+        etat.joueurs = donnees['joueurs']
+        etat.sketches = {cle: SketchQuantiles.depuis_dict(s) for cle, s in donnees['sketches'].items()}
+        etat.matchs_vus = set(donnees['matchs_vus'])
+        return etat
+
+
+def lire_lignes(chemin):
+    """Lit des lignes joueur-match depuis un CSV ou un fichier JSON Lines"""
+    if chemin.endswith('.jsonl') or chemin.endswith('.ndjson'):
+        with open(chemin, 'r', encoding='utf-8') as f:
+            return [json.loads(l) for l in f if l.strip()]
+    return pd.read_csv(chemin).to_dict('records')
+
+
+def main():
+    """Point d'entrée: seed [csv] [saison] | ingest <fichier> [saison] | percentile '<json>'"""
+    if len(sys.argv) < 2:
+        print("Usage: python match_ingestion.py <seed|ingest|percentile> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+    etat = EtatIngestion.charger()
+
+    if action == "seed":
+        csv_path = resoudre_csv(sys.argv[2] if len(sys.argv) > 2 else None)
+        saison = sys.argv[3] if len(sys.argv) > 3 else '2024-2025'
+        etat.amorcer(pd.read_csv(csv_path), saison)
+        etat.sauvegarder()
+        print(json.dumps({"success": True, "joueurs": len(etat.joueurs)}))
+
+    elif action == "ingest":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Fichier de lignes requis"}))
+            sys.exit(1)
+        saison = sys.argv[3] if len(sys.argv) > 3 else '2024-2025'
+        ingerees = etat.ingerer_match(lire_lignes(sys.argv[2]), saison)
+        etat.sauvegarder()
+        print(json.dumps({"success": True, "lignes_ingerees": ingerees, "joueurs": len(etat.joueurs)}))
+
+    elif action == "percentile":
+        params = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+        cles = etat.rechercher(params.get('joueur', ''), params.get('equipe'))
+        if not cles:
+            print(json.dumps({"success": False, "error": "Joueur non trouvé"}))
+            return
+        stats = params.get('stats') or STATS_INGESTION
+        inter_ligues = params.get('inter_ligues', False)
+        print(json.dumps({
+            "success": True,
+            "profil": etat.profil(cles[0]),
+            "percentiles": {s: etat.percentile(cles[0], s, inter_ligues) for s in stats}
+        }, ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+NDJSON Stream - Sortie ligne par ligne (NDJSON) avec pagination par curseur et projection
+Les lignes sont produites par des générateurs et écrites au fil de l'eau: la mémoire reste
+constante quelle que soit la taille du résultat et les premières lignes partent tout de suite.
+"""
+
+import sys
+import json
+import base64
+import itertools
+from datetime import datetime, date
+import pandas as pd
+
+# Taille des blocs lus dans les CSV volumineux
+TAILLE_BLOC_CSV = 5000
+
+# Nombre de lignes écrites entre deux flush (la première ligne est toujours flushée)
+FLUSH_TOUTES_LES = 200
+
+
+def encoder_curseur(position):
+    """Encode une position de lecture en curseur opaque"""
+    return base64.urlsafe_b64encode(json.dumps({'o': int(position)}).encode()).decode()
+
+
+def decoder_curseur(curseur):
+    """Décode un curseur (None -> début du résultat, ValueError si invalide)"""
+    if not curseur:
+        return 0
+    try:
+        return max(0, int(json.loads(base64.urlsafe_b64decode(curseur.encode()))['o']))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Curseur invalide: {curseur}")
+
+
+def valeur_json(valeur):
+    """Convertit une valeur pandas/NumPy en type sérialisable"""
+    if isinstance(valeur, (list, dict)):
+        return valeur
+    if pd.isna(valeur):
+        return None
+    if isinstance(valeur, (pd.Timestamp, datetime, date)):
+        return valeur.isoformat()
+    if hasattr(valeur, 'item'):
+        return valeur.item()
+    return valeur
+
+
+def _aplatir_colonne(colonne):
+    """Nom de colonne lisible pour les MultiIndex soccerdata ('Performance', 'Gls') -> 'Performance_Gls'"""
+    if isinstance(colonne, tuple):
+        return '_'.join(str(c) for c in colonne if c not in ('', None))
+    return str(colonne)
+
+
+def iterer_dataframe(df, colonnes=None, debut=0):
+    """Génère les lignes d'un DataFrame (index remis en colonnes) sans tout convertir"""
+    if df.index.name is not None or isinstance(df.index, pd.MultiIndex):
+        df = df.reset_index()
+    noms = [_aplatir_colonne(c) for c in df.columns]
+    if colonnes:
+        positions = [i for i, nom in enumerate(noms) if nom in colonnes]
+        df = df.iloc[:, positions]
+        noms = [noms[i] for i in positions]
+    for ligne in df.iloc[debut:].itertuples(index=False, name=None):
+        yield {nom: valeur_json(v) for nom, v in zip(noms, ligne)}
+
+
+def iterer_csv(chemin, colonnes=None, debut=0, taille_bloc=TAILLE_BLOC_CSV):
+    """Génère les lignes d'un CSV bloc par bloc (projection appliquée à la lecture)"""
+    usecols = (lambda c: c in colonnes) if colonnes else None
+    lecteur = pd.read_csv(chemin, usecols=usecols, chunksize=taille_bloc,
+                          skiprows=range(1, debut + 1) if debut else None)
+    for bloc in lecteur:
+        yield from iterer_dataframe(bloc.reset_index(drop=True))
+
+
+def iterer_jsonl(chemin, colonnes=None, debut=0):
+    """Génère les objets d'un fichier JSON Lines (ex: résultats de lots)"""
+    with open(chemin, 'r', encoding='utf-8') as f:
+        for ligne in itertools.islice(f, debut, None):
+            if not ligne.strip():
+                continue
+            objet = json.loads(ligne)
+            yield {k: v for k, v in objet.items() if k in colonnes} if colonnes else objet
+
+
+def paginer(lignes, debut=0, limit=None):
+    """Limite un générateur et calcule le curseur suivant (une ligne d'avance suffit)"""
+    if limit is not None and limit <= 0:
+        raise ValueError(f"limit doit être strictement positif: {limit}")
+    if limit is None:
+        yield from lignes
+        return None
+    emises = 0
+    for ligne in lignes:
+        if emises == limit:
+            return encoder_curseur(debut + emises)
+        yield ligne
+        emises += 1
+    return None
+
+
+def ecrire_ndjson(lignes, sortie=None):
+    """Écrit chaque ligne en NDJSON puis une ligne finale '_meta' (curseur suivant, erreurs)"""
+    sortie = sortie or sys.stdout
+    meta = {'lignes': 0, 'next_cursor': None}
+    try:
+        # Le générateur paginé retourne le curseur suivant via StopIteration
+        while True:
+            ligne = next(lignes)
+            sortie.write(json.dumps(ligne, ensure_ascii=False) + '\n')
+            meta['lignes'] += 1
+            if meta['lignes'] == 1 or meta['lignes'] % FLUSH_TOUTES_LES == 0:
+                sortie.flush()
+    except StopIteration as fin:
+        meta['next_cursor'] = fin.value
+    except Exception as e:
+        meta['error'] = str(e)
+    sortie.write(json.dumps({'_meta': meta}) + '\n')
+    sortie.flush()
+    return meta
+
+
+def flux(source, params):
+    """Construit le générateur paginé d'une source à partir des paramètres limit/cursor/columns"""
+    debut = decoder_curseur(params.get('cursor'))
+    limit = params.get('limit')
+    limit = int(limit) if limit is not None else None
+    colonnes = params.get('columns')
+    return paginer(source(colonnes, debut), debut, limit)
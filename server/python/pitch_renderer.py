@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Pitch Renderer - Rendu serveur des heatmaps de terrain et radars de percentiles (PNG)
+Backend Agg, rendu par lots dans un pool de processus, images stockées sous le hash de
+leurs données d'entrée (une requête identique n'est jamais rendue deux fois) avec
+éviction des plus anciennes images au-delà d'une taille totale.
+"""
+
+import os
+import io
+import sys
+import json
+import base64
+import hashlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.patches import Rectangle, Circle
+
+from player_dataset import CACHE_DIR
+
+try:
+    from mplsoccer import Pitch
+    MPLSOCCER_AVAILABLE = True
+except ImportError:
+    MPLSOCCER_AVAILABLE = False
+
+IMAGES_DIR = os.environ.get('PITCH_IMAGES_DIR', os.path.join(CACHE_DIR, 'images'))
+TAILLE_MAX_CACHE = int(os.environ.get('PITCH_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Dimensions du terrain (repère StatsBomb, comme mplsoccer par défaut)
+LONGUEUR, LARGEUR = 120, 80
+
+# Version du rendu: à incrémenter quand le style graphique change
+VERSION_RENDU = 1
+
+
+class CacheImages:
+    """Cache adressé par contenu: <dossier>/<hash[:2]>/<hash>.png"""
+
+    def __init__(self, dossier=None, taille_max=TAILLE_MAX_CACHE):
+        self.dossier = dossier or IMAGES_DIR
+        self.taille_max = taille_max
+
+    @staticmethod
+    def cle(demande):
+        """Hash stable de la demande (type, données, options)"""
+        contenu = json.dumps({'v': VERSION_RENDU, **demande}, sort_keys=True,
+                             ensure_ascii=False, default=float)
+        return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+    def chemin(self, cle):
+        return os.path.join(self.dossier, cle[:2], f"{cle}.png")
+
+    def lire(self, cle):
+        """Retourne le chemin de l'image si elle existe (et la marque comme récente)"""
+        chemin = self.chemin(cle)
+        if not os.path.exists(chemin):
+            return None
+        os.utime(chemin)
+        return chemin
+
+    def ecrire(self, cle, png, evincer=True):
+        """Écrit l'image de façon atomique puis applique l'éviction (sauf evincer=False:
+        l'appelant évince une seule fois après un lot, le parcours du dossier étant O(N))"""
+        chemin = self.chemin(cle)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(png)
+        os.replace(tmp, chemin)
+        if evincer:
+            self.evincer(garder={chemin})
+        return chemin
+
+    def evincer(self, garder=()):
+        """Supprime les images les moins récemment utilisées au-delà de la taille max
+        (sauf celles de garder, ex: les images du lot en cours)"""
+        fichiers = []
+        for racine, _, noms in os.walk(self.dossier):
+            for nom in noms:
+                if nom.endswith('.png'):
+                    chemin = os.path.join(racine, nom)
+                    try:
+                        stat = os.stat(chemin)
+                    except FileNotFoundError:
+                        continue
+                    fichiers.append((stat.st_mtime, stat.st_size, chemin))
+        total = sum(taille for _, taille, _ in fichiers)
+        for _, taille, chemin in sorted(fichiers):
+            if total <= self.taille_max:
+                break
+            if chemin in garder:
+                continue
+            try:
+                os.remove(chemin)
+                total -= taille
+            except FileNotFoundError:
+                pass
+
+
+def _dessiner_terrain(ax):
+    """Terrain simplifié quand mplsoccer n'est pas disponible"""
+    ax.set_facecolor('#22543d')
+    couleur = 'white'
+    ax.add_patch(Rectangle((0, 0), LONGUEUR, LARGEUR, fill=False, color=couleur, lw=1.5))
+    ax.plot([LONGUEUR / 2, LONGUEUR / 2], [0, LARGEUR], color=couleur, lw=1.5)
+    ax.add_patch(Circle((LONGUEUR / 2, LARGEUR / 2), 10, fill=False, color=couleur, lw=1.5))
+    for x in (0, LONGUEUR - 18):
+        ax.add_patch(Rectangle((x, 18), 18, 44, fill=False, color=couleur, lw=1.5))
+    for x in (0, LONGUEUR - 6):
+        ax.add_patch(Rectangle((x, 30), 6, 20, fill=False, color=couleur, lw=1.5))
+    ax.set_xlim(-2, LONGUEUR + 2)
+    ax.set_ylim(-2, LARGEUR + 2)
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+
+def _figure_png(fig):
+    tampon = io.BytesIO()
+    fig.savefig(tampon, format='png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return tampon.getvalue()
+
+
+def rendre_heatmap(grille, titre=''):
+    """Heatmap de terrain; grille 10x10 de l'analyseur (ligne 0 = zone offensive)"""
+    donnees = np.asarray(grille, dtype=float)[::-1].T  # défense à gauche, attaque à droite
+    if MPLSOCCER_AVAILABLE:
+        pitch = Pitch(pitch_type='statsbomb', pitch_color='#22543d', line_color='white')
+        fig, ax = pitch.draw(figsize=(8, 5.5))
+    else:
+        fig, ax = plt.subplots(figsize=(8, 5.5))
+        _dessiner_terrain(ax)
+    ax.imshow(donnees, extent=(0, LONGUEUR, 0, LARGEUR), origin='lower', cmap='hot',
+              alpha=0.6, interpolation='bilinear', vmin=0, vmax=1, zorder=2)
+    if titre:
+        ax.set_title(titre, fontsize=12)
+    return _figure_png(fig)
+
+
+def rendre_radar(percentiles, titre=''):
+    """Radar des percentiles (0-100)"""
+    libelles = list(percentiles.keys())
+    valeurs = [float(v) for v in percentiles.values()]
+    angles = np.linspace(0, 2 * np.pi, len(libelles), endpoint=False).tolist()
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw={'polar': True})
+    ax.plot(angles + angles[:1], valeurs + valeurs[:1], color='#1f77b4', lw=2)
+    ax.fill(angles + angles[:1], valeurs + valeurs[:1], color='#1f77b4', alpha=0.3)
+    ax.set_xticks(angles)
+    ax.set_xticklabels(libelles)
+    ax.set_ylim(0, 100)
+    if titre:
+        ax.set_title(titre, fontsize=12, pad=20)
+    return _figure_png(fig)
+
+
+RENDUS = {
+    'heatmap': lambda d: rendre_heatmap(d['donnees'], d.get('titre', '')),
+    'radar': lambda d: rendre_radar(d['donnees'], d.get('titre', ''))
+}
+
+
+def _rendre_demande(demande):
+    """Worker du pool: produit le PNG d'une demande, ou le résultat d'échec de cette demande
+    (une donnée invalide n'interrompt pas le reste du lot)"""
+    try:
+        return RENDUS[demande['type']](demande)
+    except Exception as e:
+        return {'success': False, 'error': f"Rendu impossible: {str(e)}"}
+
+
+def completer_demandes(demandes):
+    """Remplace les demandes par nom de joueur par leurs données (heatmap/percentiles)"""
+    a_completer = [d for d in demandes if 'donnees' not in d and d.get('joueur')]
+    if not a_completer:
+        return demandes
+    from enhanced_player_analyzer import EnhancedPlayerAnalyzer
+    with contextlib.redirect_stdout(sys.stderr):
+        analyzer = EnhancedPlayerAnalyzer()
+    for demande in a_completer:
+        joueur = analyzer.search_player(demande['joueur'], demande.get('equipe'))
+        if joueur is None:
+            demande['erreur'] = f"Joueur '{demande['joueur']}' non trouvé"
+            continue
+        demande.setdefault('titre', f"{joueur['Player']} - {joueur['Squad']}")
+        if demande['type'] == 'heatmap':
+            demande['donnees'] = analyzer.generate_heatmap_data(joueur)
+        else:
+            demande['donnees'] = analyzer.calculate_percentiles(joueur)
+    return demandes
+
+
+def rendre_lot(demandes, cache=None, processus=None, inclure_base64=False):
+    """Rend un lot d'images: les hits du cache sont servis, les autres rendus en parallèle"""
+    cache = cache or CacheImages()
+    resultats = [None] * len(demandes)
+    a_rendre = {}
+
+    for i, demande in enumerate(demandes):
+        if demande.get('erreur') or demande.get('type') not in RENDUS:
+            resultats[i] = {'success': False,
+                            'error': demande.get('erreur') or f"Type inconnu: {demande.get('type')}"}
+            continue
+        entree = {k: demande.get(k) for k in ('type', 'donnees', 'titre')}
+        cle = cache.cle(entree)
+        chemin = cache.lire(cle)
+        if chemin:
+            resultats[i] = {'success': True, 'cle': cle, 'chemin': chemin, 'cache': True}
+        else:
+            # Demandes identiques dans le lot: un seul rendu
+            a_rendre.setdefault(cle, (entree, []))[1].append(i)
+
+    if a_rendre:
+        cles = list(a_rendre)
+        entrees = [a_rendre[cle][0] for cle in cles]
+        if len(entrees) == 1:
+            images = [_rendre_demande(entrees[0])]
+        else:
+            nb = max(1, min(processus or os.cpu_count() or 1, len(entrees)))
+            with ProcessPoolExecutor(max_workers=nb) as pool:
+                images = list(pool.map(_rendre_demande, entrees))
+        for cle, png in zip(cles, images):
+            if isinstance(png, dict):
+                for i in a_rendre[cle][1]:
+                    resultats[i] = dict(png)
+                continue
+            chemin = cache.ecrire(cle, png, evincer=False)
+            for i in a_rendre[cle][1]:
+                resultats[i] = {'success': True, 'cle': cle, 'chemin': chemin, 'cache': False}
+
+    if inclure_base64:
+        for resultat in resultats:
+            if resultat.get('success'):
+                with open(resultat['chemin'], 'rb') as f:
+                    resultat['image_base64'] = base64.b64encode(f.read()).decode('ascii')
+
+    # Une seule éviction par lot, et seulement s'il a écrit de nouvelles images
+    if any(r.get('success') and not r['cache'] for r in resultats):
+        cache.evincer(garder={r['chemin'] for r in resultats if r.get('success')})
+    return resultats
+
+
+def main():
+    """Point d'entrée: render '<json demande>' | render_lot '<json {demandes: [...]}>'"""
+    if len(sys.argv) != 3:
+        print(json.dumps({'success': False, 'error': 'Invalid arguments'}))
+        sys.exit(1)
+
+    action = sys.argv[1]
+    params = json.loads(sys.argv[2])
+
+    if action == 'render':
+        demandes = completer_demandes([params])
+        result = rendre_lot(demandes, inclure_base64=params.get('inclure_base64', False))[0]
+    elif action == 'render_lot':
+        demandes = completer_demandes(params.get('demandes', []))
+        result = {
+            'success': True,
+            'images': rendre_lot(demandes, processus=params.get('processus'),
+                                 inclure_base64=params.get('inclure_base64', False))
+        }
+    else:
+        result = {'success': False, 'error': 'Unknown action'}
+
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Outils partagés autour du fichier CSV des joueurs (chemins, empreintes, normalisation)
+"""
+
+import os
+import re
+import json
+import hashlib
+import unicodedata
+
+# Fichier CSV par défaut (relatif au répertoire de lancement, comme le serveur Node)
+DEFAULT_CSV_PATH = "players_data-2024_2025_1751387048911.csv"
+
+# Racine du dépôt (server/python -> racine)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Répertoire des caches et artefacts générés
+CACHE_DIR = os.environ.get('PLAYERSTATS_CACHE_DIR', os.path.join(REPO_ROOT, '.cache'))
+
+# Modèle de styles de jeu (centroïdes k-means), partie de l'instantané des données
+STYLE_MODEL_PATH = os.environ.get('STYLE_MODEL_PATH', os.path.join(CACHE_DIR, 'style_clusters.json'))
+
+# Statistiques comparées en percentiles par l'analyseur
+STATS_PERCENTILES = ['Gls', 'Ast', 'xG', 'xAG', 'PrgP', 'PrgC', 'PrgR']
+
+# Nombre minimum de joueurs au même poste avant de comparer à tout le championnat
+MIN_JOUEURS_POSTE = 5
+
+# Groupes de postes (premier poste listé dans la colonne Pos, ex: "MF,FW" -> "MF")
+GROUPES_POSTES = ['GK', 'DF', 'MF', 'FW']
+
+# Tranches d'âge utilisées pour les agrégats (bornes inclusives basses)
+TRANCHES_AGE = [(0, '<21'), (21, '21-24'), (25, '25-28'), (29, '29-32'), (33, '33+')]
+
+
+def resoudre_csv(csv_path=None):
+    """Retourne le chemin du CSV, en cherchant aussi depuis la racine du dépôt"""
+    csv_path = csv_path or DEFAULT_CSV_PATH
+    if os.path.exists(csv_path) or os.path.isabs(csv_path):
+        return csv_path
+    candidat = os.path.join(REPO_ROOT, csv_path)
+    return candidat if os.path.exists(candidat) else csv_path
+
+
+def empreinte_fichier(path, taille_bloc=1 << 20):
+    """Calcule l'empreinte SHA-256 (16 caractères) du contenu d'un fichier"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            h.update(bloc)
+    return h.hexdigest()[:16]
+
+
+def empreinte_memorisee(path):
+    """empreinte_fichier, recalculée seulement si la taille ou la date de modification change"""
+    stat = os.stat(path)
+    signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+    registre_path = os.path.join(CACHE_DIR, 'empreintes.json')
+    try:
+        with open(registre_path, 'r', encoding='utf-8') as f:
+            registre = json.load(f)
+    except (FileNotFoundError, ValueError):
+        registre = {}
+    cle = os.path.abspath(path)
+    entree = registre.get(cle)
+    if entree and entree.get('signature') == signature:
+        return entree['empreinte']
+
+    empreinte = empreinte_fichier(path)
+    registre[cle] = {'signature': signature, 'empreinte': empreinte}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{registre_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(registre, f)
+    os.replace(tmp, registre_path)
+    return empreinte
+
+
+def normaliser_nom(nom):
+    """Normalise un nom: minuscules, sans accents ni espaces superflus"""
+    if not isinstance(nom, str):
+        return ''
+    decompose = unicodedata.normalize('NFKD', nom)
+    sans_accents = ''.join(c for c in decompose if not unicodedata.combining(c))
+    return ' '.join(sans_accents.lower().split())
+
+
+def motif_prefixes(requete):
+    """Expression régulière: chaque mot de la recherche (sans accents) commence un mot du nom"""
+    mots = normaliser_nom(requete).split()
+    return ''.join(rf'(?=.*\b{re.escape(mot)})' for mot in mots) or None
+
+
+def groupe_poste(position):
+    """Retourne le groupe de poste principal d'une position FBref"""
+    if not isinstance(position, str) or len(position) < 2:
+        return 'NA'
+    groupe = position[:2]
+    return groupe if groupe in GROUPES_POSTES else 'NA'
+
+
+def groupes_postes(positions):
+    """Version vectorisée de groupe_poste pour une Series pandas"""
+    groupes = positions.fillna('').astype(str).str[:2]
+    return groupes.where(groupes.isin(GROUPES_POSTES), 'NA')
+
+
+def tranches_age(ages):
+    """Affecte une tranche d'âge à chaque valeur d'une Series pandas"""
+    # Import local: les lecteurs légers (store de profils) n'ont pas besoin de pandas
+    import pandas as pd
+    bornes = [b for b, _ in TRANCHES_AGE] + [200]
+    libelles = [l for _, l in TRANCHES_AGE]
+    tranches = pd.cut(ages, bins=bornes, labels=libelles, right=False)
+    return tranches.astype(object).where(tranches.notna(), 'NA')
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Player Entities - Table des joueurs (entités) construite au chargement du CSV
+Un joueur transféré en cours de saison a une ligne par club. Les lignes sont regroupées
+par clé stable (nom + année de naissance + nation) et chaque entité reçoit une ligne de
+saison fusionnée: volumes additionnés, taux pondérés par les minutes, informations du club
+où il a le plus joué. La table est mise en cache par empreinte du CSV; les recherches
+combinées ou par club passent par des dictionnaires, sans groupby.
+"""
+
+import os
+import re
+import sys
+import json
+import pickle
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, resoudre_csv, empreinte_memorisee, normaliser_nom, motif_prefixes
+
+# Version du format de la table en cache (recalcul si elle change)
+VERSION_TABLE = 2
+
+# Colonnes formant la clé d'entité
+COLONNES_CLE = ['Player', 'Born', 'Nation']
+
+# Colonnes texte jointes sur la ligne fusionnée (ordre des lignes du CSV)
+COLONNES_JOINTES = ['Squad', 'Comp']
+
+# Nombre de clubs de l'entité, ajouté à chaque ligne fusionnée
+COLONNE_NB_CLUBS = 'Nb_clubs'
+
+# Ratios (hors %, /90 et *90): moyenne pondérée par les minutes plutôt que somme
+RATIOS = {'G/Sh', 'G/SoT', 'Dist', 'npxG/Sh', 'Mn/MP', 'Mn/Start', 'Mn/Sub', 'PPM', 'On-Off',
+          'PSxG/SoT', 'AvgLen', 'AvgDist'}
+
+# Identité du joueur: reprise de la ligne principale (club où il a le plus joué)
+PREFIXES_IDENTITE = ('Rk', 'Player', 'Nation', 'Pos', 'Age', 'Born')
+
+
+def _base(colonne):
+    """Nom FBref sans suffixe de table (ex: 'Cmp%_stats_keeper_adv' -> 'Cmp%')"""
+    return colonne.split('_stats_')[0]
+
+
+def est_taux(colonne):
+    """Vrai pour les pourcentages, taux par 90 et ratios (fusionnés par moyenne pondérée)"""
+    base = _base(colonne)
+    return '%' in base or bool(re.search(r'90$', base)) or base in RATIOS
+
+
+def est_identite(colonne):
+    return _base(colonne) in PREFIXES_IDENTITE
+
+
+def _cle(nom_normalise, naissance, nation):
+    naissance = '' if pd.isna(naissance) else str(int(naissance))
+    nation = '' if not isinstance(nation, str) else nation.strip()
+    return f"{nom_normalise}|{naissance}|{nation}"
+
+
+def cle_entite(nom, naissance, nation):
+    """Clé stable d'un joueur: nom normalisé | année de naissance | nation"""
+    return _cle(normaliser_nom(nom), naissance, nation)
+
+
+def _minutes(df):
+    return pd.to_numeric(df['Min'], errors='coerce').fillna(0).clip(lower=0).to_numpy() \
+        if 'Min' in df.columns else np.zeros(len(df))
+
+
+def lignes_principales(minutes, entites):
+    """Position de la ligne principale de chaque entité (par code croissant): celle où le
+    joueur a le plus joué, la première en cas d'égalité"""
+    ordre = np.lexsort((np.arange(len(entites)), -minutes, entites))
+    premieres = np.r_[True, entites[ordre][1:] != entites[ordre][:-1]]
+    return ordre[premieres]
+
+
+def fusionner_lignes(df, entites):
+    """Ligne de saison fusionnée de chaque entité (entites: code d'entité par ligne)"""
+    minutes = _minutes(df)
+    fusion = df.iloc[lignes_principales(minutes, entites)].reset_index(drop=True)
+
+    numeriques = [c for c in df.columns if df[c].dtype.kind in 'iuf' and not est_identite(c)]
+    valeurs = df[numeriques].astype(float)
+    groupes = valeurs.groupby(entites, sort=True)
+    parties = []
+
+    volumes = [c for c in numeriques if not est_taux(c)]
+    if volumes:
+        sommes = groupes[volumes].sum(min_count=1)
+        # Les colonnes entières n'ont pas de valeur manquante: elles restent entières
+        entieres = [c for c in volumes if df[c].dtype.kind in 'iu']
+        parties.append(sommes.astype({c: df[c].dtype for c in entieres}))
+
+    taux = [c for c in numeriques if est_taux(c)]
+    if taux:
+        presents = valeurs[taux].notna()
+        poids = presents.mul(minutes, axis=0)
+        somme_poids = poids.groupby(entites, sort=True).sum().to_numpy()
+        ponderes = valeurs[taux].fillna(0).mul(poids).groupby(entites, sort=True).sum().to_numpy()
+        # Sans minutes pour ce taux: moyenne simple des valeurs présentes
+        moyennes = groupes[taux].mean()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            parties.append(pd.DataFrame(np.where(somme_poids > 0, ponderes / somme_poids, moyennes.to_numpy()),
+                                        index=moyennes.index, columns=taux))
+
+    codes, nb_clubs = np.unique(entites, return_counts=True)
+    for colonne in COLONNES_JOINTES:
+        if colonne in df.columns:
+            valeurs_texte = {code: {} for code in codes}
+            for code, valeur in zip(entites, df[colonne]):
+                if isinstance(valeur, str):
+                    valeurs_texte[code][valeur] = None
+            parties.append(pd.Series([', '.join(v) for v in valeurs_texte.values()], index=codes, name=colonne))
+    parties.append(pd.Series(nb_clubs, index=codes, name=COLONNE_NB_CLUBS))
+
+    # Index = code d'entité; colonnes dans l'ordre du CSV
+    fusion.index = codes
+    remplacees = pd.concat(parties, axis=1)
+    fusion = pd.concat([fusion.drop(columns=[c for c in remplacees.columns if c in fusion.columns]),
+                        remplacees], axis=1)
+    return fusion[list(df.columns) + [COLONNE_NB_CLUBS]]
+
+
+def premiere_correspondance(noms, noms_min, equipes_min, nom, equipe=None):
+    """Première ligne dont les mots du nom commencent par ceux de la recherche, sinon dont le
+    nom contient la recherche (équipe: sous-chaîne); mêmes règles pour tous les backends"""
+    filtre = equipes_min.str.contains(str(equipe).lower(), regex=False) if equipe else None
+    motif = motif_prefixes(nom)
+    candidats = [noms.str.contains(motif)] if motif else []
+    candidats.append(noms_min.str.contains(str(nom).lower(), regex=False))
+    for masque in candidats:
+        if filtre is not None:
+            masque = masque & filtre
+        positions = np.flatnonzero(masque.to_numpy())
+        if len(positions):
+            return int(positions[0])
+    return None
+
+
+class TableEntites:
+    """Lignes par club et lignes fusionnées, avec index de recherche en mémoire"""
+
+    def __init__(self, par_club, entites, cles, lignes, noms, equipes, par_nom, par_nom_club):
+        self.par_club = par_club
+        self.entites = entites
+        self.cles = cles
+        self.lignes = lignes
+        self.nb_clubs = lignes[COLONNE_NB_CLUBS].to_numpy()
+        # Noms et équipes normalisés des lignes par club (recherche exacte et par préfixes)
+        self.noms = noms
+        self.equipes = equipes
+        self._par_nom = par_nom
+        self._par_nom_club = par_nom_club
+        self._noms_min = par_club['Player'].fillna('').astype(str).str.lower()
+        self._equipes_min = par_club['Squad'].fillna('').astype(str).str.lower()
+        self._lignes_dict = {}
+
+    @classmethod
+    def construire(cls, df):
+        """Regroupe les lignes par entité et calcule les lignes fusionnées"""
+        # Copie consolidée: les sélections de lignes restent rapides sur ~300 colonnes
+        par_club = df.reset_index(drop=True).copy()
+        noms = par_club['Player'].map(normaliser_nom)
+        absentes = pd.Series([None] * len(par_club))
+        cles = [_cle(nom, naissance, nation) for nom, naissance, nation in zip(
+            noms, par_club.get('Born', absentes), par_club.get('Nation', absentes))]
+        # Codes dans l'ordre de première apparition: l'entité 0 est celle de la première ligne
+        codes, uniques = pd.factorize(pd.Series(cles, dtype=object), sort=False)
+        entites = codes.astype(np.int64)
+        nb_clubs = np.bincount(entites, minlength=len(uniques))
+
+        # Fusion calculée seulement pour les entités à plusieurs lignes
+        multiples = nb_clubs[entites] > 1
+        seules = par_club[~multiples].assign(**{COLONNE_NB_CLUBS: 1})
+        seules.index = entites[~multiples]
+        lignes = pd.concat(
+            [seules, fusionner_lignes(par_club[multiples], entites[multiples])]
+        ).sort_index() if multiples.any() else seules
+
+        equipes = par_club['Squad'].map({e: normaliser_nom(e) for e in par_club['Squad'].unique()})
+        par_nom = {}
+        par_nom_club = {}
+        for i, (nom, equipe) in enumerate(zip(noms, equipes)):
+            par_nom.setdefault(nom, i)
+            par_nom_club.setdefault((nom, equipe), i)
+        return cls(par_club, entites, list(uniques), lignes, noms, equipes, par_nom, par_nom_club)
+
+    def vers_dict(self):
+        """Partie précalculée (sans les lignes par club, relues depuis le CSV)"""
+        return {'entites': self.entites, 'cles': self.cles, 'lignes': self.lignes,
+                'noms': self.noms, 'equipes': self.equipes,
+                'par_nom': self._par_nom, 'par_nom_club': self._par_nom_club}
+
+    @classmethod
+    def depuis_dict(cls, df, donnees):
+        return cls(df.reset_index(drop=True).copy(), donnees['entites'], donnees['cles'], donnees['lignes'],
+                   donnees['noms'], donnees['equipes'], donnees['par_nom'], donnees['par_nom_club'])
+
+    def __len__(self):
+        return len(self.cles)
+
+    def ligne_entite(self, entite):
+        """Ligne de saison (fusionnée si plusieurs clubs) d'une entité"""
+        if entite not in self._lignes_dict:
+            self._lignes_dict[entite] = self.lignes.iloc[entite].to_dict()
+        return self._lignes_dict[entite]
+
+    def ligne_club(self, position):
+        """Ligne d'origine (un club) à une position du CSV"""
+        return self.par_club.iloc[position].to_dict()
+
+    def principales(self):
+        """Position de la ligne par club principale de chaque entité (alignée sur lignes)"""
+        return lignes_principales(_minutes(self.par_club), self.entites)
+
+    def clubs(self, entite):
+        """Positions des lignes par club d'une entité"""
+        return np.flatnonzero(self.entites == entite).tolist()
+
+    def trouver(self, nom, equipe=None):
+        """Position de la ligne par club: nom (et équipe) exacts, sinon premiere_correspondance"""
+        nom_normalise = normaliser_nom(nom)
+        if equipe:
+            position = self._par_nom_club.get((nom_normalise, normaliser_nom(equipe)))
+        else:
+            position = self._par_nom.get(nom_normalise)
+        if position is not None:
+            return position
+        return premiere_correspondance(self.noms, self._noms_min, self._equipes_min, nom, equipe)
+
+    def rechercher(self, nom, equipe=None, combine=None):
+        """Ligne du joueur: par club si une équipe est donnée, sinon saison fusionnée"""
+        position = self.trouver(nom, equipe)
+        if position is None:
+            return None
+        if combine is None:
+            combine = not equipe
+        return self.ligne_entite(int(self.entites[position])) if combine else self.ligne_club(position)
+
+
+_TABLES = {}
+
+
+def obtenir_entites(csv_path=None, df=None):
+    """Table des entités du CSV (mémoire, cache disque, puis calcul)"""
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_memorisee(csv_path)
+    if empreinte in _TABLES:
+        return _TABLES[empreinte]
+
+    if df is None:
+        df = pd.read_csv(csv_path)
+    chemin_cache = os.path.join(CACHE_DIR, f"entites_{empreinte}_v{VERSION_TABLE}.pkl")
+    if os.path.exists(chemin_cache):
+        with open(chemin_cache, 'rb') as f:
+            table = TableEntites.depuis_dict(df, pickle.load(f))
+    else:
+        table = TableEntites.construire(df)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{chemin_cache}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(table.vers_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin_cache)
+
+    _TABLES[empreinte] = table
+    return table
+
+
+def main():
+    """Point d'entrée: multi [csv_path] | get <joueur> [equipe]"""
+    if len(sys.argv) < 2:
+        print("Usage: python player_entities.py <multi|get> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "multi":
+        table = obtenir_entites(sys.argv[2] if len(sys.argv) > 2 else None)
+        multiples = table.lignes[table.lignes[COLONNE_NB_CLUBS] > 1]
+        print(json.dumps({
+            "entites": len(table),
+            "lignes": len(table.par_club),
+            "multi_clubs": [{"joueur": j, "clubs": c} for j, c in zip(multiples['Player'], multiples['Squad'])]
+        }, ensure_ascii=False))
+
+    elif action == "get":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom du joueur requis"}))
+            sys.exit(1)
+        table = obtenir_entites()
+        ligne = table.rechercher(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(json.dumps(ligne if ligne is not None else {"error": f"Joueur '{sys.argv[2]}' non trouvé"},
+                         ensure_ascii=False, default=str))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Playing Style Clusters - Styles de jeu appris par k-means sur les stats par 90 minutes
+Ajustement hors ligne par groupe de poste (features standardisées), centroïdes persistés
+en JSON, puis étiquetage vectorisé de tous les joueurs (style + distance au centroïde).
+"""
+
+import os
+import sys
+import json
+import pickle
+import numpy as np
+import pandas as pd
+
+from player_dataset import (
+    CACHE_DIR, STYLE_MODEL_PATH, resoudre_csv, empreinte_fichier, groupes_postes
+)
+from player_entities import obtenir_entites, COLONNE_NB_CLUBS
+
+MODELE_PATH = STYLE_MODEL_PATH
+
+# Version du cache des styles (v2: saisons fusionnées des joueurs à plusieurs clubs)
+VERSION_STYLES = 2
+
+# Minutes minimum pour participer à l'ajustement des centroïdes
+MIN_MINUTES_FIT = 450
+
+# Features par groupe de poste et libellé du style quand la feature domine le centroïde
+FEATURES_STYLE = {
+    'GK': {
+        'Save%': "Gardien décisif sur sa ligne",
+        'Launch%': "Gardien au jeu long",
+        'Stp%': "Gardien dominant dans les airs",
+        '#OPA/90': "Gardien libéro",
+        'Cmp%': "Gardien relanceur court"
+    },
+    'DF': {
+        'Tkl': "Défenseur récupérateur",
+        'Int': "Défenseur d'anticipation",
+        'Clr': "Défenseur de surface",
+        'PrgP': "Défenseur relanceur",
+        'PrgC': "Latéral porteur de balle",
+        'Crs': "Latéral centreur",
+        'Won%': "Défenseur aérien"
+    },
+    'MF': {
+        'PrgP': "Meneur de jeu reculé",
+        'KP': "Créateur",
+        'Tkl': "Milieu récupérateur",
+        'Recov': "Milieu sentinelle",
+        'PrgC': "Milieu box-to-box",
+        'npxG': "Milieu buteur",
+        'Succ': "Milieu dribbleur",
+        'Cmp%': "Milieu métronome"
+    },
+    'FW': {
+        'npxG': "Finisseur",
+        'Sh': "Attaquant tireur",
+        'xAG': "Attaquant créateur",
+        'Succ': "Ailier dribbleur",
+        'PrgR': "Attaquant de profondeur",
+        'Won%': "Pivot aérien",
+        'Att Pen': "Renard des surfaces"
+    }
+}
+
+# Nombre de clusters par groupe de poste
+NB_CLUSTERS = {'GK': 3, 'DF': 5, 'MF': 6, 'FW': 5}
+
+
+def _est_taux(colonne):
+    """Colonnes déjà normalisées (pourcentages, valeurs par 90)"""
+    return '%' in colonne or '/90' in colonne
+
+
+def matrice_features(df, features):
+    """Features par 90 minutes (taux conservés tels quels), NaN pour les joueurs sans minutes"""
+    minutes = pd.to_numeric(df['Min'], errors='coerce')
+    minutes = minutes.where(minutes > 0)
+    colonnes = {}
+    for feature in features:
+        valeurs = pd.to_numeric(df[feature], errors='coerce') if feature in df.columns \
+            else pd.Series(np.nan, index=df.index)
+        colonnes[feature] = valeurs if _est_taux(feature) else valeurs.fillna(0) / minutes * 90
+    return pd.DataFrame(colonnes, index=df.index)
+
+
+def kmeans(X, k, seed=0, iterations=100):
+    """k-means (initialisation k-means++) en NumPy; retourne centroïdes et affectations"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(X))
+    centres = [X[rng.integers(len(X))]]
+    for _ in range(1, k):
+        d2 = ((X[:, None, :] - np.array(centres)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        indice = rng.choice(len(X), p=d2 / total) if total > 0 else rng.integers(len(X))
+        centres.append(X[indice])
+    centres = np.array(centres)
+
+    for _ in range(iterations):
+        distances = ((X[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+        affectations = distances.argmin(axis=1)
+        nouveaux = np.array([
+            X[affectations == j].mean(axis=0) if np.any(affectations == j) else centres[j]
+            for j in range(k)
+        ])
+        if np.allclose(nouveaux, centres):
+            break
+        centres = nouveaux
+    return centres, affectations
+
+
+def _libeller_centroides(centres, features, libelles):
+    """Nomme chaque centroïde d'après sa feature la plus marquée (sans doublon si possible)"""
+    noms, utilises = [], set()
+    for centre in centres:
+        ordre = np.argsort(-centre)
+        choix = next((libelles[features[i]] for i in ordre
+                      if libelles[features[i]] not in utilises), libelles[features[ordre[0]]])
+        utilises.add(choix)
+        noms.append(choix)
+    return noms
+
+
+def ajuster_modele(df, seed=0):
+    """Ajuste un k-means par groupe de poste sur les joueurs ayant assez de minutes"""
+    groupes = groupes_postes(df['Pos'])
+    minutes = pd.to_numeric(df['Min'], errors='coerce').fillna(0)
+    modele = {}
+    for groupe, libelles in FEATURES_STYLE.items():
+        features = [f for f in libelles if f in df.columns]
+        selection = (groupes == groupe) & (minutes >= MIN_MINUTES_FIT)
+        X = matrice_features(df[selection], features)
+        X = X.fillna(X.mean())
+        if len(X) < NB_CLUSTERS[groupe]:
+            continue
+        moyennes = X.mean().to_numpy()
+        ecarts = X.std().replace(0, 1).fillna(1).to_numpy()
+        Z = (X.to_numpy() - moyennes) / ecarts
+        centres, _ = kmeans(Z, NB_CLUSTERS[groupe], seed=seed)
+        modele[groupe] = {
+            'features': features,
+            'moyennes': moyennes.tolist(),
+            'ecarts': ecarts.tolist(),
+            'centroides': centres.tolist(),
+            'libelles': _libeller_centroides(centres, features, libelles)
+        }
+    return modele
+
+
+def sauvegarder_modele(modele, chemin=None, empreinte=None):
+    """Persiste les centroïdes (JSON) pour étiqueter de nouvelles données sans réajuster"""
+    chemin = chemin or MODELE_PATH
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'empreinte_source': empreinte, 'groupes': modele}, f, ensure_ascii=False)
+    os.replace(tmp, chemin)
+
+
+def charger_modele(chemin=None):
+    """Charge le modèle persisté, ou None"""
+    try:
+        with open(chemin or MODELE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)['groupes']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def assurer_modele(csv_path=None, df=None):
+    """Modèle persisté, ajusté sur le CSV et sauvegardé s'il n'existe pas encore"""
+    modele = charger_modele()
+    if modele is None:
+        csv_path = resoudre_csv(csv_path)
+        modele = ajuster_modele(obtenir_entites(csv_path, df).par_club)
+        sauvegarder_modele(modele, empreinte=empreinte_fichier(csv_path))
+    return modele
+
+
+def etiqueter_joueurs(df, modele):
+    """Affecte style, cluster et distance au centroïde à tous les joueurs en une passe"""
+    resultat = pd.DataFrame({'style': None, 'cluster': -1, 'distance_centroide': np.nan},
+                            index=df.index)
+    groupes = groupes_postes(df['Pos'])
+    for groupe, params in modele.items():
+        selection = groupes == groupe
+        if not selection.any():
+            continue
+        moyennes = np.asarray(params['moyennes'])
+        X = matrice_features(df[selection], params['features']).to_numpy()
+        # Valeurs manquantes ramenées à la moyenne (z = 0)
+        X = np.where(np.isnan(X), moyennes, X)
+        Z = (X - moyennes) / np.asarray(params['ecarts'])
+        distances = np.sqrt(((Z[:, None, :] - np.asarray(params['centroides'])[None]) ** 2).sum(axis=2))
+        clusters = distances.argmin(axis=1)
+        resultat.loc[selection, 'cluster'] = clusters
+        resultat.loc[selection, 'distance_centroide'] = distances[np.arange(len(clusters)), clusters]
+        resultat.loc[selection, 'style'] = np.asarray(params['libelles'], dtype=object)[clusters]
+    return resultat
+
+
+def index_styles(df, etiquettes):
+    """Index (joueur, équipe) -> style pour des consultations O(1)"""
+    return {
+        (joueur, equipe): {'style': style, 'cluster': int(cluster),
+                           'distance_centroide': round(float(distance), 3)}
+        for joueur, equipe, style, cluster, distance in zip(
+            df['Player'], df['Squad'], etiquettes['style'],
+            etiquettes['cluster'], etiquettes['distance_centroide'])
+        if style is not None
+    }
+
+
+_STYLES = {}
+
+
+def obtenir_styles(csv_path=None, df=None):
+    """Styles de tous les joueurs du CSV (mémoire, cache disque, puis étiquetage)"""
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_fichier(csv_path)
+    if empreinte in _STYLES:
+        return _STYLES[empreinte]
+
+    chemin_cache = os.path.join(CACHE_DIR, f"styles_{empreinte}_v{VERSION_STYLES}.pkl")
+    modele_mtime = os.path.getmtime(MODELE_PATH) if os.path.exists(MODELE_PATH) else None
+    if modele_mtime and os.path.exists(chemin_cache) and os.path.getmtime(chemin_cache) >= modele_mtime:
+        with open(chemin_cache, 'rb') as f:
+            styles = pickle.load(f)
+    else:
+        entites = obtenir_entites(csv_path, df)
+        df = entites.par_club
+        modele = assurer_modele(csv_path, df)
+        # Lignes par club et saisons fusionnées (clé: équipes jointes, ex: "Roma, Milan")
+        fusionnees = entites.lignes[entites.lignes[COLONNE_NB_CLUBS] > 1]
+        a_etiqueter = pd.concat([df, fusionnees.drop(columns=COLONNE_NB_CLUBS)], ignore_index=True)
+        styles = index_styles(a_etiqueter, etiqueter_joueurs(a_etiqueter, modele))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{chemin_cache}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(styles, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin_cache)
+
+    _STYLES[empreinte] = styles
+    return styles
+
+
+def main():
+    """Point d'entrée: fit [csv_path] | label <joueur> [equipe]"""
+    if len(sys.argv) < 2:
+        print("Usage: python playing_style_clusters.py <fit|label> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "fit":
+        csv_path = resoudre_csv(sys.argv[2] if len(sys.argv) > 2 else None)
+        df = pd.read_csv(csv_path)
+        modele = ajuster_modele(df)
+        sauvegarder_modele(modele, empreinte=empreinte_fichier(csv_path))
+        repartition = etiqueter_joueurs(df, modele)['style'].value_counts().to_dict()
+        print(json.dumps({"success": True, "modele": MODELE_PATH, "repartition": repartition},
+                         ensure_ascii=False))
+
+    elif action == "label":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom du joueur requis"}))
+            sys.exit(1)
+        nom = sys.argv[2].lower()
+        equipe = sys.argv[3].lower() if len(sys.argv) > 3 else None
+        styles = obtenir_styles()
+        trouves = [
+            {'joueur': j, 'equipe': e, **s} for (j, e), s in styles.items()
+            if nom in j.lower() and (equipe is None or equipe in str(e).lower())
+        ]
+        print(json.dumps({"success": bool(trouves), "styles": trouves}, ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Profile Export - Export en masse des profils calculés vers Parquet, Arrow IPC ou CSV
+Une passe vectorisée par fichier source, une ligne par joueur (saison fusionnée s'il a
+changé de club; stats de base, par 90, percentiles, note, style, forces et faiblesses en
+colonnes plates typées), partitionnée par championnat du club principal et écrite
+par groupes de lignes pour ne jamais tenir deux copies complètes en mémoire.
+"""
+
+import os
+import re
+import sys
+import json
+import pandas as pd
+
+from player_dataset import CACHE_DIR, resoudre_csv, empreinte_fichier
+from player_entities import obtenir_entites, COLONNE_NB_CLUBS
+from vectorized_profiles import (
+    percentiles_par_poste, stats_par_90, notes_globales, forces_faiblesses, libelles_tags
+)
+from playing_style_clusters import charger_modele, ajuster_modele, sauvegarder_modele, etiqueter_joueurs
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXPORT_DIR = os.path.join(CACHE_DIR, 'exports')
+
+# Parquet si pyarrow est installé (extra "export" du pyproject), CSV sinon
+FORMAT_DEFAUT = 'parquet' if PYARROW_AVAILABLE else 'csv'
+TAILLE_GROUPE = 50000
+
+# Comp: championnat du club principal (partition); Comps: championnats joints de la saison
+COLONNE_COMPS = 'Comps'
+COLONNES_IDENTITE = ['Player', 'Nation', 'Pos', 'Squad', 'Comp', COLONNE_COMPS, 'Age', 'Born',
+                     COLONNE_NB_CLUBS]
+COLONNES_BASE = ['MP', 'Starts', 'Min', 'Gls', 'Ast', 'CrdY', 'CrdR',
+                 'xG', 'xAG', 'npxG', 'PrgP', 'PrgC', 'PrgR']
+
+
+def calculer_profils(df, saison=None, modele_styles=None):
+    """Profils de tous les joueurs d'un DataFrame, en colonnes plates"""
+    identite = df[[c for c in COLONNES_IDENTITE if c in df.columns]].copy()
+    for col in ('Age', 'Born'):
+        if col in identite:
+            identite[col] = pd.to_numeric(identite[col], errors='coerce').astype('Int64')
+    base = df[[c for c in COLONNES_BASE if c in df.columns]].apply(pd.to_numeric, errors='coerce')
+
+    par_90 = stats_par_90(df).add_prefix('p90_')
+    percentiles = percentiles_par_poste(df)
+    forces, faiblesses = forces_faiblesses(percentiles)
+
+    profils = pd.concat([
+        identite,
+        base,
+        par_90,
+        percentiles.add_prefix('pct_'),
+        forces.add_prefix('force_'),
+        faiblesses.add_prefix('faiblesse_')
+    ], axis=1)
+    profils.insert(0, 'saison', saison)
+    profils['note_globale'] = notes_globales(percentiles)
+    profils['forces'] = ['; '.join(l) for l in libelles_tags(forces, 'Profil équilibré')]
+    profils['faiblesses'] = ['; '.join(l) for l in libelles_tags(faiblesses, 'Pas de faiblesse majeure')]
+
+    if modele_styles:
+        styles = etiqueter_joueurs(df, modele_styles)
+        profils['style'] = styles['style'].astype('string')
+        profils['style_cluster'] = styles['cluster'].astype('int16')
+        profils['style_distance'] = styles['distance_centroide'].astype('float32')
+    return profils
+
+
+def _slug(valeur):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', str(valeur)).strip('_') or 'NA'
+
+
+class EcrivainPartitionne:
+    """Écrit des groupes de lignes dans un fichier par championnat (Hive: Comp=<valeur>/)"""
+
+    def __init__(self, sortie, format_sortie, taille_groupe=TAILLE_GROUPE):
+        if format_sortie in ('parquet', 'arrow') and not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow requis pour les formats parquet/arrow "
+                               "(extra \"export\" du pyproject, ou format csv)")
+        self.sortie = sortie
+        self.format = format_sortie
+        self.taille_groupe = taille_groupe
+        self.ecrivains = {}
+        self.schema = None
+        self.fichiers = {}
+        self.lignes = 0
+
+    def _chemin(self, comp):
+        extension = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv'}[self.format]
+        dossier = os.path.join(self.sortie, f"Comp={_slug(comp)}")
+        os.makedirs(dossier, exist_ok=True)
+        return os.path.join(dossier, f"profils.{extension}")
+
+    def ecrire(self, profils):
+        """Écrit un DataFrame de profils, découpé par championnat puis par groupes de lignes"""
+        # Schéma commun à toutes les partitions, fixé sur le premier lot complet
+        if self.format != 'csv' and self.schema is None:
+            self.schema = pa.Schema.from_pandas(profils.drop(columns='Comp').iloc[:0],
+                                                preserve_index=False)
+        comps = profils['Comp'].fillna('NA')
+        for comp, indices in profils.groupby(comps, sort=False).indices.items():
+            # La colonne de partition est portée par le chemin (Comp=<valeur>/)
+            partition = profils.iloc[indices].drop(columns='Comp')
+            for debut in range(0, len(partition), self.taille_groupe):
+                self._ecrire_groupe(comp, partition.iloc[debut:debut + self.taille_groupe])
+
+    def _ecrire_groupe(self, comp, groupe):
+        self.lignes += len(groupe)
+        if comp not in self.fichiers:
+            self.fichiers[comp] = self._chemin(comp)
+
+        if self.format == 'csv':
+            nouveau = comp not in self.ecrivains
+            groupe.to_csv(self.fichiers[comp], mode='w' if nouveau else 'a',
+                          header=nouveau, index=False)
+            self.ecrivains[comp] = True
+            return
+
+        table = pa.Table.from_pandas(groupe, schema=self.schema, preserve_index=False)
+        if comp not in self.ecrivains:
+            if self.format == 'parquet':
+                self.ecrivains[comp] = pq.ParquetWriter(self.fichiers[comp], self.schema)
+            else:
+                self.ecrivains[comp] = ipc.new_file(self.fichiers[comp], self.schema)
+        if self.format == 'parquet':
+            self.ecrivains[comp].write_table(table, row_group_size=self.taille_groupe)
+        else:
+            for lot in table.to_batches(max_chunksize=self.taille_groupe):
+                self.ecrivains[comp].write_batch(lot)
+
+    def fermer(self):
+        if self.format != 'csv':
+            for ecrivain in self.ecrivains.values():
+                ecrivain.close()
+        return {comp: os.path.abspath(chemin) for comp, chemin in self.fichiers.items()}
+
+
+def exporter_profils(sources, format_sortie=None, sortie=None, taille_groupe=TAILLE_GROUPE):
+    """Exporte les profils de plusieurs CSV (une saison par fichier), un fichier à la fois"""
+    format_sortie = format_sortie or FORMAT_DEFAUT
+    sortie = sortie or os.path.join(EXPORT_DIR, format_sortie)
+    modele = charger_modele()
+    ecrivain = EcrivainPartitionne(sortie, format_sortie, taille_groupe)
+    try:
+        for source in sources:
+            if isinstance(source, dict):
+                chemin, saison = resoudre_csv(source.get('csv_path')), source.get('saison')
+            else:
+                chemin, saison = resoudre_csv(source), None
+            df = pd.read_csv(chemin)
+            if modele is None:
+                modele = ajuster_modele(df)
+                sauvegarder_modele(modele, empreinte=empreinte_fichier(chemin))
+            # Un joueur = une ligne, comme l'analyseur et les stores
+            entites = obtenir_entites(chemin, df)
+            lignes = entites.lignes.reset_index(drop=True).copy().assign(**{
+                COLONNE_COMPS: entites.lignes['Comp'].to_numpy(),
+                'Comp': entites.par_club['Comp'].to_numpy()[entites.principales()]
+            })
+            ecrivain.ecrire(calculer_profils(lignes, saison or os.path.basename(chemin), modele))
+            del df, entites, lignes
+    finally:
+        fichiers = ecrivain.fermer()
+    return {'lignes': ecrivain.lignes, 'fichiers': fichiers, 'sortie': os.path.abspath(sortie)}
+
+
+def main():
+    """Point d'entrée: export '<json {sources, format, sortie, taille_groupe}>'"""
+    if len(sys.argv) != 3:
+        print(json.dumps({'success': False, 'error': 'Invalid arguments'}))
+        sys.exit(1)
+
+    action = sys.argv[1]
+    params = json.loads(sys.argv[2])
+
+    if action == 'export':
+        try:
+            resultat = exporter_profils(
+                params.get('sources') or [None],
+                params.get('format'),
+                params.get('sortie'),
+                int(params.get('taille_groupe', TAILLE_GROUPE))
+            )
+            result = {'success': True, **resultat}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+    else:
+        result = {'success': False, 'error': 'Unknown action'}
+
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Profile Store - Profils joueurs précalculés dans un fichier SQLite
+La commande build calcule le profil complet de chaque joueur (même sortie que
+get_player_complete_profile) et l'écrit sous la clé nom normalisé + équipe normalisée,
+avec l'empreinte du CSV source: saison fusionnée pour une recherche sans équipe, ligne du
+club sinon. La lecture est une requête indexée, sans DataFrame; le store est reconstruit
+automatiquement quand l'empreinte du CSV change.
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import contextlib
+
+from player_dataset import CACHE_DIR, resoudre_csv, empreinte_fichier, normaliser_nom, motif_prefixes
+from response_version import version_profil, non_modifie, injecter_version, extraire_option
+
+STORE_PATH = os.environ.get('PROFILE_STORE_PATH', os.path.join(CACHE_DIR, 'profils.sqlite'))
+
+# Version du format des profils stockés (reconstruction si elle change)
+VERSION_STORE = 4
+
+SCHEMA = """
+CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT);
+CREATE TABLE profils (
+    cle TEXT PRIMARY KEY,
+    nom TEXT NOT NULL,
+    equipe TEXT NOT NULL,
+    nom_min TEXT NOT NULL,
+    equipe_min TEXT NOT NULL,
+    profil TEXT NOT NULL,
+    saison INTEGER NOT NULL,
+    club INTEGER NOT NULL
+);
+CREATE INDEX idx_profils_nom ON profils(nom);
+"""
+
+
+def cle_profil(nom, equipe):
+    """Clé du store: nom normalisé | équipe normalisée"""
+    return f"{normaliser_nom(nom)}|{normaliser_nom(equipe)}"
+
+
+def _minuscules(valeur):
+    return str(valeur).lower() if isinstance(valeur, str) else ''
+
+
+def _regexp(motif, valeur):
+    """Opérateur REGEXP de SQLite (non fourni par défaut)"""
+    return valeur is not None and re.search(motif, valeur) is not None
+
+
+def signature_fichier(path):
+    """Taille et date de modification: vérification rapide avant de recalculer l'empreinte"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def construire_store(csv_path=None, chemin=None):
+    """Calcule tous les profils et remplace le store de façon atomique"""
+    # Imports lourds réservés à la construction: la lecture n'en a pas besoin
+    from enhanced_player_analyzer import EnhancedPlayerAnalyzer
+    from vectorized_profiles import percentiles_contre
+
+    csv_path = resoudre_csv(csv_path)
+    chemin = chemin or STORE_PATH
+    signature = signature_fichier(csv_path)
+    empreinte = empreinte_fichier(csv_path)
+
+    # L'analyseur affiche sa progression sur stdout, réservé au JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        analyzer = EnhancedPlayerAnalyzer(csv_path)
+    entites = analyzer.entites
+    # Percentiles parmi les joueurs (une ligne par entité), comme calculate_percentiles
+    pct_saisons = percentiles_contre(entites.lignes, entites.lignes)
+    pct_clubs = percentiles_contre(entites.par_club, entites.lignes)
+
+    def profil(ligne, percentiles):
+        pct = {stat: valeur for stat, valeur in percentiles.items() if valeur == valeur}
+        return json.dumps(analyzer.build_profile(ligne, pct), ensure_ascii=False, indent=2)
+
+    os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    connexion = sqlite3.connect(tmp)
+    try:
+        connexion.executescript(SCHEMA)
+        lignes = []
+        fusionnees = set()
+        lignes_saison = entites.lignes.to_dict('records')
+        for position, ligne in enumerate(entites.par_club.to_dict('records')):
+            entite = int(entites.entites[position])
+            multiple = entites.nb_clubs[entite] > 1
+            # Saison fusionnée avant la première ligne de club: ordre de recherche conservé
+            if multiple and entite not in fusionnees:
+                fusionnees.add(entite)
+                saison = lignes_saison[entite]
+                lignes.append((cle_profil(saison['Player'], saison['Squad']), normaliser_nom(saison['Player']),
+                               normaliser_nom(saison['Squad']), _minuscules(saison['Player']),
+                               _minuscules(saison['Squad']), profil(saison, pct_saisons.loc[entite]), 1, 0))
+            lignes.append((cle_profil(ligne['Player'], ligne['Squad']), normaliser_nom(ligne['Player']),
+                           normaliser_nom(ligne['Squad']), _minuscules(ligne['Player']),
+                           _minuscules(ligne['Squad']), profil(ligne, pct_clubs.loc[position]),
+                           0 if multiple else 1, 1))
+        # Doublon nom + équipe: le premier l'emporte, comme search_player
+        connexion.executemany("INSERT OR IGNORE INTO profils VALUES (?, ?, ?, ?, ?, ?, ?, ?)", lignes)
+        connexion.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('empreinte', empreinte),
+            ('signature', signature),
+            ('csv_path', os.path.abspath(csv_path)),
+            ('version', str(VERSION_STORE)),
+            ('joueurs', str(len(lignes)))
+        ])
+        connexion.commit()
+    finally:
+        connexion.close()
+    os.replace(tmp, chemin)
+    return {'chemin': os.path.abspath(chemin), 'empreinte': empreinte, 'joueurs': len(lignes)}
+
+
+class ProfileStore:
+    """Lecture du store de profils (connexion SQLite en lecture seule)"""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or STORE_PATH
+        self.connexion = sqlite3.connect(f"file:{self.chemin}?mode=ro", uri=True)
+        self.connexion.create_function('regexp', 2, _regexp, deterministic=True)
+        self.meta = dict(self.connexion.execute("SELECT cle, valeur FROM meta"))
+
+    def close(self):
+        self.connexion.close()
+
+    def est_a_jour(self, csv_path):
+        """Vrai si le store correspond au CSV (signature, puis empreinte si la signature a changé)"""
+        if self.meta.get('version') != str(VERSION_STORE):
+            return False
+        if self.meta.get('signature') == signature_fichier(csv_path):
+            return True
+        return self.meta.get('empreinte') == empreinte_fichier(csv_path)
+
+    def lire(self, nom, equipe=None):
+        """Profil JSON (texte): ligne du club si une équipe est donnée, sinon saison fusionnée"""
+        if equipe:
+            ligne = self.connexion.execute(
+                "SELECT profil FROM profils WHERE cle = ? AND club = 1", (cle_profil(nom, equipe),)).fetchone()
+            if ligne:
+                return ligne[0]
+        nom_normalise = normaliser_nom(nom)
+        if not equipe:
+            ligne = self.connexion.execute(
+                "SELECT profil FROM profils WHERE nom = ? AND saison = 1 ORDER BY rowid LIMIT 1",
+                (nom_normalise,)).fetchone()
+            if ligne:
+                return ligne[0]
+        # Puis mêmes règles que premiere_correspondance: préfixes de mots, puis sous-chaîne
+        filtre, parametres_filtre = " AND saison = 1", []
+        if equipe:
+            filtre, parametres_filtre = " AND club = 1 AND instr(equipe_min, ?) > 0", [str(equipe).lower()]
+        motif = motif_prefixes(nom)
+        etapes = [("nom REGEXP ?", motif)] if motif else []
+        etapes.append(("instr(nom_min, ?) > 0", str(nom).lower()))
+        for condition, valeur in etapes:
+            ligne = self.connexion.execute(
+                f"SELECT profil FROM profils WHERE {condition}{filtre} ORDER BY rowid LIMIT 1",
+                [valeur, *parametres_filtre]).fetchone()
+            if ligne:
+                return ligne[0]
+        return None
+
+
+def ouvrir_store(csv_path=None, chemin=None):
+    """Store de profils à jour pour le CSV, reconstruit d'abord s'il est absent ou périmé"""
+    csv_path = resoudre_csv(csv_path)
+    chemin = chemin or STORE_PATH
+    if os.path.exists(chemin):
+        store = ProfileStore(chemin)
+        if store.est_a_jour(csv_path):
+            return store
+        store.close()
+    construire_store(csv_path, chemin)
+    return ProfileStore(chemin)
+
+
+def filtrer_sections(profil, sections):
+    """Profil JSON réduit aux sections demandées (ordre du profil); ValueError si inconnues"""
+    if isinstance(sections, str):
+        sections = sections.split(',')
+    demandees = {s.strip() for s in sections if s.strip()}
+    complet = json.loads(profil)
+    inconnues = demandees - set(complet)
+    if inconnues:
+        raise ValueError(f"Sections inconnues: {', '.join(sorted(inconnues))} "
+                         f"(disponibles: {', '.join(complet)})")
+    return json.dumps({cle: valeur for cle, valeur in complet.items() if cle in demandees},
+                      ensure_ascii=False, indent=2)
+
+
+def lire_profil(nom, equipe=None, csv_path=None, chemin=None, sections=None):
+    """Profil JSON (texte) depuis le store, éventuellement réduit à certaines sections"""
+    store = ouvrir_store(csv_path, chemin)
+    try:
+        profil = store.lire(nom, equipe)
+    finally:
+        store.close()
+    if profil is not None and sections:
+        return filtrer_sections(profil, sections)
+    return profil
+
+
+def main():
+    """Point d'entrée: build [csv_path] | status | get <joueur> [equipe] [sections] [--if-none-match=v]"""
+    if_none_match = extraire_option(sys.argv, "if-none-match")
+    if len(sys.argv) < 2:
+        print("Usage: python profile_store.py <build|status|get> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "build":
+        resultat = construire_store(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(json.dumps({"success": True, **resultat}, ensure_ascii=False))
+
+    elif action == "status":
+        if not os.path.exists(STORE_PATH):
+            print(json.dumps({"exists": False, "chemin": STORE_PATH}))
+            return
+        store = ProfileStore()
+        csv_path = store.meta.get('csv_path') or resoudre_csv()
+        print(json.dumps({
+            "exists": True,
+            "chemin": STORE_PATH,
+            "a_jour": os.path.exists(csv_path) and store.est_a_jour(csv_path),
+            **store.meta
+        }, ensure_ascii=False))
+        store.close()
+
+    elif action == "get":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom du joueur requis"}))
+            sys.exit(1)
+        equipe = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
+        sections = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] else None
+        version = version_profil(sys.argv[2], equipe, sections)
+        if if_none_match == version:
+            print(json.dumps(non_modifie(version)))
+            return
+        try:
+            profil = lire_profil(sys.argv[2], equipe, sections=sections)
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False, indent=2))
+            return
+        print(injecter_version(profil, version) if profil is not None else
+              json.dumps({"error": f"Joueur '{sys.argv[2]}' non trouvé"}, ensure_ascii=False, indent=2))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
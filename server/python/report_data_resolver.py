@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Report Data Resolver - Résolution des données joueur par niveaux pour les rapports FBref
+Ordre: cache du processus, CSV local (snapshot de saison), cache disque des scrapes, réseau.
+Chaque résolution indique le niveau qui a servi la donnée.
+"""
+
+import os
+import time
+import pickle
+import pandas as pd
+
+from player_dataset import CACHE_DIR, DEFAULT_CSV_PATH, resoudre_csv
+from player_entities import obtenir_entites
+
+# Saison couverte par le CSV local (soccerdata: 2024 = saison 2024/25)
+SAISON_CSV = 2024
+
+# Correspondance champs du rapport -> colonnes du CSV FBref
+CORRESPONDANCE_CSV = {
+    'player': 'Player',
+    'squad': 'Squad',
+    'age': 'Age',
+    'position': 'Pos',
+    'minutes': 'Min',
+    'goals': 'Gls',
+    'assists': 'Ast',
+    'shots': 'Sh',
+    'shots_on_target': 'SoT',
+    'passes': 'Att',
+    'passes_completed': 'Cmp',
+    'passes_pct': 'Cmp%',
+    'key_passes': 'KP',
+    'xa': 'xAG',
+    'xg': 'xG',
+    'tackles': 'Tkl',
+    'interceptions': 'Int',
+    'fouls': 'Fls',
+    'cards_yellow': 'CrdY',
+    'cards_red': 'CrdR'
+}
+
+# Niveaux de résolution, du plus rapide au plus coûteux
+NIVEAU_MEMOIRE = 'memoire'
+NIVEAU_CSV = 'csv_local'
+NIVEAU_DISQUE = 'cache_disque'
+NIVEAU_RESEAU = 'reseau'
+NIVEAU_RESEAU_PERIME = 'reseau_perime'
+
+# Durée de validité du cache disque des scrapes (secondes)
+TTL_CACHE_DISQUE = int(os.environ.get('FBREF_CACHE_TTL', 24 * 3600))
+
+
+def _nettoyer(valeur):
+    """Convertit une valeur pandas/NumPy en type Python"""
+    if pd.isna(valeur):
+        return None
+    return valeur.item() if hasattr(valeur, 'item') else valeur
+
+
+def _normaliser_saison(saison):
+    """Ramène '2024-25', '2024' ou 2024 à l'année de début de saison"""
+    try:
+        return int(str(saison)[:4])
+    except (TypeError, ValueError):
+        return SAISON_CSV
+
+
+def ligne_csv_vers_rapport(ligne):
+    """Convertit une ligne du CSV vers les noms de champs du rapport"""
+    return {
+        champ: _nettoyer(ligne[colonne])
+        for champ, colonne in CORRESPONDANCE_CSV.items()
+        if colonne in ligne and pd.notna(ligne[colonne])
+    }
+
+
+class ResolveurDonnees:
+    """Résout la ligne d'un joueur en essayant les niveaux dans l'ordre"""
+
+    def __init__(self, charger_reseau=None, csv_path=None, cache_dir=None,
+                 ttl_cache=TTL_CACHE_DISQUE):
+        self.charger_reseau = charger_reseau
+        self.csv_path = resoudre_csv(csv_path or DEFAULT_CSV_PATH)
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'fbref')
+        self.ttl_cache = ttl_cache
+        self.memoire = {}
+        self._csv = None
+        self._tables = {}
+
+    # --- Tables par niveau ---
+
+    def table_csv(self, saison):
+        """CSV local si la saison demandée est celle du snapshot"""
+        if _normaliser_saison(saison) != SAISON_CSV:
+            return None
+        if self._csv is None:
+            if not os.path.exists(self.csv_path):
+                return None
+            self._csv = pd.read_csv(self.csv_path)
+        return self._csv
+
+    def _chemin_cache(self, saison):
+        return os.path.join(self.cache_dir, f"player_season_stats_{_normaliser_saison(saison)}.pkl")
+
+    def table_disque(self, saison):
+        """Table scrapée précédemment et encore valide sur disque"""
+        saison = _normaliser_saison(saison)
+        if (NIVEAU_DISQUE, saison) in self._tables:
+            return self._tables[(NIVEAU_DISQUE, saison)]
+        chemin = self._chemin_cache(saison)
+        if not os.path.exists(chemin) or time.time() - os.path.getmtime(chemin) > self.ttl_cache:
+            return None
+        try:
+            with open(chemin, 'rb') as f:
+                table = pickle.load(f)
+        except Exception:
+            return None
+        self._tables[(NIVEAU_DISQUE, saison)] = table
+        return table
+
+    def table_reseau(self, saison):
+        """Table récupérée sur le réseau (une seule fois par processus), puis mise en cache disque"""
+        saison = _normaliser_saison(saison)
+        if (NIVEAU_RESEAU, saison) in self._tables:
+            return self._tables[(NIVEAU_RESEAU, saison)]
+        if self.charger_reseau is None:
+            return None
+        table = self.charger_reseau(saison)
+        self._tables[(NIVEAU_RESEAU, saison)] = table
+        if table.attrs.get('stale'):
+            return table
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._chemin_cache(saison)}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._chemin_cache(saison))
+        except OSError as e:
+            print(f"Scrape cache write failed: {str(e)}")
+        return table
+
+    # --- Recherche ---
+
+    def _chercher_csv(self, table, nom_joueur, equipe):
+        # Joueur à plusieurs clubs: saison fusionnée sans équipe, ligne du club sinon
+        ligne = obtenir_entites(self.csv_path, table).rechercher(nom_joueur, equipe)
+        return ligne_csv_vers_rapport(ligne) if ligne is not None else None
+
+    @staticmethod
+    def _chercher_fbref(table, nom_joueur, equipe):
+        trouves = table[table['player'].str.contains(nom_joueur, case=False, na=False)]
+        if equipe:
+            trouves = trouves[trouves['team'].str.contains(equipe, case=False, na=False)]
+        if len(trouves) == 0:
+            return None
+        return {cle: _nettoyer(valeur) for cle, valeur in trouves.iloc[0].items()}
+
+    def resoudre(self, nom_joueur, equipe=None, saison=SAISON_CSV):
+        """Retourne (ligne, niveau) ou (None, None) si aucun niveau ne connaît le joueur"""
+        cle = (nom_joueur.lower(), (equipe or '').lower(), _normaliser_saison(saison))
+        if cle in self.memoire:
+            return self.memoire[cle], NIVEAU_MEMOIRE
+
+        niveaux = [
+            (NIVEAU_CSV, self.table_csv, self._chercher_csv),
+            (NIVEAU_DISQUE, self.table_disque, self._chercher_fbref),
+            (NIVEAU_RESEAU, self.table_reseau, self._chercher_fbref)
+        ]
+        for niveau, charger, chercher in niveaux:
+            try:
+                table = charger(saison)
+            except Exception as e:
+                print(f"Data tier '{niveau}' failed: {str(e)}")
+                continue
+            if table is None:
+                continue
+            ligne = chercher(table, nom_joueur, equipe)
+            if ligne is not None:
+                # Table servie par le disjoncteur: dernière bonne valeur, signalée comme périmée
+                if niveau == NIVEAU_RESEAU and table.attrs.get('stale'):
+                    return ligne, NIVEAU_RESEAU_PERIME
+                self.memoire[cle] = ligne
+                return ligne, niveau
+        return None, None
+
+    def ligne_csv(self, nom_joueur, equipe=None, saison=SAISON_CSV):
+        """Ligne du joueur dans le CSV local seul, ou None (saison différente, joueur absent)"""
+        table = self.table_csv(saison)
+        return self._chercher_csv(table, nom_joueur, equipe) if table is not None else None
+
+    def effectif(self, equipe, saison=SAISON_CSV):
+        """Liste des joueurs d'un effectif, depuis le premier niveau qui le connaît"""
+        table = self.table_csv(saison)
+        if table is not None:
+            noms = table.loc[table['Squad'].str.contains(equipe, case=False, na=False, regex=False),
+                             'Player']
+            if len(noms):
+                return list(noms.dropna().unique())
+        for charger in (self.table_disque, self.table_reseau):
+            try:
+                table = charger(saison)
+            except Exception as e:
+                print(f"Squad lookup failed: {str(e)}")
+                continue
+            if table is not None:
+                noms = table.loc[table['team'].str.contains(equipe, case=False, na=False), 'player']
+                if len(noms):
+                    return list(noms.dropna().unique())
+        return []
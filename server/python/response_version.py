@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Response Version - Version des réponses JSON (empreinte de l'instantané des données + paramètres)
+Une même requête sur les mêmes données a toujours la même version. L'appelant renvoie la
+dernière version reçue (if_none_match) et le script répond "non modifié" avant tout calcul.
+"""
+
+import os
+import json
+import hashlib
+
+from player_dataset import STYLE_MODEL_PATH, resoudre_csv, empreinte_memorisee
+
+# Version du format des réponses (à incrémenter quand le contenu calculé change;
+# v2: saison fusionnée des joueurs à plusieurs clubs)
+VERSION_FORMAT = 2
+
+
+def instantane(fichiers=None):
+    """Empreintes des fichiers de données (CSV et modèle de styles par défaut)"""
+    fichiers = fichiers or [resoudre_csv(), STYLE_MODEL_PATH]
+    if STYLE_MODEL_PATH in fichiers and not os.path.exists(STYLE_MODEL_PATH):
+        # Modèle ajusté à la première requête: créé avant l'empreinte, sinon la version changerait
+        from playing_style_clusters import assurer_modele
+        assurer_modele()
+    return [empreinte_memorisee(f) if os.path.exists(f) else None for f in fichiers]
+
+
+def version_reponse(action, params, fichiers=None):
+    """Version stable (16 caractères) d'une réponse: format, action, paramètres, données"""
+    contenu = json.dumps({
+        'format': VERSION_FORMAT,
+        'action': action,
+        'params': params,
+        'donnees': instantane(fichiers)
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()[:16]
+
+
+def version_profil(joueur, equipe=None, sections=None):
+    """Version d'un profil complet (même valeur côté store et côté analyseur)"""
+    if isinstance(sections, str):
+        sections = sections.split(',')
+    sections = sorted({s.strip() for s in sections if s.strip()}) if sections else None
+    return version_reponse('get_complete_profile', {'joueur': joueur, 'equipe': equipe or None,
+                                                    'sections': sections})
+
+
+def non_modifie(version):
+    """Réponse courte quand l'appelant a déjà cette version"""
+    return {'not_modified': True, 'version': version}
+
+
+def avec_version(resultat, version):
+    """Ajoute la version en tête d'une réponse réussie (les erreurs ne sont pas versionnées)"""
+    if not isinstance(resultat, dict) or 'error' in resultat or resultat.get('success') is False:
+        return resultat
+    return {'version': version, **resultat}
+
+
+def injecter_version(texte, version):
+    """Ajoute la version en tête d'un objet JSON déjà sérialisé (indent=2), sans le relire"""
+    debut = texte.index('{') + 1
+    suite = texte[debut:].lstrip()
+    separateur = '' if suite.startswith('}') else ','
+    return f'{texte[:debut]}\n  "version": "{version}"{separateur}' + texte[debut:]
+
+
+def extraire_option(argv, nom):
+    """Retire l'option --nom=valeur de argv et retourne sa valeur (ou None)"""
+    valeur = None
+    for arg in list(argv[1:]):
+        if arg.startswith(f"--{nom}="):
+            valeur = arg.split("=", 1)[1]
+            argv.remove(arg)
+    return valeur
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Shared Feature Store - Publication de la matrice de features joueurs en mémoire partagée
+Un processus chargeur publie une fois les tableaux NumPy (features, tris percentiles, index
+des noms) dans des fichiers mappés en mémoire: lignes par club puis une ligne de saison par
+joueur (fusionnée s'il a changé de club, cf. player_entities); les workers s'y attachent sans copie, en
+lecture seule, et détectent les nouvelles publications grâce au numéro de version.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+from player_dataset import (
+    CACHE_DIR, STATS_PERCENTILES, MIN_JOUEURS_POSTE, resoudre_csv, empreinte_fichier, normaliser_nom
+)
+from player_entities import obtenir_entites, premiere_correspondance, COLONNE_NB_CLUBS
+
+STORE_DIR = os.environ.get('PLAYER_FEATURE_STORE', os.path.join(CACHE_DIR, 'feature_store'))
+MANIFEST = 'manifest.json'
+GROUPE_GLOBAL = '*'
+VERSIONS_CONSERVEES = 2
+
+# Format des fichiers publiés (v2: sections par club et par joueur, index des entités)
+VERSION_FORMAT_STORE = 2
+
+
+def _lire_manifest(store_dir):
+    """Lit le manifest courant du store, ou None s'il n'existe pas"""
+    try:
+        with open(os.path.join(store_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def publier_store(csv_path=None, store_dir=None):
+    """Construit et publie atomiquement une nouvelle version du store"""
+    csv_path = resoudre_csv(csv_path)
+    store_dir = store_dir or STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+
+    entites = obtenir_entites(csv_path)
+    df = entites.par_club
+    lignes = entites.lignes.reset_index(drop=True)
+    precedent = _lire_manifest(store_dir)
+    sequence = (precedent or {}).get('sequence', 0) + 1
+    empreinte = empreinte_fichier(csv_path)
+    version = f"{sequence:06d}-{empreinte}"
+
+    dossier_version = os.path.join(store_dir, f"v{version}")
+    os.makedirs(dossier_version, exist_ok=True)
+
+    # Matrice numérique complète: lignes par club (ordre du CSV) puis lignes de saison
+    tout = pd.concat([df, lignes[df.columns]], ignore_index=True)
+    colonnes_num = [c for c in df.columns if pd.api.types.is_numeric_dtype(tout[c])]
+    colonnes_texte = [c for c in df.columns if c not in colonnes_num]
+    features = tout[colonnes_num].to_numpy(dtype=np.float64)
+    np.save(os.path.join(dossier_version, 'features.npy'), features)
+
+    # Colonnes texte en tableaux unicode de largeur fixe (mappables)
+    for i, col in enumerate(colonnes_texte):
+        valeurs = tout[col].fillna('').astype(str).to_numpy(dtype=str)
+        np.save(os.path.join(dossier_version, f"texte_{i}.npy"), valeurs)
+
+    # Entité de chaque ligne par club et nombre de clubs de chaque joueur
+    np.save(os.path.join(dossier_version, 'entites.npy'), entites.entites)
+    np.save(os.path.join(dossier_version, 'nb_clubs.npy'), entites.nb_clubs.astype(np.int64))
+
+    # Index des noms et des équipes (minuscules et normalisés) des lignes par club
+    np.save(os.path.join(dossier_version, 'noms.npy'),
+            df['Player'].fillna('').astype(str).str.lower().to_numpy(dtype=str))
+    np.save(os.path.join(dossier_version, 'equipes.npy'),
+            df['Squad'].fillna('').astype(str).str.lower().to_numpy(dtype=str))
+    np.save(os.path.join(dossier_version, 'noms_normalises.npy'), entites.noms.to_numpy(dtype=str))
+    np.save(os.path.join(dossier_version, 'equipes_normalisees.npy'), entites.equipes.to_numpy(dtype=str))
+
+    # Tableaux triés par poste pour les percentiles, un joueur = une ligne de saison
+    stats = [s for s in STATS_PERCENTILES if s in lignes.columns]
+    valeurs_stats = lignes[stats].fillna(0).to_numpy(dtype=np.float64)
+    blocs, groupes, debut = [], {}, 0
+    postes = lignes['Pos'].fillna('')
+    for poste, indices in postes.groupby(postes).indices.items():
+        blocs.append(np.sort(valeurs_stats[indices], axis=0))
+        groupes[poste] = [debut, debut + len(indices)]
+        debut += len(indices)
+    blocs.append(np.sort(valeurs_stats, axis=0))
+    groupes[GROUPE_GLOBAL] = [debut, debut + len(lignes)]
+    np.save(os.path.join(dossier_version, 'tri_percentiles.npy'), np.vstack(blocs))
+
+    manifest = {
+        'version': version,
+        'sequence': sequence,
+        'source': os.path.abspath(csv_path),
+        'empreinte_source': empreinte,
+        'publie_le': time.time(),
+        'dossier': os.path.basename(dossier_version),
+        'format': VERSION_FORMAT_STORE,
+        'nb_lignes_club': int(len(df)),
+        'nb_joueurs': int(len(lignes)),
+        'colonnes': list(df.columns),
+        'colonnes_numeriques': colonnes_num,
+        'colonnes_texte': colonnes_texte,
+        'colonnes_entieres': [c for c in colonnes_num if pd.api.types.is_integer_dtype(tout[c])],
+        'stats_percentiles': stats,
+        'groupes_postes': groupes
+    }
+
+    # Bascule atomique du manifest: les lecteurs voient l'ancienne ou la nouvelle version
+    tmp = os.path.join(store_dir, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+
+    _nettoyer_versions(store_dir, VERSIONS_CONSERVEES)
+    return manifest
+
+
+def _nettoyer_versions(store_dir, a_conserver):
+    """Supprime les anciennes versions (les mappings déjà ouverts restent valides)"""
+    versions = sorted(d for d in os.listdir(store_dir)
+                      if d.startswith('v') and os.path.isdir(os.path.join(store_dir, d)))
+    for dossier in versions[:-a_conserver]:
+        shutil.rmtree(os.path.join(store_dir, dossier), ignore_errors=True)
+
+
+class SharedFeatureStore:
+    """Vue en lecture seule, sans copie, d'une version publiée du store"""
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or STORE_DIR
+        self.manifest = None
+        self.version = None
+        if not self.rafraichir():
+            raise FileNotFoundError(f"Aucun store publié dans {self.store_dir}")
+
+    @classmethod
+    def attacher(cls, store_dir=None):
+        """Attache le store s'il a été publié, sinon retourne None"""
+        try:
+            return cls(store_dir)
+        except FileNotFoundError:
+            return None
+
+    def rafraichir(self):
+        """S'attache à la dernière version publiée; retourne False si aucune n'existe"""
+        manifest = _lire_manifest(self.store_dir)
+        if manifest is None or manifest.get('format') != VERSION_FORMAT_STORE:
+            return False
+        if manifest['version'] == self.version:
+            return True
+
+        dossier = os.path.join(self.store_dir, manifest['dossier'])
+        charger = lambda nom: np.load(os.path.join(dossier, nom), mmap_mode='r')
+
+        self.features = charger('features.npy')
+        self.textes = [charger(f"texte_{i}.npy") for i in range(len(manifest['colonnes_texte']))]
+        self.noms = charger('noms.npy')
+        self.equipes = charger('equipes.npy')
+        self.noms_normalises = charger('noms_normalises.npy')
+        self.equipes_normalisees = charger('equipes_normalisees.npy')
+        self.entites = charger('entites.npy')
+        self.nb_clubs = charger('nb_clubs.npy')
+        self.tri_percentiles = charger('tri_percentiles.npy')
+
+        self.index_num = {c: i for i, c in enumerate(manifest['colonnes_numeriques'])}
+        self.index_texte = {c: i for i, c in enumerate(manifest['colonnes_texte'])}
+        self.index_stats = {s: i for i, s in enumerate(manifest['stats_percentiles'])}
+        self.colonnes_entieres = set(manifest['colonnes_entieres'])
+        # Séries pour les recherches par expression régulière (noms seuls, quelques Ko)
+        self._series_noms = (pd.Series(self.noms_normalises), pd.Series(self.noms), pd.Series(self.equipes))
+        self.manifest = manifest
+        self.version = manifest['version']
+        return True
+
+    def est_perime(self):
+        """Indique si une version plus récente a été publiée depuis l'attachement"""
+        manifest = _lire_manifest(self.store_dir)
+        return manifest is not None and manifest['version'] != self.version
+
+    def __len__(self):
+        return self.manifest['nb_joueurs']
+
+    def rechercher(self, player_name, team=None):
+        """Indice de la ligne par club: nom (et équipe) exacts, sinon premiere_correspondance"""
+        mask = self.noms_normalises == normaliser_nom(player_name)
+        if team:
+            mask &= self.equipes_normalisees == normaliser_nom(team)
+        indices = np.flatnonzero(mask)
+        if len(indices):
+            return int(indices[0])
+        noms, noms_min, equipes_min = self._series_noms
+        return premiere_correspondance(noms, noms_min, equipes_min, player_name, team)
+
+    def ligne(self, index):
+        """Reconstruit une ligne sous forme de dictionnaire (ordre du CSV); les indices au-delà
+        des lignes par club désignent les lignes de saison (avec le nombre de clubs)"""
+        ligne = {}
+        for col in self.manifest['colonnes']:
+            if col in self.colonnes_entieres:
+                ligne[col] = int(self.features[index, self.index_num[col]])
+            elif col in self.index_num:
+                ligne[col] = float(self.features[index, self.index_num[col]])
+            else:
+                valeur = str(self.textes[self.index_texte[col]][index])
+                ligne[col] = valeur if valeur else None
+        nb_lignes_club = self.manifest['nb_lignes_club']
+        if index >= nb_lignes_club:
+            ligne[COLONNE_NB_CLUBS] = int(self.nb_clubs[index - nb_lignes_club])
+        return ligne
+
+    def search_player(self, player_name, team=None, combined=None):
+        """Équivalent de EnhancedPlayerAnalyzer.search_player sur le store partagé: ligne par
+        club si une équipe est donnée, sinon saison fusionnée"""
+        index = self.rechercher(player_name, team)
+        if index is None:
+            return None
+        if combined is None:
+            combined = not team
+        if combined:
+            index = self.manifest['nb_lignes_club'] + int(self.entites[index])
+        return self.ligne(index)
+
+    def percentile(self, position, stat, valeur):
+        """Percentile d'une valeur parmi les joueurs du même poste (recherche dichotomique)"""
+        groupes = self.manifest['groupes_postes']
+        debut, fin = groupes.get(position, (0, 0))
+        if fin - debut < MIN_JOUEURS_POSTE:
+            debut, fin = groupes[GROUPE_GLOBAL]
+        colonne = self.tri_percentiles[debut:fin, self.index_stats[stat]]
+        return float(np.searchsorted(colonne, valeur, side='left')) / (fin - debut) * 100
+
+    def nbytes(self):
+        """Taille totale des tableaux mappés (partagés entre processus)"""
+        tableaux = [self.features, self.noms, self.equipes, self.noms_normalises, self.equipes_normalisees,
+                    self.entites, self.nb_clubs, self.tri_percentiles] + self.textes
+        return int(sum(t.nbytes for t in tableaux))
+
+
+def main():
+    """Point d'entrée: publish [csv_path] | status | watch [csv_path] [intervalle]"""
+    if len(sys.argv) < 2:
+        print("Usage: python shared_feature_store.py <publish|status|watch> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "publish":
+        manifest = publier_store(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(json.dumps({"success": True, "version": manifest['version'],
+                          "nb_joueurs": manifest['nb_joueurs']}))
+
+    elif action == "status":
+        store = SharedFeatureStore.attacher()
+        if store is None:
+            print(json.dumps({"success": False, "error": "Aucun store publié"}))
+        else:
+            print(json.dumps({"success": True, "version": store.version,
+                              "nb_joueurs": len(store), "octets_partages": store.nbytes()}))
+
+    elif action == "watch":
+        # Republie dès que le CSV source change
+        csv_path = resoudre_csv(sys.argv[2] if len(sys.argv) > 2 else None)
+        intervalle = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+        derniere_empreinte = (_lire_manifest(STORE_DIR) or {}).get('empreinte_source')
+        while True:
+            empreinte = empreinte_fichier(csv_path)
+            if empreinte != derniere_empreinte:
+                manifest = publier_store(csv_path)
+                derniere_empreinte = empreinte
+                print(json.dumps({"publie": manifest['version']}), flush=True)
+            time.sleep(intervalle)
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
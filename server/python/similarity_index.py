@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Similarity Index - Index approximatif des plus proches voisins (IVF) sur les profils par 90
+Vecteurs standardisés (features par 90 minutes), listes inversées apprises par le k-means de
+playing_style_clusters. Construit hors ligne, persisté en .npy et projeté en mémoire (mmap)
+à l'ouverture; les nouvelles saisons sont ajoutées dans un segment delta, fusionné dans la
+base par compactage (une source déjà indexée dont le CSV a changé est remplacée, index
+reconstruit). Une ligne par joueur-saison: lignes fusionnées de player_entities, comme les
+requêtes. Une recherche ne parcourt que les `nprobe` listes les plus proches.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, resoudre_csv, empreinte_fichier
+from playing_style_clusters import kmeans, matrice_features
+from player_entities import TableEntites, obtenir_entites, COLONNE_NB_CLUBS
+
+INDEX_PATH = os.environ.get('SIMILARITE_INDEX_PATH', os.path.join(CACHE_DIR, 'similarite'))
+
+# Version du format (reconstruction si elle change)
+VERSION_INDEX = 3
+
+# Features du profil (par 90 minutes, taux tels quels)
+FEATURES_SIMILARITE = [
+    'Gls', 'Ast', 'xG', 'npxG', 'xAG', 'Sh', 'KP', 'SCA', 'PrgP', 'PrgC', 'PrgR', 'Succ',
+    'Touches', 'Att Pen', 'Crs', 'Tkl', 'Int', 'Clr', 'Blocks', 'Recov', 'Cmp%', 'Won%'
+]
+
+# Minutes minimum pour être indexé (en dessous, les taux par 90 sont du bruit)
+MIN_MINUTES_INDEX = 270
+
+# Colonnes d'identité conservées pour les résultats
+COLONNES_IDENTITE = ['Player', 'Squad', 'Comp', 'Pos', 'Age', 'Born', 'Nation', COLONNE_NB_CLUBS]
+COLONNES_SAISON = ['Season', 'season', 'saison']
+
+# Listes parcourues par défaut, et budget mémoire (en flottants) de l'échantillon k-means
+NPROBE_DEFAUT = 8
+BUDGET_KMEANS = 2 * 10 ** 7
+
+# Compactage automatique quand le delta dépasse cette fraction de la base
+SEUIL_COMPACTAGE = 0.25
+
+
+def saison_depuis_nom(csv_path):
+    """Saison déduite du nom de fichier (ex: players_2023_2024.csv -> 2023-2024)"""
+    trouve = re.search(r'(\d{4})[-_](\d{4})', os.path.basename(csv_path))
+    return f"{trouve.group(1)}-{trouve.group(2)}" if trouve else os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def lire_source(csv_path, saison=None, min_minutes=MIN_MINUTES_INDEX):
+    """Lignes indexables d'un CSV avec leur saison: une ligne fusionnée par joueur-saison"""
+    utiles = ['Min', *COLONNES_IDENTITE, *COLONNES_SAISON, *FEATURES_SIMILARITE]
+    entete = pd.read_csv(csv_path, nrows=0).columns
+    colonne_saison = next((c for c in COLONNES_SAISON if c in entete), None)
+    if colonne_saison:
+        # Plusieurs saisons dans le fichier: entités calculées saison par saison
+        df = pd.read_csv(csv_path, low_memory=False)
+        df = pd.concat([TableEntites.construire(groupe).lignes
+                        for _, groupe in df.groupby(df[colonne_saison].astype(str), sort=False)],
+                       ignore_index=True)
+    else:
+        df = obtenir_entites(csv_path).lignes.reset_index(drop=True)
+    df = df[[c for c in utiles if c in df.columns]]
+    minutes = pd.to_numeric(df['Min'], errors='coerce').fillna(0)
+    df = df[minutes >= min_minutes].reset_index(drop=True)
+    df['_saison'] = df[colonne_saison].astype(str) if colonne_saison else (saison or saison_depuis_nom(csv_path))
+    return df
+
+
+def _meme_source(source, csv_path, saison):
+    """Même fichier ou même saison qu'une source déjà indexée (à remplacer si le CSV a changé)"""
+    return source['csv_path'] == os.path.abspath(csv_path) or source['saison'] == saison
+
+
+def _vecteurs_bruts(df):
+    return matrice_features(df, FEATURES_SIMILARITE).to_numpy(dtype=np.float64)
+
+
+def _standardiser(X, moyennes, ecarts):
+    """z-scores en float32, valeurs manquantes ramenées à la moyenne (z = 0)"""
+    Z = (X - moyennes) / ecarts
+    return np.nan_to_num(Z, nan=0.0).astype(np.float32)
+
+
+def _distances_carrees(X, C):
+    """Distances euclidiennes au carré entre les lignes de X et de C (sans tenseur n x k x d)"""
+    d2 = (X * X).sum(axis=1)[:, None] - 2 * X @ C.T + (C * C).sum(axis=1)[None, :]
+    return np.maximum(d2, 0)
+
+
+def affecter_listes(Z, centroides, taille_bloc=65536):
+    """Liste inversée (centroïde le plus proche) de chaque vecteur, par blocs"""
+    return np.concatenate([
+        _distances_carrees(Z[debut:debut + taille_bloc], centroides).argmin(axis=1)
+        for debut in range(0, len(Z), taille_bloc)
+    ]) if len(Z) else np.zeros(0, dtype=np.int64)
+
+
+def _identites(df):
+    """Une ligne JSON par joueur-saison (nom, équipe, compétition, poste, âge, saison)"""
+    colonnes = [c for c in COLONNES_IDENTITE if c in df.columns]
+    lignes = []
+    for valeurs in zip(*(df[c] for c in colonnes), df['_saison']):
+        identite = {c: (None if isinstance(v, float) and v != v else v) for c, v in zip(colonnes, valeurs)}
+        identite['saison'] = valeurs[-1]
+        lignes.append(json.dumps(identite, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+    return lignes
+
+
+def _sauver_npy(chemin, tableau):
+    tmp = f"{chemin}.{os.getpid()}.tmp.npy"
+    np.save(tmp, tableau)
+    os.replace(tmp, chemin)
+
+
+def _lire_meta(chemin):
+    try:
+        with open(os.path.join(chemin, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if meta.get('version') == VERSION_INDEX else None
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _ecrire_meta(chemin, meta):
+    fichier = os.path.join(chemin, 'meta.json')
+    tmp = f"{fichier}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, fichier)
+
+
+def _fichier(chemin, nom, generation, extension='npy'):
+    return os.path.join(chemin, f"{nom}_{generation}.{extension}")
+
+
+def _ecrire_generation(chemin, meta, centroides, base, listes_base, ids_base):
+    """Écrit une génération (base triée par liste, delta vide) puis bascule meta.json"""
+    generation = meta['generation']
+    ordre = np.argsort(listes_base, kind='stable')
+    offsets = np.searchsorted(listes_base[ordre], np.arange(len(centroides) + 1)).astype(np.int64)
+    _sauver_npy(_fichier(chemin, 'centroides', generation), centroides.astype(np.float32))
+    _sauver_npy(_fichier(chemin, 'base', generation), base[ordre].astype(np.float32))
+    _sauver_npy(_fichier(chemin, 'offsets', generation), offsets)
+    _sauver_npy(_fichier(chemin, 'base_ids', generation), ids_base[ordre].astype(np.int64))
+    _sauver_npy(_fichier(chemin, 'delta_listes', generation), np.zeros(0, dtype=np.int64))
+    _sauver_npy(_fichier(chemin, 'delta_ids', generation), np.zeros(0, dtype=np.int64))
+    open(_fichier(chemin, 'delta', generation, 'f32'), 'wb').close()
+    meta.update({'n_base': int(len(base)), 'n_delta': 0})
+    _ecrire_meta(chemin, meta)
+
+    # Générations précédentes: les lecteurs déjà ouverts gardent leurs projections
+    for nom in os.listdir(chemin):
+        trouve = re.match(r'.+_(\d+)\.(npy|f32)$', nom)
+        if trouve and int(trouve.group(1)) != generation:
+            os.remove(os.path.join(chemin, nom))
+
+
+def construire_index(sources, chemin=None, nlist=None, seed=0):
+    """Construit l'index hors ligne: sources = [{'csv_path': ..., 'saison': ...}, ...]"""
+    chemin = chemin or INDEX_PATH
+    os.makedirs(chemin, exist_ok=True)
+    frames, infos = [], []
+    for source in sources:
+        csv_path = resoudre_csv(source.get('csv_path'))
+        df = lire_source(csv_path, source.get('saison'))
+        frames.append(df)
+        infos.append({'csv_path': os.path.abspath(csv_path), 'empreinte': empreinte_fichier(csv_path),
+                      'saison': source.get('saison') or saison_depuis_nom(csv_path), 'lignes': len(df)})
+    df = pd.concat(frames, ignore_index=True)
+    X = _vecteurs_bruts(df)
+    moyennes = np.nan_to_num(np.nanmean(X, axis=0))
+    ecarts = np.nanstd(X, axis=0)
+    ecarts = np.where((ecarts > 0) & np.isfinite(ecarts), ecarts, 1.0)
+    Z = _standardiser(X, moyennes, ecarts)
+
+    # Listes inversées: k-means sur un échantillon borné en mémoire (n x k x d flottants)
+    nlist = int(nlist or np.clip(round(np.sqrt(len(Z))), 4, 256))
+    nlist = max(1, min(nlist, len(Z)))
+    taille = min(len(Z), max(nlist * 8, BUDGET_KMEANS // (nlist * Z.shape[1])))
+    rng = np.random.default_rng(seed)
+    echantillon = Z[rng.choice(len(Z), size=taille, replace=False)].astype(np.float64)
+    centroides, _ = kmeans(echantillon, nlist, seed=seed, iterations=25)
+    centroides = centroides.astype(np.float32)
+
+    identites = _identites(df)
+    tmp = os.path.join(chemin, f"joueurs.jsonl.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.writelines(identites)
+    os.replace(tmp, os.path.join(chemin, 'joueurs.jsonl'))
+    _sauver_npy(os.path.join(chemin, 'joueurs_offsets.npy'),
+                np.concatenate([[0], np.cumsum([len(l) for l in identites])]).astype(np.int64))
+
+    ancien = _lire_meta(chemin)
+    meta = {
+        'version': VERSION_INDEX,
+        'generation': (ancien['generation'] + 1) if ancien else 1,
+        'features': FEATURES_SIMILARITE,
+        'moyennes': moyennes.tolist(),
+        'ecarts': ecarts.tolist(),
+        'nlist': int(len(centroides)),
+        'min_minutes': MIN_MINUTES_INDEX,
+        'n_joueurs': len(identites),
+        'octets_joueurs': int(sum(len(l) for l in identites)),
+        'sources': infos
+    }
+    _ecrire_generation(chemin, meta, centroides, Z, affecter_listes(Z, centroides),
+                       np.arange(len(Z), dtype=np.int64))
+    return {'chemin': os.path.abspath(chemin), 'joueurs': len(identites), 'nlist': meta['nlist']}
+
+
+def inserer(csv_path, saison=None, chemin=None, compacter_auto=True):
+    """Ajoute les lignes d'un nouveau CSV (saison) au segment delta, sans réapprendre les listes;
+    une source déjà indexée (même fichier ou même saison) dont le contenu a changé est remplacée"""
+    chemin = chemin or INDEX_PATH
+    meta = _lire_meta(chemin)
+    if meta is None:
+        return construire_index([{'csv_path': csv_path, 'saison': saison}], chemin)
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_fichier(csv_path)
+    if any(s['empreinte'] == empreinte for s in meta['sources']):
+        return {'chemin': os.path.abspath(chemin), 'ajoutes': 0, 'deja_indexe': True}
+    saison = saison or saison_depuis_nom(csv_path)
+    remplacees = [s for s in meta['sources'] if _meme_source(s, csv_path, saison)]
+    if remplacees:
+        # Les lignes d'une source ne sont pas adressables dans la base: reconstruction complète
+        sources = [{'csv_path': s['csv_path'], 'saison': s['saison']} for s in meta['sources']
+                   if s not in remplacees] + [{'csv_path': csv_path, 'saison': saison}]
+        return {**construire_index(sources, chemin), 'remplace': [s['csv_path'] for s in remplacees]}
+
+    generation = meta['generation']
+    df = lire_source(csv_path, saison, meta['min_minutes'])
+    Z = _standardiser(_vecteurs_bruts(df), np.asarray(meta['moyennes']), np.asarray(meta['ecarts']))
+    centroides = np.load(_fichier(chemin, 'centroides', generation))
+    listes = affecter_listes(Z, centroides)
+    ids = np.arange(meta['n_joueurs'], meta['n_joueurs'] + len(Z), dtype=np.int64)
+
+    # Ajouts en fin de fichier, tronqués d'abord à la taille connue de meta.json (écriture interrompue)
+    identites = _identites(df)
+    with open(os.path.join(chemin, 'joueurs.jsonl'), 'r+b') as f:
+        f.truncate(meta['octets_joueurs'])
+        f.seek(0, os.SEEK_END)
+        f.writelines(identites)
+    dimension = len(meta['features'])
+    with open(_fichier(chemin, 'delta', generation, 'f32'), 'r+b') as f:
+        f.truncate(meta['n_delta'] * dimension * 4)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(Z, dtype=np.float32).tobytes())
+
+    offsets = np.load(os.path.join(chemin, 'joueurs_offsets.npy'))
+    _sauver_npy(os.path.join(chemin, 'joueurs_offsets.npy'),
+                np.concatenate([offsets, offsets[-1] + np.cumsum([len(l) for l in identites])]).astype(np.int64))
+    _sauver_npy(_fichier(chemin, 'delta_listes', generation),
+                np.concatenate([np.load(_fichier(chemin, 'delta_listes', generation)), listes]).astype(np.int64))
+    _sauver_npy(_fichier(chemin, 'delta_ids', generation),
+                np.concatenate([np.load(_fichier(chemin, 'delta_ids', generation)), ids]))
+
+    meta['n_delta'] += len(Z)
+    meta['n_joueurs'] += len(identites)
+    meta['octets_joueurs'] += sum(len(l) for l in identites)
+    meta['sources'].append({'csv_path': os.path.abspath(csv_path), 'empreinte': empreinte,
+                            'saison': saison, 'lignes': len(df)})
+    _ecrire_meta(chemin, meta)
+
+    resultat = {'chemin': os.path.abspath(chemin), 'ajoutes': len(Z), 'n_delta': meta['n_delta']}
+    if compacter_auto and meta['n_delta'] > SEUIL_COMPACTAGE * max(meta['n_base'], 1):
+        resultat['compactage'] = compacter(chemin)
+    return resultat
+
+
+def compacter(chemin=None):
+    """Fusionne le delta dans une nouvelle génération de la base (mêmes centroïdes)"""
+    chemin = chemin or INDEX_PATH
+    index = IndexSimilarite(chemin)
+    meta = dict(index.meta)
+    base = np.concatenate([np.asarray(index.base), np.asarray(index.delta)])
+    listes = np.concatenate([np.repeat(np.arange(index.nlist), np.diff(index.offsets)), index.delta_listes])
+    ids = np.concatenate([np.asarray(index.base_ids), np.asarray(index.delta_ids)])
+    centroides = np.asarray(index.centroides)
+    index.fermer()
+    meta['generation'] += 1
+    _ecrire_generation(chemin, meta, centroides, base, listes, ids)
+    return {'generation': meta['generation'], 'n_base': meta['n_base']}
+
+
+class IndexSimilarite:
+    """Lecture de l'index (fichiers projetés en mémoire, aucun chargement complet)"""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or INDEX_PATH
+        self.meta = _lire_meta(self.chemin)
+        if self.meta is None:
+            raise FileNotFoundError(f"Aucun index de similarité dans {self.chemin}")
+        generation = self.meta['generation']
+        self.moyennes = np.asarray(self.meta['moyennes'])
+        self.ecarts = np.asarray(self.meta['ecarts'])
+        self.centroides = np.load(_fichier(self.chemin, 'centroides', generation))
+        self.nlist = len(self.centroides)
+        self.base = np.load(_fichier(self.chemin, 'base', generation), mmap_mode='r')
+        self.offsets = np.load(_fichier(self.chemin, 'offsets', generation))
+        self.base_ids = np.load(_fichier(self.chemin, 'base_ids', generation), mmap_mode='r')
+        n_delta = self.meta['n_delta']
+        dimension = len(self.meta['features'])
+        self.delta = np.memmap(_fichier(self.chemin, 'delta', generation, 'f32'), dtype=np.float32,
+                               mode='r', shape=(n_delta, dimension)) if n_delta else \
+            np.zeros((0, dimension), dtype=np.float32)
+        self.delta_listes = np.load(_fichier(self.chemin, 'delta_listes', generation))[:n_delta]
+        self.delta_ids = np.load(_fichier(self.chemin, 'delta_ids', generation))[:n_delta]
+        self.joueurs_offsets = np.load(os.path.join(self.chemin, 'joueurs_offsets.npy'), mmap_mode='r')
+        self._joueurs = open(os.path.join(self.chemin, 'joueurs.jsonl'), 'rb')
+
+    def fermer(self):
+        self._joueurs.close()
+
+    def __len__(self):
+        return self.meta['n_base'] + self.meta['n_delta']
+
+    def vectoriser(self, df):
+        """Vecteurs standardisés de joueurs (DataFrame au format du CSV)"""
+        return _standardiser(_vecteurs_bruts(df), self.moyennes, self.ecarts)
+
+    def identite(self, id_joueur):
+        """Identité d'un joueur-saison (lecture d'une seule ligne du fichier)"""
+        debut, fin = self.joueurs_offsets[id_joueur], self.joueurs_offsets[id_joueur + 1]
+        self._joueurs.seek(int(debut))
+        return json.loads(self._joueurs.read(int(fin - debut)))
+
+    def vecteur(self, position):
+        """Vecteur et identifiant à une position globale (base puis delta)"""
+        n_base = self.meta['n_base']
+        if position < n_base:
+            return np.asarray(self.base[position]), int(self.base_ids[position])
+        return np.asarray(self.delta[position - n_base]), int(self.delta_ids[position - n_base])
+
+    def _meilleurs(self, vecteurs, ids, q, k):
+        if not len(ids):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        d2 = ((vecteurs - q) ** 2).sum(axis=1)
+        k = min(k, len(d2))
+        meilleurs = np.argpartition(d2, k - 1)[:k]
+        meilleurs = meilleurs[np.argsort(d2[meilleurs], kind='stable')]
+        return np.asarray(ids)[meilleurs], np.sqrt(d2[meilleurs])
+
+    def rechercher(self, q, k=10, nprobe=NPROBE_DEFAUT):
+        """(ids, distances) approximatifs: seules les nprobe listes les plus proches sont lues"""
+        q = np.asarray(q, dtype=np.float32)
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        proches = np.argpartition(((self.centroides - q) ** 2).sum(axis=1), nprobe - 1)[:nprobe]
+        # Tranches contiguës de la base (triée par liste) + lignes du delta dans ces listes
+        tranches = [slice(self.offsets[l], self.offsets[l + 1]) for l in proches]
+        dans_delta = np.isin(self.delta_listes, proches)
+        vecteurs = np.concatenate([self.base[t] for t in tranches] + [self.delta[dans_delta]])
+        ids = np.concatenate([self.base_ids[t] for t in tranches] + [self.delta_ids[dans_delta]])
+        return self._meilleurs(vecteurs, ids, q, k)
+
+    def rechercher_exact(self, q, k=10, taille_bloc=262144):
+        """(ids, distances) exacts par parcours complet (référence du banc d'essai)"""
+        q = np.asarray(q, dtype=np.float32)
+        candidats_ids, candidats_d = [], []
+        for vecteurs, ids in [(self.base, self.base_ids), (self.delta, self.delta_ids)]:
+            for debut in range(0, len(vecteurs), taille_bloc):
+                i, d = self._meilleurs(vecteurs[debut:debut + taille_bloc], ids[debut:debut + taille_bloc], q, k)
+                candidats_ids.append(i)
+                candidats_d.append(d)
+        ids, distances = np.concatenate(candidats_ids), np.concatenate(candidats_d)
+        ordre = np.argsort(distances, kind='stable')[:k]
+        return ids[ordre], distances[ordre]
+
+    def voisins(self, q, k=10, nprobe=NPROBE_DEFAUT, exclure=None, marge=1):
+        """Joueurs-saisons les plus proches, avec leur identité et leur distance"""
+        # marge: nombre maximal de lignes exclues (ex: une par club du joueur)
+        ids, distances = self.rechercher(q, k + marge if exclure else k, nprobe)
+        resultats = []
+        for id_joueur, distance in zip(ids, distances):
+            identite = self.identite(int(id_joueur))
+            if exclure and exclure(identite):
+                continue
+            resultats.append({**identite, 'distance': round(float(distance), 3)})
+        return resultats[:k]
+
+
+def evaluer(index, nb_requetes=200, k=10, nprobes=(1, 2, 4, 8, 16, 32), graine=0):
+    """Banc d'essai rappel@k / latence contre la recherche exacte (requêtes tirées de l'index)"""
+    rng = np.random.default_rng(graine)
+    positions = rng.choice(len(index), size=min(nb_requetes, len(index)), replace=False)
+    requetes = [index.vecteur(int(p)) for p in positions]
+
+    def sans_soi(ids, id_requete):
+        return [i for i in ids.tolist() if i != id_requete][:k]
+
+    exacts, durees = [], []
+    for q, id_requete in requetes:
+        debut = time.perf_counter()
+        ids, _ = index.rechercher_exact(q, k + 1)
+        durees.append(time.perf_counter() - debut)
+        exacts.append(set(sans_soi(ids, id_requete)))
+
+    def latences(valeurs):
+        valeurs = np.asarray(valeurs) * 1000
+        return {'p50': round(float(np.percentile(valeurs, 50)), 3),
+                'p95': round(float(np.percentile(valeurs, 95)), 3)}
+
+    resultats = []
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            continue
+        rappels, durees_ivf = [], []
+        for (q, id_requete), exact in zip(requetes, exacts):
+            debut = time.perf_counter()
+            ids, _ = index.rechercher(q, k + 1, nprobe)
+            durees_ivf.append(time.perf_counter() - debut)
+            rappels.append(len(exact & set(sans_soi(ids, id_requete))) / max(len(exact), 1))
+        resultats.append({'nprobe': nprobe, 'rappel': round(float(np.mean(rappels)), 4),
+                          'latence_ms': latences(durees_ivf)})
+    return {
+        'joueurs': len(index), 'nlist': index.nlist, 'requetes': len(requetes), 'k': k,
+        'exact_latence_ms': latences(durees),
+        'ivf': resultats
+    }
+
+
+_INDEX = {}
+
+
+def obtenir_index(csv_path=None, chemin=None):
+    """Index ouvert (par processus) couvrant le CSV: construit ou complété si besoin"""
+    chemin = chemin or INDEX_PATH
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_fichier(csv_path)
+    index = _INDEX.get(chemin)
+    if index is not None and any(s['empreinte'] == empreinte for s in index.meta['sources']):
+        return index
+    meta = _lire_meta(chemin)
+    if meta is None:
+        construire_index([{'csv_path': csv_path}], chemin)
+    elif not any(s['empreinte'] == empreinte for s in meta['sources']):
+        inserer(csv_path, chemin=chemin)
+    if index is not None:
+        index.fermer()
+    _INDEX[chemin] = IndexSimilarite(chemin)
+    return _INDEX[chemin]
+
+
+def main():
+    """Point d'entrée: build '<json>' | insert <csv> [saison] | compact | query <joueur> [equipe] [k] [nprobe] | bench [requetes] [k]"""
+    if len(sys.argv) < 2:
+        print("Usage: python similarity_index.py <build|insert|compact|query|bench> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action == "build":
+        params = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+        sources = params.get('sources') or [{'csv_path': None}]
+        print(json.dumps({"success": True, **construire_index(sources, nlist=params.get('nlist'))},
+                         ensure_ascii=False))
+
+    elif action == "insert":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Chemin du CSV requis"}))
+            sys.exit(1)
+        resultat = inserer(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(json.dumps({"success": True, **resultat}, ensure_ascii=False))
+
+    elif action == "compact":
+        print(json.dumps({"success": True, **compacter()}, ensure_ascii=False))
+
+    elif action == "query":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom du joueur requis"}))
+            sys.exit(1)
+        nom = sys.argv[2].lower()
+        equipe = sys.argv[3].lower() if len(sys.argv) > 3 and sys.argv[3] else None
+        k = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+        nprobe = int(sys.argv[5]) if len(sys.argv) > 5 else NPROBE_DEFAUT
+        df = lire_source(resoudre_csv(), min_minutes=0)
+        trouve = df[df['Player'].str.lower().str.contains(nom, regex=False, na=False)]
+        if equipe:
+            trouve = trouve[trouve['Squad'].str.lower().str.contains(equipe, regex=False, na=False)]
+        if trouve.empty:
+            print(json.dumps({"error": f"Joueur '{sys.argv[2]}' non trouvé"}, ensure_ascii=False))
+            return
+        ligne = trouve.iloc[0]
+        index = obtenir_index()
+        voisins = index.voisins(index.vectoriser(trouve.iloc[:1])[0], k, nprobe, exclure=lambda j: (
+            j['Player'] == ligne['Player'] and j['Squad'] == ligne['Squad'] and j['saison'] == ligne['_saison']))
+        print(json.dumps({"joueur": ligne['Player'], "equipe": ligne['Squad'], "similaires": voisins},
+                         ensure_ascii=False))
+
+    elif action == "bench":
+        index = IndexSimilarite()
+        print(json.dumps(evaluer(index, int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+                                 int(sys.argv[3]) if len(sys.argv) > 3 else 10), ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
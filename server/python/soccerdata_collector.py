@@ -4,9 +4,36 @@ import json
 import soccerdata as sd
 import pandas as pd
 from datetime import datetime
+from aggregate_cube import obtenir_cube_disponible, CHAMPIONNATS_SOCCERDATA
+from ndjson_stream import flux, ecrire_ndjson, iterer_dataframe, iterer_csv, iterer_jsonl
+from player_dataset import resoudre_csv
+from report_data_resolver import SAISON_CSV, _normaliser_saison
+from upstream_guard import garde, configurer_soccerdata
+from team_ratings import obtenir_classement, normaliser_calendrier, lire_calendrier
 import warnings
 warnings.filterwarnings('ignore')
 
+configurer_soccerdata(sd)
+
+def read_player_season_stats(league, season=None):
+    """Read a player season table through the shared upstream guard (single-flight + breaker)"""
+    def fetch():
+        fbref = sd.FBref(leagues=[league], seasons=[season]) if season else sd.FBref()
+        return fbref.read_player_season_stats(league)
+    
+    stats, meta = garde('fbref').obtenir((league, season, 'player_season_stats'), fetch)
+    if 'player' not in stats.columns:
+        stats = stats.reset_index()
+    return stats, meta
+
+def read_schedule(league):
+    """Read a league schedule through the shared upstream guard"""
+    return garde('fbref').obtenir((league, None, 'schedule'), lambda: sd.FBref().read_schedule(league))
+
+def read_league_table(league):
+    """Read a league table through the shared upstream guard"""
+    return garde('fbref').obtenir((league, None, 'league_table'), lambda: sd.FBref().read_league_table(league))
+
 def get_player_stats(params):
     """Get detailed player statistics"""
     try:
@@ -14,11 +41,8 @@ def get_player_stats(params):
         team = params.get('team')
         league = params.get('league', 'ENG-Premier League')
         
-        # Initialize data sources
-        fbref = sd.FBref()
-        
-        # Get player stats
-        stats = fbref.read_player_season_stats(league)
+        # Get player stats (shared fetch, last good data when FBref is rate limiting)
+        stats, meta = read_player_season_stats(league)
         
         # Filter for the specific player
         player_stats = stats[stats['player'].str.contains(player_name, case=False, na=False)]
@@ -42,7 +66,8 @@ def get_player_stats(params):
             return {
                 'success': True,
                 'player_stats': result,
-                'source': 'fbref'
+                'source': 'fbref',
+                'stale': meta['stale']
             }
         else:
             return {
@@ -62,13 +87,12 @@ def get_league_stats(params):
         league = params.get('league', 'ENG-Premier League')
         season = params.get('season', '2024-25')
         
-        fbref = sd.FBref()
+        # Get league table and match results (shared fetches, last good data when rate limited)
+        league_table, meta_table = read_league_table(league)
+        matches, meta_matches = read_schedule(league)
         
-        # Get league table
-        league_table = fbref.read_league_table(league)
-        
-        # Get match results
-        matches = fbref.read_schedule(league)
+        # Team ratings use the whole schedule (only unseen matches are applied)
+        ratings = update_team_ratings(league, normaliser_calendrier(matches))
         
         # Convert to JSON
         table_data = league_table.reset_index().to_dict('records')
@@ -88,8 +112,52 @@ def get_league_stats(params):
             'success': True,
             'league_table': table_data,
             'recent_matches': match_data,
+            'team_ratings': ratings.classement(),
             'league': league,
-            'season': season
+            'season': season,
+            'stale': meta_table['stale'] or meta_matches['stale']
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+def update_team_ratings(league, schedule):
+    """Apply unseen or corrected played matches to the league ratings state and persist it"""
+    ratings = obtenir_classement(league)
+    resultat = ratings.mettre_a_jour(schedule)
+    if resultat['ajoutes'] or resultat['corriges']:
+        ratings.sauvegarder()
+    return ratings
+
+def load_team_ratings(params):
+    """League ratings, updated from a saved schedule file or FBref when asked (or when empty)"""
+    league = params.get('league', 'ENG-Premier League')
+    if params.get('fichier'):
+        return update_team_ratings(league, lire_calendrier(params['fichier']))
+    ratings = obtenir_classement(league)
+    if params.get('refresh') or not ratings.equipes:
+        matches, _ = read_schedule(league)
+        ratings = update_team_ratings(league, normaliser_calendrier(matches))
+    return ratings
+
+def get_team_ratings(params):
+    """Get Elo and xG attack/defence ratings for a league, or for one team"""
+    try:
+        ratings = load_team_ratings(params)
+        team = params.get('team')
+        if team:
+            rating = ratings.equipe(team)
+            if rating is None:
+                return {'success': False, 'error': 'Team not found'}
+            return {'success': True, 'team_rating': rating, 'league': ratings.ligue}
+        return {
+            'success': True,
+            'team_ratings': ratings.classement(params.get('limit')),
+            'matches': len(ratings.historique),
+            'league': ratings.ligue
         }
         
     except Exception as e:
@@ -98,6 +166,25 @@ def get_league_stats(params):
             'error': str(e)
         }
 
+def predict_matchup(params):
+    """Expected goals and 1X2 probabilities for a home / away pairing"""
+    try:
+        home_team = params.get('home_team')
+        away_team = params.get('away_team')
+        if not home_team or not away_team:
+            return {'success': False, 'error': "Parameters 'home_team' and 'away_team' are required"}
+        
+        prediction = load_team_ratings(params).confrontation(home_team, away_team)
+        if 'error' in prediction:
+            return {'success': False, **prediction}
+        return {'success': True, 'matchup': prediction}
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
 def get_team_stats(params):
     """Get team statistics"""
     try:
@@ -105,10 +192,22 @@ def get_team_stats(params):
         league = params.get('league', 'ENG-Premier League')
         season = params.get('season', '2024-25')
         
-        fbref = sd.FBref()
+        # Serve team totals from the local aggregate cube only for the CSV season and league
+        comp = CHAMPIONNATS_SOCCERDATA.get(league)
+        cube = obtenir_cube_disponible() if comp and _normaliser_saison(season) == SAISON_CSV else None
+        equipe = cube.trouver_equipe(team, comp) if cube else None
+        if equipe:
+            return {
+                'success': True,
+                'team_stats': cube.resume_equipe(*equipe),
+                'team': equipe[1],
+                'league': league,
+                'source': 'csv_cube'
+            }
         
-        # Get team stats
-        team_stats = fbref.read_team_season_stats(league)
+        # Get team stats (shared fetch, last good data when FBref is rate limiting)
+        team_stats, _ = garde('fbref').obtenir(
+            (league, None, 'team_season_stats'), lambda: sd.FBref().read_team_season_stats(league))
         
         # Filter for specific team
         team_data = team_stats[team_stats.index.str.contains(team, case=False, na=False)]
@@ -147,10 +246,8 @@ def get_performance_analysis(params):
         player_name = params.get('player_name')
         position = params.get('position')
         
-        fbref = sd.FBref()
-        
         # Get player performance data
-        stats = fbref.read_player_season_stats('ENG-Premier League')
+        stats, meta = read_player_season_stats('ENG-Premier League')
         
         # Filter for player
         player_data = stats[stats['player'].str.contains(player_name, case=False, na=False)]
@@ -183,7 +280,8 @@ def get_performance_analysis(params):
                 'success': True,
                 'player_stats': player_stats,
                 'percentiles': percentiles,
-                'position': position
+                'position': position,
+                'stale': meta['stale']
             }
         else:
             return {
@@ -203,8 +301,7 @@ def compare_players(params):
         player_names = params.get('player_names', [])
         metric = params.get('metric', 'overall')
         
-        fbref = sd.FBref()
-        stats = fbref.read_player_season_stats('ENG-Premier League')
+        stats, meta = read_player_season_stats('ENG-Premier League')
         
         comparison_data = []
         
@@ -229,7 +326,8 @@ def compare_players(params):
         return {
             'success': True,
             'comparison': comparison_data,
-            'metric': metric
+            'metric': metric,
+            'stale': meta['stale']
         }
         
     except Exception as e:
@@ -263,6 +361,52 @@ def get_available_leagues(params):
             'error': str(e)
         }
 
+def stream_schedule(params):
+    """Stream the league schedule as NDJSON rows"""
+    league = params.get('league', 'ENG-Premier League')
+    
+    def source(colonnes, debut):
+        matches, _ = read_schedule(league)
+        return iterer_dataframe(matches, colonnes, debut)
+    
+    return flux(source, params)
+
+def stream_league_table(params):
+    """Stream the league table as NDJSON rows"""
+    league = params.get('league', 'ENG-Premier League')
+    
+    def source(colonnes, debut):
+        league_table, _ = read_league_table(league)
+        return iterer_dataframe(league_table, colonnes, debut)
+    
+    return flux(source, params)
+
+def stream_player_table(params):
+    """Stream player season rows, from the local CSV (chunked) or from FBref"""
+    league = params.get('league')
+    
+    def source(colonnes, debut):
+        if league:
+            stats, _ = read_player_season_stats(league)
+            return iterer_dataframe(stats, colonnes, debut)
+        return iterer_csv(resoudre_csv(params.get('csv_path')), colonnes, debut)
+    
+    return flux(source, params)
+
+def stream_batch_results(params):
+    """Stream a JSON Lines batch result file (e.g. generer_rapports_lot output)"""
+    fichier = params.get('fichier')
+    if not fichier:
+        raise ValueError("Parameter 'fichier' is required")
+    return flux(lambda colonnes, debut: iterer_jsonl(fichier, colonnes, debut), params)
+
+STREAM_ACTIONS = {
+    'stream_schedule': stream_schedule,
+    'stream_league_table': stream_league_table,
+    'stream_player_table': stream_player_table,
+    'stream_batch_results': stream_batch_results
+}
+
 def main():
     if len(sys.argv) != 3:
         print(json.dumps({'success': False, 'error': 'Invalid arguments'}))
@@ -271,12 +415,26 @@ def main():
     action = sys.argv[1]
     params = json.loads(sys.argv[2])
     
+    # List-style actions are written row by row as NDJSON
+    if action in STREAM_ACTIONS:
+        try:
+            lignes = STREAM_ACTIONS[action](params)
+        except Exception as e:
+            print(json.dumps({'_meta': {'lignes': 0, 'next_cursor': None, 'error': str(e)}}))
+            return
+        ecrire_ndjson(lignes)
+        return
+    
     if action == 'get_player_stats':
         result = get_player_stats(params)
     elif action == 'get_league_stats':
         result = get_league_stats(params)
     elif action == 'get_team_stats':
         result = get_team_stats(params)
+    elif action == 'get_team_ratings':
+        result = get_team_ratings(params)
+    elif action == 'predict_matchup':
+        result = predict_matchup(params)
     elif action == 'get_performance_analysis':
         result = get_performance_analysis(params)
     elif action == 'compare_players':
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+SQLite Backend - Base SQLite indexée comme alternative au DataFrame en mémoire
+Le ou les CSV sont ingérés une fois dans un fichier SQLite (index sur nom normalisé, Squad,
+Comp, Pos, FTS5 sur les noms, index d'expression pour les percentiles): lignes par club et
+une ligne de saison par joueur (fusionnée s'il a changé de club, cf. player_entities).
+L'analyseur s'y branche comme sur le store partagé: recherche par requête indexée,
+percentiles par comptage sur intervalle. Les processus courts partagent le fichier via le
+cache de pages.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+
+from player_dataset import (
+    CACHE_DIR, STATS_PERCENTILES, MIN_JOUEURS_POSTE, resoudre_csv, empreinte_fichier, normaliser_nom
+)
+from player_entities import obtenir_entites, COLONNE_NB_CLUBS
+
+DB_PATH = os.path.join(CACHE_DIR, 'joueurs.sqlite')
+
+# Version du schéma (réingestion si elle change)
+VERSION_SCHEMA = 3
+
+# Taille de la projection mémoire: les pages lues sont partagées entre processus
+MMAP_SIZE = 256 * 1024 * 1024
+
+COLONNES_INDEXEES = ['Squad', 'Comp', 'Pos']
+
+
+def _q(colonne):
+    """Identifiant SQL quoté (les colonnes FBref contiennent %, /, +, espaces)"""
+    return '"' + colonne.replace('"', '""') + '"'
+
+
+def _expression_fts(requete):
+    """Requête FTS5: chaque mot (sans accents) comme préfixe d'un mot du nom"""
+    mots = normaliser_nom(requete).replace('"', ' ').split()
+    return ' '.join(f'"{mot}"*' for mot in mots)
+
+
+def _inserer(connexion, df, colonnes, csv_path, saison, entites, nb_clubs):
+    """Insère les lignes d'un DataFrame (par club: saison = 0, nb_clubs NULL)"""
+    valeurs = df[colonnes].astype(object).where(df[colonnes].notna(), None)
+    lignes = (
+        (normaliser_nom(ligne[0]), normaliser_nom(ligne[1]),
+         str(ligne[0]).lower() if ligne[0] is not None else '',
+         str(ligne[1]).lower() if ligne[1] is not None else '', csv_path,
+         saison, int(entite), None if nb is None else int(nb), *ligne[2:])
+        for ligne, entite, nb in zip(zip(valeurs['Player'], valeurs['Squad'], *(valeurs[c] for c in colonnes)),
+                                     entites, nb_clubs)
+    )
+    connexion.executemany(
+        f"INSERT INTO joueurs (_nom, _equipe, _nom_min, _equipe_min, _source, _saison, _entite, _nb_clubs, "
+        f"{', '.join(_q(c) for c in colonnes)}) "
+        f"VALUES ({', '.join('?' * (len(colonnes) + 8))})", lignes)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def ingerer_csv(csv_paths=None, db_path=None):
+    """Ingère un ou plusieurs CSV dans une nouvelle base, remplacée de façon atomique"""
+    import pandas as pd
+
+    csv_paths = [resoudre_csv(p) for p in (csv_paths or [None])]
+    db_path = db_path or DB_PATH
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    connexion = sqlite3.connect(tmp)
+    try:
+        connexion.execute("CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT)")
+        colonnes = []
+        numeriques = set()
+        nb_joueurs = 0
+        nb_lignes_club = 0
+        sources = []
+        for csv_path in csv_paths:
+            df = pd.read_csv(csv_path)
+            table = obtenir_entites(csv_path, df)
+            nouvelles = [c for c in df.columns if c not in colonnes]
+            if not colonnes:
+                # Colonnes sans type déclaré: chaque valeur garde son type (int / float / texte)
+                connexion.execute(
+                    "CREATE TABLE joueurs (_nom TEXT, _equipe TEXT, _nom_min TEXT, _equipe_min TEXT, _source TEXT, "
+                    "_saison INTEGER, _entite INTEGER, _nb_clubs INTEGER, "
+                    + ", ".join(_q(c) for c in nouvelles) + ")")
+            else:
+                for colonne in nouvelles:
+                    connexion.execute(f"ALTER TABLE joueurs ADD COLUMN {_q(colonne)}")
+            colonnes += nouvelles
+
+            # Lignes par club (ordre du CSV) puis lignes de saison; entités numérotées sur toute la base
+            _inserer(connexion, table.par_club, list(df.columns), csv_path, 0,
+                     table.entites + nb_joueurs, [None] * len(df))
+            _inserer(connexion, table.lignes, list(df.columns), csv_path, 1,
+                     range(nb_joueurs, nb_joueurs + len(table.lignes)), table.nb_clubs)
+            nb_lignes_club += len(df)
+            nb_joueurs += len(table.lignes)
+            sources.append({'csv_path': os.path.abspath(csv_path), 'signature': _signature(csv_path),
+                            'empreinte': empreinte_fichier(csv_path)})
+            numeriques.update(c for c in df.columns if df[c].dtype.kind in 'iuf')
+            del df, table
+
+        connexion.execute("CREATE INDEX idx_nom ON joueurs(_saison, _nom, _equipe)")
+        connexion.execute("CREATE INDEX idx_entite ON joueurs(_entite, _saison)")
+        for colonne in COLONNES_INDEXEES:
+            if colonne in colonnes:
+                connexion.execute(f"CREATE INDEX {_q('idx_' + colonne)} ON joueurs({_q(colonne)})")
+
+        # Percentiles sur les lignes de saison (un joueur = une ligne), NaN compté comme 0
+        # (comme fillna(0)), par poste et sur tout le fichier
+        stats = [s for s in STATS_PERCENTILES if s in numeriques]
+        for stat in stats:
+            expression = f"coalesce({_q(stat)}, 0)"
+            connexion.execute(f"CREATE INDEX {_q('idx_pct_poste_' + stat)} ON joueurs(\"Pos\", {expression}) "
+                              "WHERE _saison = 1")
+            connexion.execute(f"CREATE INDEX {_q('idx_pct_' + stat)} ON joueurs({expression}) WHERE _saison = 1")
+
+        # Recherche plein texte des noms (sans accents, par préfixe de mot)
+        connexion.execute(
+            "CREATE VIRTUAL TABLE noms_fts USING fts5(nom, equipe, tokenize='unicode61 remove_diacritics 2')")
+        connexion.execute("INSERT INTO noms_fts (rowid, nom, equipe) SELECT rowid, \"Player\", \"Squad\" FROM joueurs "
+                          "WHERE _saison = 0")
+
+        connexion.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('version', str(VERSION_SCHEMA)),
+            ('colonnes', json.dumps(colonnes, ensure_ascii=False)),
+            ('stats', json.dumps(stats)),
+            ('sources', json.dumps(sources, ensure_ascii=False)),
+            ('nb_joueurs', str(nb_joueurs)),
+            ('nb_lignes_club', str(nb_lignes_club))
+        ])
+        connexion.commit()
+        connexion.execute("ANALYZE")
+        connexion.commit()
+    finally:
+        connexion.close()
+    os.replace(tmp, db_path)
+    return {'chemin': os.path.abspath(db_path), 'nb_joueurs': nb_joueurs, 'sources': sources}
+
+
+def _lire_meta(db_path):
+    """Table meta de la base, ou None si elle est absente ou illisible"""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        connexion = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return dict(connexion.execute("SELECT cle, valeur FROM meta"))
+        finally:
+            connexion.close()
+    except sqlite3.Error:
+        return None
+
+
+def sources_enregistrees(db_path):
+    """Chemins des CSV ingérés dans la base (ordre d'ingestion), ou None"""
+    meta = _lire_meta(db_path)
+    if meta is None or 'sources' not in meta:
+        return None
+    return [s['csv_path'] for s in json.loads(meta['sources'])]
+
+
+def base_a_jour(db_path, csv_paths=None):
+    """Vrai si la base existe et que ses sources n'ont pas changé (signature, sinon empreinte);
+    avec csv_paths, les sources enregistrées doivent aussi être exactement ces CSV"""
+    meta = _lire_meta(db_path)
+    if meta is None or meta.get('version') != str(VERSION_SCHEMA):
+        return False
+    sources = json.loads(meta['sources'])
+    if csv_paths is not None:
+        chemins = [os.path.abspath(resoudre_csv(p)) for p in csv_paths]
+        if [s['csv_path'] for s in sources] != chemins:
+            return False
+    return all(
+        os.path.exists(s['csv_path']) and (
+            s['signature'] == _signature(s['csv_path']) or s['empreinte'] == empreinte_fichier(s['csv_path']))
+        for s in sources
+    )
+
+
+class SQLiteBackend:
+    """Même interface que SharedFeatureStore (search_player, percentile, index_stats)"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        self.connexion = None
+        self.version = None
+        if not self.rafraichir():
+            raise FileNotFoundError(f"Aucune base SQLite dans {self.db_path}")
+
+    @classmethod
+    def ouvrir(cls, db_path=None, csv_paths=None):
+        """Ouvre la base, en (ré)ingérant d'abord les CSV si elle est absente ou périmée.
+
+        Sans csv_paths, la base existante est ouverte telle quelle (toutes ses saisons) et
+        seules ses propres sources sont réingérées si elles ont changé; changer l'ensemble
+        des sources reste l'action explicite "ingest".
+        """
+        db_path = db_path or DB_PATH
+        if csv_paths is None:
+            csv_paths = sources_enregistrees(db_path) or [None]
+        if not base_a_jour(db_path, csv_paths):
+            ingerer_csv(csv_paths, db_path)
+        return cls(db_path)
+
+    def _identite_fichier(self):
+        stat = os.stat(self.db_path)
+        return f"{stat.st_ino}-{stat.st_mtime_ns}"
+
+    def rafraichir(self):
+        """(Re)connecte à la base courante; retourne False si elle n'existe pas"""
+        if not os.path.exists(self.db_path):
+            return False
+        if self.connexion is not None:
+            self.connexion.close()
+        self.connexion = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.connexion.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        meta = dict(self.connexion.execute("SELECT cle, valeur FROM meta"))
+        self.colonnes = json.loads(meta['colonnes'])
+        self.index_stats = {s: i for i, s in enumerate(json.loads(meta['stats']))}
+        self.nb_joueurs = int(meta['nb_joueurs'])
+        self.version = self._identite_fichier()
+        self._select = "SELECT _nb_clubs, " + ", ".join(_q(c) for c in self.colonnes) + " FROM joueurs"
+        self._tailles_postes = {}
+        return True
+
+    def est_perime(self):
+        """Indique si la base a été remplacée (réingestion) depuis l'ouverture"""
+        return os.path.exists(self.db_path) and self._identite_fichier() != self.version
+
+    def __len__(self):
+        return self.nb_joueurs
+
+    def _ligne(self, valeurs):
+        # NULL -> NaN, comme les valeurs manquantes d'une ligne pandas; nombre de clubs
+        # seulement sur les lignes de saison
+        nb_clubs, *valeurs = valeurs
+        ligne = {c: (float('nan') if v is None else v) for c, v in zip(self.colonnes, valeurs)}
+        if nb_clubs is not None:
+            ligne[COLONNE_NB_CLUBS] = nb_clubs
+        return ligne
+
+    def rechercher(self, player_name, team=None):
+        """rowid de la ligne par club: nom (et équipe) exacts sur index, puis préfixes de mots
+        (FTS), puis premier nom contenant la recherche (règles de premiere_correspondance)"""
+        nom = normaliser_nom(player_name)
+        if team:
+            ligne = self.connexion.execute(
+                "SELECT rowid FROM joueurs WHERE _saison = 0 AND _nom = ? AND _equipe = ? ORDER BY rowid LIMIT 1",
+                (nom, normaliser_nom(team))).fetchone()
+        else:
+            ligne = self.connexion.execute(
+                "SELECT rowid FROM joueurs WHERE _saison = 0 AND _nom = ? ORDER BY rowid LIMIT 1", (nom,)).fetchone()
+        if ligne:
+            return ligne[0]
+
+        filtre_equipe, parametres_equipe = "", []
+        if team:
+            filtre_equipe = " AND instr(j._equipe_min, ?) > 0"
+            parametres_equipe = [team.lower()]
+        expression = _expression_fts(player_name)
+        if expression:
+            ligne = self.connexion.execute(
+                "SELECT j.rowid FROM noms_fts f JOIN joueurs j ON j.rowid = f.rowid "
+                f"WHERE noms_fts MATCH ?{filtre_equipe} ORDER BY j.rowid LIMIT 1",
+                [f"nom : ({expression})", *parametres_equipe]).fetchone()
+            if ligne:
+                return ligne[0]
+
+        # Dernier recours: sous-chaîne quelconque du nom (parcours complet)
+        ligne = self.connexion.execute(
+            f"SELECT rowid FROM joueurs j WHERE j._saison = 0 AND instr(j._nom_min, ?) > 0{filtre_equipe} "
+            "ORDER BY rowid LIMIT 1",
+            [player_name.lower(), *parametres_equipe]).fetchone()
+        return ligne[0] if ligne else None
+
+    def search_player(self, player_name, team=None, combined=None):
+        """Équivalent de EnhancedPlayerAnalyzer.search_player sur la base SQLite: ligne par club
+        si une équipe est donnée, sinon saison fusionnée"""
+        rowid = self.rechercher(player_name, team)
+        if rowid is None:
+            return None
+        if combined is None:
+            combined = not team
+        if combined:
+            return self._ligne(self.connexion.execute(
+                self._select + " WHERE _entite = (SELECT _entite FROM joueurs WHERE rowid = ?) AND _saison = 1",
+                (rowid,)).fetchone())
+        return self._ligne(self.connexion.execute(self._select + " WHERE rowid = ?", (rowid,)).fetchone())
+
+    def rechercher_noms(self, requete, limite=10):
+        """Recherche plein texte tolérante aux accents (préfixes de mots), pour l'autocomplétion"""
+        expression = _expression_fts(requete)
+        if not expression:
+            return []
+        return [
+            {'Player': joueur, 'Squad': equipe}
+            for joueur, equipe in self.connexion.execute(
+                "SELECT nom, equipe FROM noms_fts WHERE noms_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, int(limite)))
+        ]
+
+    def _taille_poste(self, position):
+        if position not in self._tailles_postes:
+            self._tailles_postes[position] = self.connexion.execute(
+                "SELECT COUNT(*) FROM joueurs WHERE _saison = 1 AND \"Pos\" = ?", (position,)).fetchone()[0]
+        return self._tailles_postes[position]
+
+    def percentile(self, position, stat, valeur):
+        """Percentile d'une valeur parmi les joueurs du même poste (comptage sur index partiel)"""
+        expression = f"coalesce({_q(stat)}, 0)"
+        taille = self._taille_poste(position)
+        if taille < MIN_JOUEURS_POSTE:
+            inferieurs = self.connexion.execute(
+                f"SELECT COUNT(*) FROM joueurs WHERE _saison = 1 AND {expression} < ?", (valeur,)).fetchone()[0]
+            taille = self.nb_joueurs
+        else:
+            inferieurs = self.connexion.execute(
+                f"SELECT COUNT(*) FROM joueurs WHERE _saison = 1 AND \"Pos\" = ? AND {expression} < ?",
+                (position, valeur)).fetchone()[0]
+        return inferieurs / taille * 100
+
+
+def main():
+    """Point d'entrée: ingest [csv_path ...] | search <requete> [limite]"""
+    if len(sys.argv) < 2:
+        print("Usage: python sqlite_backend.py <ingest|search> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+    db_path = os.environ.get('PLAYER_SQLITE_DB') or DB_PATH
+
+    if action == "ingest":
+        resultat = ingerer_csv(sys.argv[2:] or None, db_path)
+        print(json.dumps({"success": True, **resultat}, ensure_ascii=False))
+
+    elif action == "search":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Requête requise"}))
+            sys.exit(1)
+        backend = SQLiteBackend.ouvrir(db_path)
+        limite = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+        print(json.dumps({"resultats": backend.rechercher_noms(sys.argv[2], limite)}, ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
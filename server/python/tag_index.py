@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Tag Index - Index inversé des forces et faiblesses vers les joueurs
+Les tags (force:<stat> si percentile >= 80, faiblesse:<stat> si <= 20) sont calculés pour
+tous les joueurs au chargement (une ligne par joueur, saison fusionnée s'il a changé de
+club) et stockés en bitsets (entiers Python) par groupe de poste.
+Les requêtes AND / OR / NOT se résolvent en opérations bit à bit.
+"""
+
+import os
+import re
+import sys
+import json
+import pickle
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, GROUPES_POSTES, resoudre_csv, empreinte_fichier, groupes_postes
+from player_entities import obtenir_entites
+from vectorized_profiles import percentiles_par_poste, forces_faiblesses, NOMS_STATS
+
+PREFIXES_TAGS = {'force': 'force', 'strength': 'force', 'faiblesse': 'faiblesse', 'weakness': 'faiblesse'}
+
+# Version du format de l'index persisté (invalide les pickles d'une version antérieure)
+VERSION_INDEX = 2
+
+
+class RequeteInvalide(ValueError):
+    """Expression de tags mal formée ou tag inconnu"""
+
+
+def bitset(masque):
+    """Bitset (entier Python) à partir d'un tableau booléen: bit i = ligne i"""
+    octets = np.packbits(np.asarray(masque, dtype=bool), bitorder='little').tobytes()
+    return int.from_bytes(octets, 'little')
+
+
+def positions_bits(bits, taille):
+    """Positions des bits à 1 d'un bitset, en tableau NumPy"""
+    if bits == 0:
+        return np.empty(0, dtype=np.int64)
+    octets = bits.to_bytes((taille + 7) // 8, 'little')
+    masque = np.unpackbits(np.frombuffer(octets, dtype=np.uint8), bitorder='little')[:taille]
+    return np.flatnonzero(masque)
+
+
+# --- Analyse des requêtes ---
+
+_JETONS = re.compile(r'\s*(?:(\()|(\))|(&&?|\|\|?|!|\bAND\b|\bOR\b|\bNOT\b|\bET\b|\bOU\b|\bNON\b)|([\w:%\-]+))',
+                     re.IGNORECASE)
+_OPERATEURS = {'&': 'AND', '&&': 'AND', 'ET': 'AND', 'AND': 'AND',
+               '|': 'OR', '||': 'OR', 'OU': 'OR', 'OR': 'OR',
+               '!': 'NOT', 'NON': 'NOT', 'NOT': 'NOT'}
+
+
+def decouper(expression):
+    """Découpe une expression en jetons ('(', ')', 'AND', 'OR', 'NOT' ou tag)"""
+    jetons, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        m = _JETONS.match(expression, position)
+        if not m or m.end() == position:
+            raise RequeteInvalide(f"Caractère inattendu à la position {position}: {expression[position:]!r}")
+        ouvrante, fermante, operateur, tag = m.groups()
+        if ouvrante or fermante:
+            jetons.append(ouvrante or fermante)
+        elif operateur:
+            jetons.append(_OPERATEURS[operateur.upper()])
+        else:
+            jetons.append(('TAG', tag))
+        position = m.end()
+    return jetons
+
+
+def analyser(expression):
+    """Arbre de la requête: ('TAG', t) | ('NOT', a) | ('AND'|'OR', a, b); NOT > AND > OR"""
+    jetons = decouper(expression)
+    if not jetons:
+        raise RequeteInvalide("Requête vide")
+    position = 0
+
+    def suivant():
+        return jetons[position] if position < len(jetons) else None
+
+    def ou():
+        nonlocal position
+        gauche = et()
+        while suivant() == 'OR':
+            position += 1
+            gauche = ('OR', gauche, et())
+        return gauche
+
+    def et():
+        nonlocal position
+        gauche = non()
+        # Deux tags juxtaposés valent un AND implicite
+        while suivant() == 'AND' or suivant() == 'NOT' or suivant() == '(' or isinstance(suivant(), tuple):
+            if suivant() == 'AND':
+                position += 1
+            gauche = ('AND', gauche, non())
+        return gauche
+
+    def non():
+        nonlocal position
+        jeton = suivant()
+        if jeton == 'NOT':
+            position += 1
+            return ('NOT', non())
+        if jeton == '(':
+            position += 1
+            noeud = ou()
+            if suivant() != ')':
+                raise RequeteInvalide("Parenthèse fermante manquante")
+            position += 1
+            return noeud
+        if isinstance(jeton, tuple):
+            position += 1
+            return jeton
+        raise RequeteInvalide(f"Tag attendu, trouvé {jeton!r}")
+
+    arbre = ou()
+    if position != len(jetons):
+        raise RequeteInvalide(f"Jeton inattendu: {jetons[position]!r}")
+    return arbre
+
+
+# --- Index ---
+
+class IndexTags:
+    """Bitsets force/faiblesse par groupe de poste, avec les percentiles pour le classement"""
+
+    def __init__(self, joueurs, percentiles, stats, groupes):
+        self.joueurs = joueurs          # DataFrame Player / Squad / Pos / Comp
+        self.percentiles = percentiles  # ndarray (joueurs x stats), NaN si absent
+        self.stats = stats
+        self.groupes = groupes          # groupe -> {'lignes', 'univers', 'tags'}
+        self._stats_minuscules = {s.lower(): s for s in stats}
+
+    @classmethod
+    def construire(cls, df):
+        """Calcule les tags de tous les joueurs en une passe vectorisée"""
+        percentiles = percentiles_par_poste(df)
+        forces, faiblesses = forces_faiblesses(percentiles)
+        groupes_joueurs = groupes_postes(df['Pos']).to_numpy()
+
+        groupes = {}
+        for groupe in GROUPES_POSTES + ['NA', '*']:
+            selection = np.ones(len(df), dtype=bool) if groupe == '*' else groupes_joueurs == groupe
+            if not selection.any():
+                continue
+            tags = {}
+            for stat in percentiles.columns:
+                tags[f"force:{stat}"] = bitset(forces[stat].to_numpy()[selection])
+                tags[f"faiblesse:{stat}"] = bitset(faiblesses[stat].to_numpy()[selection])
+            taille = int(selection.sum())
+            groupes[groupe] = {
+                'lignes': np.flatnonzero(selection),
+                'univers': (1 << taille) - 1,
+                'tags': tags
+            }
+
+        colonnes = [c for c in ('Player', 'Squad', 'Pos', 'Comp') if c in df.columns]
+        joueurs = df[colonnes].reset_index(drop=True)
+        return cls(joueurs, percentiles.to_numpy(dtype=float), list(percentiles.columns), groupes)
+
+    def vers_dict(self):
+        return {'version': VERSION_INDEX, 'joueurs': self.joueurs, 'percentiles': self.percentiles,
+                'stats': self.stats, 'groupes': self.groupes}
+
+    @classmethod
+    def depuis_dict(cls, etat):
+        return cls(etat['joueurs'], etat['percentiles'], etat['stats'], etat['groupes'])
+
+    def normaliser_tag(self, tag):
+        """'Force:prgp' -> 'force:PrgP'; RequeteInvalide si inconnu"""
+        prefixe, _, stat = tag.partition(':')
+        prefixe = PREFIXES_TAGS.get(prefixe.lower())
+        stat = self._stats_minuscules.get(stat.lower())
+        if prefixe is None or stat is None:
+            raise RequeteInvalide(
+                f"Tag inconnu: {tag!r} (attendu force:<stat> ou faiblesse:<stat>, stats: {', '.join(self.stats)})")
+        return f"{prefixe}:{stat}"
+
+    def _evaluer(self, noeud, groupe):
+        operateur = noeud[0]
+        if operateur == 'TAG':
+            return groupe['tags'][self.normaliser_tag(noeud[1])]
+        if operateur == 'NOT':
+            return groupe['univers'] & ~self._evaluer(noeud[1], groupe)
+        gauche = self._evaluer(noeud[1], groupe)
+        droite = self._evaluer(noeud[2], groupe)
+        return gauche & droite if operateur == 'AND' else gauche | droite
+
+    def _tags_positifs(self, noeud, nie=False):
+        """Tags cités hors NOT, qui servent au classement"""
+        if noeud[0] == 'TAG':
+            return [] if nie else [self.normaliser_tag(noeud[1])]
+        if noeud[0] == 'NOT':
+            return self._tags_positifs(noeud[1], not nie)
+        return self._tags_positifs(noeud[1], nie) + self._tags_positifs(noeud[2], nie)
+
+    def requete(self, expression, groupe=None, limite=20):
+        """Joueurs correspondant à l'expression, classés par percentile combiné"""
+        arbre = analyser(expression)
+        groupe = (groupe or '*').upper()
+        if groupe not in self.groupes:
+            raise RequeteInvalide(f"Groupe de poste inconnu: {groupe!r}")
+        donnees = self.groupes[groupe]
+
+        bits = self._evaluer(arbre, donnees)
+        lignes = donnees['lignes'][positions_bits(bits, len(donnees['lignes']))]
+
+        # Score: moyenne des percentiles des tags cités (100 - p pour une faiblesse),
+        # note globale si la requête ne cite que des négations
+        tags = list(dict.fromkeys(self._tags_positifs(arbre)))
+        percentiles = self.percentiles[lignes]
+        if tags:
+            colonnes = []
+            for tag in tags:
+                prefixe, stat = tag.split(':')
+                valeurs = percentiles[:, self.stats.index(stat)]
+                colonnes.append(valeurs if prefixe == 'force' else 100 - valeurs)
+            scores = np.nanmean(np.column_stack(colonnes), axis=1) if len(lignes) else np.empty(0)
+        else:
+            scores = np.nanmean(percentiles, axis=1) if len(lignes) else np.empty(0)
+        scores = np.nan_to_num(scores, nan=50.0)
+
+        limite = len(lignes) if not limite else min(int(limite), len(lignes))
+        if limite < len(lignes):
+            meilleurs = np.argpartition(-scores, limite - 1)[:limite]
+        else:
+            meilleurs = np.arange(len(lignes))
+        meilleurs = meilleurs[np.argsort(-scores[meilleurs], kind='stable')]
+
+        resultats = []
+        for i in meilleurs:
+            ligne = lignes[i]
+            joueur = {k: (None if pd.isna(v) else v) for k, v in self.joueurs.iloc[ligne].items()}
+            joueur['score'] = round(float(scores[i]), 1)
+            joueur['percentiles'] = {
+                stat: round(float(p), 1) for stat, p in zip(self.stats, self.percentiles[ligne])
+                if not np.isnan(p)
+            }
+            resultats.append(joueur)
+
+        return {
+            'requete': expression,
+            'groupe': groupe,
+            'total': len(lignes),
+            'tags_classement': tags,
+            'resultats': resultats
+        }
+
+    def tags_disponibles(self):
+        """Tags reconnus et leurs libellés"""
+        return {f"{prefixe}:{stat}": NOMS_STATS.get(stat, stat)
+                for prefixe in ('force', 'faiblesse') for stat in self.stats}
+
+
+_INDEX = {}
+
+
+def obtenir_index_tags(csv_path=None, df=None):
+    """Index des tags du CSV (mémoire, cache disque, puis calcul)"""
+    csv_path = resoudre_csv(csv_path)
+    empreinte = empreinte_fichier(csv_path)
+    if empreinte in _INDEX:
+        return _INDEX[empreinte]
+
+    chemin_cache = os.path.join(CACHE_DIR, f"tags_{empreinte}_v{VERSION_INDEX}.pkl")
+    if os.path.exists(chemin_cache):
+        with open(chemin_cache, 'rb') as f:
+            index = IndexTags.depuis_dict(pickle.load(f))
+    else:
+        # Un joueur = une ligne: saisons fusionnées des joueurs à plusieurs clubs
+        index = IndexTags.construire(obtenir_entites(csv_path, df).lignes.reset_index(drop=True))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{chemin_cache}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(index.vers_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin_cache)
+
+    _INDEX[empreinte] = index
+    return index
+
+
+def main():
+    """Point d'entrée: query <expression> [groupe] [limite] | tags"""
+    if len(sys.argv) < 2:
+        print("Usage: python tag_index.py <query|tags> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+    index = obtenir_index_tags()
+
+    if action == "query":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Expression requise"}))
+            sys.exit(1)
+        groupe = sys.argv[3] if len(sys.argv) > 3 else None
+        limite = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+        try:
+            print(json.dumps(index.requete(sys.argv[2], groupe, limite), ensure_ascii=False))
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+
+    elif action == "tags":
+        print(json.dumps({"tags": index.tags_disponibles(), "groupes": list(index.groupes)},
+                         ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
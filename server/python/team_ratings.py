@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Team Ratings - Forces des équipes calculées sur tout le calendrier (Elo + attaque/défense xG)
+Elo: les matchs sont regroupés en journées où chaque équipe joue au plus une fois, puis chaque
+journée est mise à jour en une opération NumPy (résultat identique au traitement match par
+match). Attaque/défense: moyennes de xG pour/contre pondérées par l'ancienneté (sommes
+cumulées, mises à jour par ajout). L'état est persisté en JSON; les nouveaux résultats s'y
+ajoutent sans rejouer la saison (sauf résultat en retard ou score corrigé).
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from player_dataset import CACHE_DIR, normaliser_nom
+
+RATINGS_DIR = os.environ.get('TEAM_RATINGS_DIR', os.path.join(CACHE_DIR, 'team_ratings'))
+
+# Elo: note initiale, facteur K, avantage du terrain (points Elo)
+ELO_INITIAL = 1500.0
+ELO_K = 20.0
+ELO_AVANTAGE_DOMICILE = 65.0
+
+# Demi-vie (jours) de la pondération des matchs pour l'attaque et la défense
+DEMI_VIE_JOURS = 180.0
+
+# Poids a priori (en matchs) vers la moyenne du championnat, pour les équipes peu vues
+POIDS_A_PRIORI = 3.0
+
+# Buts maximum considérés pour les probabilités de score (Poisson)
+BUTS_MAX = 10
+
+# Colonnes reconnues: FBref (soccerdata read_schedule) puis football-data (matches_data.csv)
+COLONNES_CALENDRIER = {
+    'date': ['date', 'MatchDate', 'Date'],
+    'domicile': ['home_team', 'HomeTeam', 'home'],
+    'exterieur': ['away_team', 'AwayTeam', 'away'],
+    'buts_dom': ['home_goals', 'FTHome', 'FTHG'],
+    'buts_ext': ['away_goals', 'FTAway', 'FTAG'],
+    'xg_dom': ['home_xg', 'xg_home', 'HomeXG'],
+    'xg_ext': ['away_xg', 'xg_away', 'AwayXG'],
+    'match_id': ['game_id', 'match_id']
+}
+
+
+def _colonne(df, candidats):
+    return next((c for c in candidats if c in df.columns), None)
+
+
+def normaliser_calendrier(df):
+    """Calendrier au format commun (matchs joués uniquement), trié par date"""
+    df = df.reset_index()
+    colonnes = {cle: _colonne(df, candidats) for cle, candidats in COLONNES_CALENDRIER.items()}
+    manquantes = [cle for cle in ('date', 'domicile', 'exterieur') if colonnes[cle] is None]
+    if manquantes:
+        raise ValueError(f"Colonnes du calendrier introuvables: {', '.join(manquantes)}")
+
+    calendrier = pd.DataFrame({
+        'date': pd.to_datetime(df[colonnes['date']], errors='coerce'),
+        'domicile': df[colonnes['domicile']].astype(str),
+        'exterieur': df[colonnes['exterieur']].astype(str)
+    })
+    if colonnes['buts_dom'] and colonnes['buts_ext']:
+        calendrier['buts_dom'] = pd.to_numeric(df[colonnes['buts_dom']], errors='coerce')
+        calendrier['buts_ext'] = pd.to_numeric(df[colonnes['buts_ext']], errors='coerce')
+    elif 'score' in df.columns:
+        # FBref: "2–1" (tiret demi-cadratin), vide tant que le match n'est pas joué
+        buts = df['score'].astype(str).str.extract(r'(\d+)\s*[–-]\s*(\d+)').astype(float)
+        calendrier['buts_dom'], calendrier['buts_ext'] = buts[0], buts[1]
+    else:
+        raise ValueError("Score du calendrier introuvable (home_goals/away_goals, FTHome/FTAway ou score)")
+
+    # Sans xG (football-data), les buts servent d'estimation
+    for cote in ('dom', 'ext'):
+        source = colonnes[f'xg_{cote}']
+        xg = pd.to_numeric(df[source], errors='coerce') if source else pd.Series(np.nan, index=df.index)
+        calendrier[f'xg_{cote}'] = xg.fillna(calendrier[f'buts_{cote}'])
+
+    calendrier['match_id'] = (
+        df[colonnes['match_id']].astype(str) if colonnes['match_id'] else
+        calendrier['date'].dt.strftime('%Y-%m-%d') + '|' + calendrier['domicile'] + '|' + calendrier['exterieur']
+    )
+    joues = calendrier['date'].notna() & calendrier['buts_dom'].notna() & calendrier['buts_ext'].notna()
+    return calendrier[joues].sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def lire_calendrier(chemin):
+    """Calendrier sauvegardé localement (CSV, JSON Lines ou pickle de read_schedule)"""
+    if chemin.endswith('.pkl'):
+        return normaliser_calendrier(pd.read_pickle(chemin))
+    if chemin.endswith('.jsonl') or chemin.endswith('.ndjson'):
+        return normaliser_calendrier(pd.read_json(chemin, lines=True))
+    return normaliser_calendrier(pd.read_csv(chemin))
+
+
+def journees(domicile, exterieur):
+    """Numéro de journée de chaque match: une équipe joue au plus une fois par journée"""
+    derniere = {}
+    numeros = np.empty(len(domicile), dtype=np.int64)
+    for i, (d, e) in enumerate(zip(domicile, exterieur)):
+        numero = max(derniere.get(d, -1), derniere.get(e, -1)) + 1
+        numeros[i] = derniere[d] = derniere[e] = numero
+    return numeros
+
+
+def multiplicateur_ecart(ecart):
+    """Pondération Elo par l'écart de buts (1, 1.5, puis (11 + écart) / 8)"""
+    ecart = np.abs(ecart)
+    return np.where(ecart <= 1, 1.0, np.where(ecart == 2, 1.5, (11 + ecart) / 8))
+
+
+def elo_attendu(elo_dom, elo_ext):
+    """Score attendu du club à domicile (victoire = 1, nul = 0.5)"""
+    return 1 / (1 + 10 ** (-(elo_dom + ELO_AVANTAGE_DOMICILE - elo_ext) / 400))
+
+
+class ClassementEquipes:
+    """État des forces des équipes d'un championnat (Elo, sommes xG pondérées)"""
+
+    def __init__(self, ligue='default'):
+        self.ligue = ligue
+        self.equipes = []
+        self.indices = {}
+        self.elo = np.zeros(0)
+        self.matchs = np.zeros(0, dtype=np.int64)
+        self.xg_pour = np.zeros(0)
+        self.xg_contre = np.zeros(0)
+        self.poids = np.zeros(0)
+        # Totaux du championnat (pondérés) pour la moyenne et l'avantage du terrain
+        self.total_xg_dom = 0.0
+        self.total_xg_ext = 0.0
+        self.total_poids = 0.0
+        # Origine des poids exponentiels (jour) et historique compact des matchs intégrés
+        self.origine = None
+        self.historique = []
+        self.matchs_vus = set()
+
+    # --- Équipes ---
+
+    def _indices_equipes(self, noms):
+        nouvelles = [n for n in dict.fromkeys(noms) if n not in self.indices]
+        for nom in nouvelles:
+            self.indices[nom] = len(self.equipes)
+            self.equipes.append(nom)
+        if nouvelles:
+            n = len(nouvelles)
+            self.elo = np.concatenate([self.elo, np.full(n, ELO_INITIAL)])
+            self.matchs = np.concatenate([self.matchs, np.zeros(n, dtype=np.int64)])
+            for attribut in ('xg_pour', 'xg_contre', 'poids'):
+                setattr(self, attribut, np.concatenate([getattr(self, attribut), np.zeros(n)]))
+        return np.array([self.indices[n] for n in noms], dtype=np.int64)
+
+    def trouver(self, nom):
+        """Nom exact de l'équipe (recherche sans accents, exacte puis partielle)"""
+        if nom in self.indices:
+            return nom
+        cible = normaliser_nom(nom)
+        normalises = {normaliser_nom(e): e for e in self.equipes}
+        if cible in normalises:
+            return normalises[cible]
+        return next((e for n, e in normalises.items() if cible and cible in n), None)
+
+    # --- Mise à jour ---
+
+    def _poids_dates(self, jours):
+        """Poids exponentiels 2^((jour - origine) / demi-vie), rebasés si l'exposant grandit"""
+        if self.origine is None:
+            self.origine = float(jours.min())
+        exposants = (jours - self.origine) / DEMI_VIE_JOURS
+        if exposants.max() > 500:
+            decalage = float(exposants.max())
+            facteur = 2.0 ** -decalage
+            self.xg_pour *= facteur
+            self.xg_contre *= facteur
+            self.poids *= facteur
+            self.total_xg_dom *= facteur
+            self.total_xg_ext *= facteur
+            self.total_poids *= facteur
+            self.origine += decalage * DEMI_VIE_JOURS
+            exposants = (jours - self.origine) / DEMI_VIE_JOURS
+        return 2.0 ** exposants
+
+    def _integrer(self, calendrier):
+        """Applique des matchs (triés par date, postérieurs à l'état) en passes vectorisées"""
+        dom = self._indices_equipes(list(calendrier['domicile']))
+        ext = self._indices_equipes(list(calendrier['exterieur']))
+        buts_dom = calendrier['buts_dom'].to_numpy(dtype=float)
+        buts_ext = calendrier['buts_ext'].to_numpy(dtype=float)
+        xg_dom = calendrier['xg_dom'].to_numpy(dtype=float)
+        xg_ext = calendrier['xg_ext'].to_numpy(dtype=float)
+        jours = (calendrier['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)).astype(float)
+
+        # Elo, journée par journée (aucune équipe deux fois dans la même journée)
+        numeros = journees(dom, ext)
+        resultat = np.where(buts_dom > buts_ext, 1.0, np.where(buts_dom == buts_ext, 0.5, 0.0))
+        k = ELO_K * multiplicateur_ecart(buts_dom - buts_ext)
+        ordre = np.argsort(numeros, kind='stable')
+        bornes = np.searchsorted(numeros[ordre], np.arange(numeros.max() + 2)) if len(numeros) else [0]
+        for debut, fin in zip(bornes[:-1], bornes[1:]):
+            lot = ordre[debut:fin]
+            delta = k[lot] * (resultat[lot] - elo_attendu(self.elo[dom[lot]], self.elo[ext[lot]]))
+            self.elo[dom[lot]] += delta
+            self.elo[ext[lot]] -= delta
+
+        # Attaque / défense: sommes pondérées, additives (aucun ordre requis)
+        poids = self._poids_dates(jours)
+        taille = len(self.equipes)
+        self.xg_pour += np.bincount(dom, poids * xg_dom, taille) + np.bincount(ext, poids * xg_ext, taille)
+        self.xg_contre += np.bincount(dom, poids * xg_ext, taille) + np.bincount(ext, poids * xg_dom, taille)
+        self.poids += np.bincount(dom, poids, taille) + np.bincount(ext, poids, taille)
+        self.matchs += np.bincount(dom, minlength=taille) + np.bincount(ext, minlength=taille)
+        self.total_xg_dom += float((poids * xg_dom).sum())
+        self.total_xg_ext += float((poids * xg_ext).sum())
+        self.total_poids += float(poids.sum())
+
+        self.historique.extend(
+            [str(m), str(d.date()), h, a, float(bd), float(be), float(xd), float(xe)]
+            for m, d, h, a, bd, be, xd, xe in zip(
+                calendrier['match_id'], calendrier['date'], calendrier['domicile'], calendrier['exterieur'],
+                buts_dom, buts_ext, xg_dom, xg_ext)
+        )
+        self.matchs_vus.update(calendrier['match_id'])
+
+    def _corrections(self, deja_vus):
+        """Matchs déjà intégrés dont le score ou les xG fournis diffèrent de l'historique"""
+        if deja_vus.empty:
+            return set()
+        historique = self.calendrier_historique().set_index('match_id')
+        colonnes = ['buts_dom', 'buts_ext', 'xg_dom', 'xg_ext']
+        fournis = deja_vus.drop_duplicates('match_id', keep='last').set_index('match_id')[colonnes]
+        stockes = historique.loc[fournis.index, colonnes]
+        differents = ~np.isclose(fournis.to_numpy(dtype=float), stockes.to_numpy(dtype=float),
+                                 equal_nan=True).all(axis=1)
+        return set(fournis.index[differents])
+
+    def mettre_a_jour(self, calendrier):
+        """Intègre les matchs joués pas encore vus; rejoue l'historique seulement s'ils sont
+        antérieurs ou si le score d'un match déjà intégré a été corrigé"""
+        vus = calendrier['match_id'].isin(self.matchs_vus)
+        nouveaux = calendrier[~vus]
+        corriges = self._corrections(calendrier[vus])
+        if nouveaux.empty and not corriges:
+            return {'ajoutes': 0, 'corriges': 0, 'recalcul': False}
+        derniere = pd.Timestamp(self.historique[-1][1]) if self.historique else None
+        if corriges or (derniere is not None and nouveaux['date'].min() < derniere):
+            # Résultat en retard ou corrigé: Elo dépend de l'ordre, on repart de l'historique complet
+            # À date égale, l'ordre du calendrier fourni prime (une équipe peut jouer deux fois le même jour)
+            historique = self.calendrier_historique()
+            remplaces = calendrier[calendrier['match_id'].isin(corriges)].drop_duplicates('match_id', keep='last')
+            complet = pd.concat([historique[~historique['match_id'].isin(corriges)], remplaces, nouveaux],
+                                ignore_index=True)
+            ordre = {match: i for i, match in enumerate(calendrier['match_id'])}
+            complet['_ordre'] = complet['match_id'].map(ordre).fillna(-1)
+            complet = complet.sort_values(['date', '_ordre'], kind='stable').drop(columns='_ordre')
+            self.reinitialiser()
+            self._integrer(complet.reset_index(drop=True))
+            return {'ajoutes': len(nouveaux), 'corriges': len(corriges), 'recalcul': True}
+        self._integrer(nouveaux)
+        return {'ajoutes': len(nouveaux), 'corriges': 0, 'recalcul': False}
+
+    def reinitialiser(self):
+        self.__init__(self.ligue)
+
+    def calendrier_historique(self):
+        """Matchs déjà intégrés, au format commun"""
+        df = pd.DataFrame(self.historique, columns=['match_id', 'date', 'domicile', 'exterieur',
+                                                    'buts_dom', 'buts_ext', 'xg_dom', 'xg_ext'])
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    # --- Requêtes ---
+
+    def moyenne_buts(self):
+        """xG moyen d'une équipe par match (pondéré)"""
+        return (self.total_xg_dom + self.total_xg_ext) / (2 * self.total_poids) if self.total_poids else 1.3
+
+    def facteur_domicile(self):
+        """Multiplicateur de l'équipe à domicile (racine du rapport xG domicile / extérieur)"""
+        if not self.total_xg_ext:
+            return 1.0
+        return math.sqrt(self.total_xg_dom / self.total_xg_ext)
+
+    def forces(self):
+        """Attaque et défense relatives à la moyenne (1 = moyen; défense < 1 = solide)"""
+        moyenne = self.moyenne_buts()
+        attaque = (self.xg_pour + POIDS_A_PRIORI * moyenne) / (self.poids + POIDS_A_PRIORI) / moyenne
+        defense = (self.xg_contre + POIDS_A_PRIORI * moyenne) / (self.poids + POIDS_A_PRIORI) / moyenne
+        return attaque, defense
+
+    def equipe(self, nom):
+        """Fiche d'une équipe, ou None"""
+        nom = self.trouver(nom)
+        if nom is None:
+            return None
+        i = self.indices[nom]
+        attaque, defense = self.forces()
+        rang = int((self.elo > self.elo[i]).sum()) + 1
+        return {
+            'equipe': nom,
+            'elo': round(float(self.elo[i]), 1),
+            'rang_elo': rang,
+            'attaque': round(float(attaque[i]), 3),
+            'defense': round(float(defense[i]), 3),
+            'matchs': int(self.matchs[i])
+        }
+
+    def classement(self, limite=None):
+        """Toutes les équipes, par Elo décroissant"""
+        attaque, defense = self.forces()
+        ordre = np.argsort(-self.elo, kind='stable')[:limite]
+        return [
+            {'rang': rang, 'equipe': self.equipes[i], 'elo': round(float(self.elo[i]), 1),
+             'attaque': round(float(attaque[i]), 3), 'defense': round(float(defense[i]), 3),
+             'matchs': int(self.matchs[i])}
+            for rang, i in enumerate(ordre, 1)
+        ]
+
+    def confrontation(self, domicile, exterieur):
+        """Buts attendus (attaque x défense) et probabilités 1N2 (Poisson et Elo)"""
+        noms = [self.trouver(domicile), self.trouver(exterieur)]
+        if None in noms:
+            inconnue = domicile if noms[0] is None else exterieur
+            return {'error': f"Équipe '{inconnue}' inconnue"}
+        i, j = (self.indices[n] for n in noms)
+        attaque, defense = self.forces()
+        moyenne, facteur = self.moyenne_buts(), self.facteur_domicile()
+        lambda_dom = moyenne * attaque[i] * defense[j] * facteur
+        lambda_ext = moyenne * attaque[j] * defense[i] / facteur
+
+        buts = np.arange(BUTS_MAX + 1)
+        factorielles = np.array([math.factorial(b) for b in buts], dtype=float)
+        p_dom = np.exp(-lambda_dom) * lambda_dom ** buts / factorielles
+        p_ext = np.exp(-lambda_ext) * lambda_ext ** buts / factorielles
+        scores = np.outer(p_dom, p_ext)
+        scores /= scores.sum()
+        score_probable = np.unravel_index(scores.argmax(), scores.shape)
+        return {
+            'domicile': noms[0],
+            'exterieur': noms[1],
+            'buts_attendus': {'domicile': round(float(lambda_dom), 2), 'exterieur': round(float(lambda_ext), 2)},
+            'probabilites': {
+                'domicile': round(float(np.tril(scores, -1).sum()), 3),
+                'nul': round(float(np.trace(scores)), 3),
+                'exterieur': round(float(np.triu(scores, 1).sum()), 3)
+            },
+            'score_probable': f"{score_probable[0]}-{score_probable[1]}",
+            'elo': {'domicile': round(float(self.elo[i]), 1), 'exterieur': round(float(self.elo[j]), 1),
+                    'attendu_domicile': round(float(elo_attendu(self.elo[i], self.elo[j])), 3)}
+        }
+
+    # --- Persistance ---
+
+    def vers_dict(self):
+        return {
+            'ligue': self.ligue,
+            'equipes': self.equipes,
+            'elo': self.elo.tolist(),
+            'matchs': self.matchs.tolist(),
+            'xg_pour': self.xg_pour.tolist(),
+            'xg_contre': self.xg_contre.tolist(),
+            'poids': self.poids.tolist(),
+            'totaux': [self.total_xg_dom, self.total_xg_ext, self.total_poids],
+            'origine': self.origine,
+            'historique': self.historique
+        }
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        etat = cls(donnees['ligue'])
+        etat.equipes = donnees['equipes']
+        etat.indices = {nom: i for i, nom in enumerate(etat.equipes)}
+        etat.elo = np.asarray(donnees['elo'], dtype=float)
+        etat.matchs = np.asarray(donnees['matchs'], dtype=np.int64)
+        etat.xg_pour = np.asarray(donnees['xg_pour'], dtype=float)
+        etat.xg_contre = np.asarray(donnees['xg_contre'], dtype=float)
+        etat.poids = np.asarray(donnees['poids'], dtype=float)
+        etat.total_xg_dom, etat.total_xg_ext, etat.total_poids = donnees['totaux']
+        etat.origine = donnees['origine']
+        etat.historique = donnees['historique']
+        etat.matchs_vus = {ligne[0] for ligne in etat.historique}
+        return etat
+
+    def sauvegarder(self, chemin=None):
+        chemin = chemin or chemin_etat(self.ligue)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.vers_dict(), f, ensure_ascii=False)
+        os.replace(tmp, chemin)
+
+    @classmethod
+    def charger(cls, ligue='default', chemin=None):
+        try:
+            with open(chemin or chemin_etat(ligue), 'r', encoding='utf-8') as f:
+                return cls.depuis_dict(json.load(f))
+        except FileNotFoundError:
+            return cls(ligue)
+
+
+def chemin_etat(ligue):
+    """Fichier d'état d'un championnat"""
+    return os.path.join(RATINGS_DIR, re.sub(r'[^A-Za-z0-9]+', '_', ligue).strip('_') + '.json')
+
+
+_ETATS = {}
+
+
+def obtenir_classement(ligue='default'):
+    """État du championnat en mémoire (chargé une fois par processus)"""
+    if ligue not in _ETATS:
+        _ETATS[ligue] = ClassementEquipes.charger(ligue)
+    return _ETATS[ligue]
+
+
+def main():
+    """Point d'entrée: update <calendrier> [ligue] | rebuild <calendrier> [ligue] | table [ligue] [limite] |
+    team <equipe> [ligue] | matchup <domicile> <exterieur> [ligue]"""
+    if len(sys.argv) < 2:
+        print("Usage: python team_ratings.py <update|rebuild|table|team|matchup> [params...]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+
+    if action in ("update", "rebuild"):
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Fichier de calendrier requis"}))
+            sys.exit(1)
+        ligue = sys.argv[3] if len(sys.argv) > 3 else 'default'
+        etat = ClassementEquipes(ligue) if action == "rebuild" else obtenir_classement(ligue)
+        try:
+            resultat = etat.mettre_a_jour(lire_calendrier(sys.argv[2]))
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+            return
+        etat.sauvegarder()
+        print(json.dumps({"success": True, **resultat, "equipes": len(etat.equipes),
+                          "matchs": len(etat.historique)}, ensure_ascii=False))
+
+    elif action == "table":
+        ligue = sys.argv[2] if len(sys.argv) > 2 else 'default'
+        limite = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        print(json.dumps({"ligue": ligue, "classement": obtenir_classement(ligue).classement(limite)},
+                         ensure_ascii=False))
+
+    elif action == "team":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Nom de l'équipe requis"}))
+            sys.exit(1)
+        fiche = obtenir_classement(sys.argv[3] if len(sys.argv) > 3 else 'default').equipe(sys.argv[2])
+        print(json.dumps(fiche or {"error": f"Équipe '{sys.argv[2]}' inconnue"}, ensure_ascii=False))
+
+    elif action == "matchup":
+        if len(sys.argv) < 4:
+            print(json.dumps({"error": "Équipes à domicile et à l'extérieur requises"}))
+            sys.exit(1)
+        etat = obtenir_classement(sys.argv[4] if len(sys.argv) > 4 else 'default')
+        print(json.dumps(etat.confrontation(sys.argv[2], sys.argv[3]), ensure_ascii=False))
+
+    else:
+        print(json.dumps({"error": f"Action '{action}' non reconnue"}))
+
+
+if __name__ == "__main__":
+    main()
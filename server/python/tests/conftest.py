@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Caches des modules isolés du dépôt (lu à l'import de player_dataset)
+os.environ.setdefault('PLAYERSTATS_CACHE_DIR', tempfile.mkdtemp(prefix='playerstats-tests-'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
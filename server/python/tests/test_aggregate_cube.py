@@ -0,0 +1,43 @@
+import pandas as pd
+
+from aggregate_cube import construire_cube, CubeAgregats, TOUS
+from player_entities import TableEntites
+
+
+def lignes_csv():
+    # Joueur A transféré de Lens à Lyon en cours de saison (même entité, deux lignes)
+    return pd.DataFrame({
+        'Player': ['A', 'A', 'B', 'C'],
+        'Born': [2000, 2000, 1998, 1995],
+        'Nation': ['fr FRA', 'fr FRA', 'es ESP', 'es ESP'],
+        'Squad': ['Lens', 'Lyon', 'Lyon', 'Betis'],
+        'Comp': ['fr Ligue 1', 'fr Ligue 1', 'fr Ligue 1', 'es La Liga'],
+        'Pos': ['FW', 'FW', 'FW', 'MF'],
+        'Age': [24, 24, 26, 29],
+        'Min': [900, 1800, 2700, 2000],
+        'Gls': [3, 6, 12, 2],
+        'Ast': [1, 2, 3, 5],
+    })
+
+
+def cube():
+    entites = TableEntites.construire(lignes_csv())
+    return CubeAgregats(construire_cube(entites.par_club, entites.lignes,
+                                        entites.par_club['Comp'].to_numpy()[entites.principales()]))
+
+
+def test_joueur_transfere_compte_une_fois_hors_equipes():
+    c = cube()
+    attaquants = c.cellule(groupe='FW')
+    assert attaquants['nb_joueurs'] == 2
+    assert attaquants['somme_Gls'] == 21
+    assert attaquants['moyenne_Gls'] == 10.5
+    assert c.cellule('fr Ligue 1')['nb_joueurs'] == 2
+    assert c.cellule()['nb_joueurs'] == 3
+
+
+def test_cellules_equipe_par_club():
+    c = cube()
+    assert c.cellule('fr Ligue 1', 'Lens')['somme_Gls'] == 3
+    assert c.cellule('fr Ligue 1', 'Lyon')['nb_joueurs'] == 2
+    assert c.resume_equipe('fr Ligue 1', 'Lyon')['par_poste']['FW']['somme_Gls'] == 18
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fbref_table_parser as parser
+from conftest import FIXTURES
+
+pytestmark = pytest.mark.skipif(not parser.LXML_AVAILABLE, reason="lxml requis")
+
+
+@pytest.fixture
+def html():
+    with open(os.path.join(FIXTURES, 'fbref_big5_stats.html'), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def schema():
+    return parser.schema_csv(os.path.join(FIXTURES, 'players_schema.csv'))
+
+
+@pytest.fixture(autouse=True)
+def cache_isole(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, 'TABLES_CACHE_DIR', str(tmp_path / 'tables'))
+    monkeypatch.setattr(parser, '_CACHE', {})
+
+
+def test_ids_tables_inclut_les_tableaux_commentes(html):
+    assert parser.ids_tables(html) == ['stats_standard', 'stats_shooting']
+
+
+def test_extraction_renomme_et_ignore_les_lignes_d_en_tete(html, schema):
+    tables = parser.extraire_tables(html, ['stats_standard', 'stats_shooting', 'stats_keeper'],
+                                    schema=schema)
+    standard, tirs = tables['stats_standard'], tables['stats_shooting']
+
+    assert tables['stats_keeper'] is None
+    assert list(standard['Player']) == ['Pedri', 'Kylian Mbappé']
+    assert list(standard.columns) == ['Rk', 'Player', 'Squad', 'Age', 'Born', 'MP', 'Min', 'Gls', 'xG']
+    # Tableau commenté: lignes séparatrices ignorées, colonnes suffixées sauf les clés de fusion
+    assert list(tirs['Player']) == ['Pedri', 'Kylian Mbappé']
+    assert {'Rk_stats_shooting', 'Squad', 'Sh', 'SoT%', 'xG_stats_shooting'} <= set(tirs.columns)
+    assert list(standard['Min']) == [2929, 2907]
+    assert list(standard['Age']) == [22, 26]
+    assert list(tirs['SoT%']) == [36.6, 50.0]
+
+
+def test_types_fixes_par_le_schema_du_csv(html, schema):
+    tables = parser.extraire_tables(html, ['stats_standard', 'stats_shooting'], schema=schema)
+    standard, tirs = tables['stats_standard'], tables['stats_shooting']
+
+    # Valeurs entières sur la page mais flottantes dans le CSV
+    assert standard['Born'].dtype == np.float64
+    assert standard['Age'].dtype == np.float64
+    assert tirs['xG_stats_shooting'].dtype == np.float64
+    # Entier du CSV avec une cellule vide: entier nullable plutôt que flottant
+    assert standard['MP'].dtype == pd.Int64Dtype()
+    assert standard['MP'].isna().tolist() == [False, True]
+    assert standard['Min'].dtype == np.int64
+    assert tirs['Sh'].dtype == np.int64
+    assert standard['Player'].dtype == pd.StringDtype()
+
+
+def test_colonne_hors_schema_typee_par_ses_valeurs():
+    assert parser.typer_colonne('Matches', ['3', '4']).dtype == np.int64
+    assert parser.typer_colonne('Matches', ['3', '4.5']).dtype == np.float64
+    assert parser.typer_colonne('Matches', ['3', 'n/a']).dtype == pd.StringDtype()
+
+
+def test_cache_par_empreinte_du_contenu(html, schema, monkeypatch):
+    premier = parser.extraire_tables(html, ['stats_standard'], schema=schema)['stats_standard']
+    assert len(os.listdir(parser.TABLES_CACHE_DIR)) == 1
+
+    # Même contenu: servi par le cache mémoire puis par le cache disque, sans reparser
+    def interdit(*args, **kwargs):
+        raise AssertionError("page déjà parsée")
+    monkeypatch.setattr(parser, 'parser_fragment', interdit)
+    assert parser.extraire_tables(html, ['stats_standard'], schema=schema)['stats_standard'] is premier
+    monkeypatch.setattr(parser, '_CACHE', {})
+    depuis_disque = parser.extraire_tables(html, ['stats_standard'], schema=schema)['stats_standard']
+    pd.testing.assert_frame_equal(depuis_disque, premier)
+
+    # Contenu modifié: nouvelle empreinte, la page est reparsée
+    modifie = html.replace(b'2,929', b'3,001')
+    with pytest.raises(AssertionError, match="page déjà parsée"):
+        parser.extraire_tables(modifie, ['stats_standard'], schema=schema)
+
+
+def test_schema_different_ne_reutilise_pas_le_cache(html, schema):
+    avec_schema = parser.extraire_tables(html, ['stats_standard'], schema=schema)['stats_standard']
+    sans_schema = parser.extraire_tables(html, ['stats_standard'], schema={})['stats_standard']
+    assert avec_schema['Born'].dtype == np.float64
+    assert sans_schema['Born'].dtype == np.int64
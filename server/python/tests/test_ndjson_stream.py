@@ -0,0 +1,30 @@
+import io
+import json
+
+import pytest
+
+from ndjson_stream import paginer, flux, ecrire_ndjson, decoder_curseur
+
+
+def source_entiers(colonnes, debut):
+    return ({'i': i} for i in range(debut, 5))
+
+
+def test_pagination_par_curseur():
+    sortie = io.StringIO()
+    meta = ecrire_ndjson(flux(source_entiers, {'limit': 2}), sortie)
+    assert [json.loads(l) for l in sortie.getvalue().splitlines()[:-1]] == [{'i': 0}, {'i': 1}]
+    assert decoder_curseur(meta['next_cursor']) == 2
+
+    meta = ecrire_ndjson(flux(source_entiers, {'limit': 10, 'cursor': meta['next_cursor']}),
+                         io.StringIO())
+    assert meta == {'lignes': 3, 'next_cursor': None}
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_limit_non_positive_refusee(limit):
+    with pytest.raises(ValueError):
+        next(paginer(iter([{'i': 0}]), 0, limit))
+
+    meta = ecrire_ndjson(flux(source_entiers, {'limit': limit}), io.StringIO())
+    assert meta['lignes'] == 0 and 'limit' in meta['error']
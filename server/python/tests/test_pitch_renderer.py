@@ -0,0 +1,36 @@
+import os
+
+from pitch_renderer import CacheImages, rendre_lot
+
+
+def radars(n, titre='lot'):
+    return [{'type': 'radar', 'donnees': {'Gls': 10 * i, 'Ast': 50, 'xG': 30}, 'titre': titre}
+            for i in range(n)]
+
+
+def test_une_eviction_par_lot(tmp_path, monkeypatch):
+    cache = CacheImages(str(tmp_path))
+    appels = []
+    evincer = CacheImages.evincer
+    monkeypatch.setattr(CacheImages, 'evincer', lambda self, garder=(): (appels.append(len(garder)),
+                                                                       evincer(self, garder)))
+
+    resultats = rendre_lot(radars(4), cache=cache, processus=2)
+    assert all(r['success'] and not r['cache'] for r in resultats)
+    assert appels == [4]
+
+    # Lot entièrement servi par le cache: aucun parcours du dossier
+    assert all(r['cache'] for r in rendre_lot(radars(4), cache=cache))
+    assert appels == [4]
+
+
+def test_eviction_garde_les_images_du_lot(tmp_path):
+    cache = CacheImages(str(tmp_path))
+    anciens = rendre_lot(radars(2, 'ancien'), cache=cache, processus=1)
+    for resultat in anciens:
+        os.utime(resultat['chemin'], (0, 0))
+
+    cache.taille_max = 1
+    nouveaux = rendre_lot(radars(2, 'nouveau'), cache=cache, processus=1)
+    assert all(os.path.exists(r['chemin']) for r in nouveaux)
+    assert not any(os.path.exists(r['chemin']) for r in anciens)
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+import playing_style_clusters
+import response_version
+from player_dataset import DEFAULT_CSV_PATH
+
+CSV_DEPOT = os.path.join(os.path.dirname(__file__), '..', '..', '..', DEFAULT_CSV_PATH)
+
+
+@pytest.mark.skipif(not os.path.exists(CSV_DEPOT), reason="CSV du dépôt requis")
+def test_version_stable_sans_modele_de_styles(tmp_path, monkeypatch):
+    modele = str(tmp_path / 'style_clusters.json')
+    monkeypatch.setattr(response_version, 'STYLE_MODEL_PATH', modele)
+    monkeypatch.setattr(playing_style_clusters, 'MODELE_PATH', modele)
+    monkeypatch.setattr(response_version, 'resoudre_csv', lambda: CSV_DEPOT)
+    monkeypatch.setattr(playing_style_clusters, 'resoudre_csv', lambda chemin=None: chemin or CSV_DEPOT)
+
+    premiere = response_version.version_profil('Pedri')
+    assert os.path.exists(modele)
+    assert response_version.version_profil('Pedri') == premiere
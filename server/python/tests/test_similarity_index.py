@@ -0,0 +1,58 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+import similarity_index as si
+from player_dataset import DEFAULT_CSV_PATH
+
+CSV_DEPOT = os.path.join(os.path.dirname(__file__), '..', '..', '..', DEFAULT_CSV_PATH)
+pytestmark = pytest.mark.skipif(not os.path.exists(CSV_DEPOT), reason="CSV du dépôt requis")
+
+
+@pytest.fixture
+def csv_saison(tmp_path):
+    """Extrait du CSV du dépôt: 300 lignes dont tous les joueurs passés par plusieurs clubs"""
+    df = pd.read_csv(CSV_DEPOT)
+    multiples = df[df.duplicated(['Player', 'Born', 'Nation'], keep=False)]
+    extrait = pd.concat([df.head(300), multiples]).drop_duplicates()
+    chemin = tmp_path / 'players_2024_2025.csv'
+    extrait.to_csv(chemin, index=False)
+    return str(chemin), multiples
+
+
+def identites(chemin):
+    with open(os.path.join(chemin, 'joueurs.jsonl'), encoding='utf-8') as f:
+        return [json.loads(ligne) for ligne in f]
+
+
+def test_une_ligne_par_joueur_saison(csv_saison, tmp_path):
+    csv_path, multiples = csv_saison
+    chemin = str(tmp_path / 'index')
+    si.construire_index([{'csv_path': csv_path}], chemin, nlist=4)
+    joueurs = identites(chemin)
+    cles = [(j['Player'], j['Born'], j['Nation'], j['saison']) for j in joueurs]
+    assert len(cles) == len(set(cles))
+    transferts = [j for j in joueurs if j['Player'] in set(multiples['Player'])]
+    assert transferts and all(j['Nb_clubs'] > 1 and ', ' in j['Squad'] for j in transferts)
+
+
+def test_csv_rafraichi_remplace_sa_source(csv_saison, tmp_path):
+    csv_path, _ = csv_saison
+    chemin = str(tmp_path / 'index')
+    n = si.construire_index([{'csv_path': csv_path}], chemin, nlist=4)['joueurs']
+    assert si.inserer(csv_path, chemin=chemin)['deja_indexe']
+
+    df = pd.read_csv(csv_path)
+    df.loc[0, 'Gls'] += 1
+    df.to_csv(csv_path, index=False)
+    resultat = si.inserer(csv_path, chemin=chemin)
+    assert resultat['remplace'] == [os.path.abspath(csv_path)]
+
+    index = si.IndexSimilarite(chemin)
+    assert len(index) == n
+    assert [s['saison'] for s in index.meta['sources']] == ['2024-2025']
+    voisins = index.voisins(index.vecteur(0)[0], k=10)
+    assert len({(v['Player'], v['Born']) for v in voisins}) == len(voisins)
+    index.fermer()
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+import sqlite_backend
+from player_dataset import DEFAULT_CSV_PATH
+
+CSV_DEPOT = os.path.join(os.path.dirname(__file__), '..', '..', '..', DEFAULT_CSV_PATH)
+pytestmark = pytest.mark.skipif(not os.path.exists(CSV_DEPOT), reason="CSV du dépôt requis")
+
+
+@pytest.fixture
+def base_deux_sources(tmp_path):
+    df = pd.read_csv(CSV_DEPOT, nrows=400)
+    chemins = [str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')]
+    df.iloc[:200].to_csv(chemins[0], index=False)
+    df.iloc[200:].to_csv(chemins[1], index=False)
+    db_path = str(tmp_path / 'joueurs.sqlite')
+    sqlite_backend.ingerer_csv(chemins, db_path)
+    return db_path, chemins
+
+
+def test_ouvrir_sans_csv_garde_toutes_les_sources(base_deux_sources):
+    db_path, chemins = base_deux_sources
+    assert sqlite_backend.base_a_jour(db_path)
+    backend = sqlite_backend.SQLiteBackend.ouvrir(db_path)
+    assert sqlite_backend.sources_enregistrees(db_path) == chemins
+    for chemin in chemins:
+        joueur = pd.read_csv(chemin, nrows=1).iloc[0]
+        assert backend.search_player(joueur['Player'], joueur['Squad'])['Player'] == joueur['Player']
+
+
+def test_source_modifiee_reingeree_avec_les_autres(base_deux_sources):
+    db_path, chemins = base_deux_sources
+    df = pd.read_csv(chemins[1])
+    df.iloc[:-1].to_csv(chemins[1], index=False)
+    assert not sqlite_backend.base_a_jour(db_path)
+    sqlite_backend.SQLiteBackend.ouvrir(db_path)
+    assert sqlite_backend.sources_enregistrees(db_path) == chemins
+    assert sqlite_backend.base_a_jour(db_path)
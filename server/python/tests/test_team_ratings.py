@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from team_ratings import (
+    ClassementEquipes, lire_calendrier, elo_attendu, multiplicateur_ecart, ELO_INITIAL, ELO_K
+)
+
+
+@pytest.fixture
+def calendrier():
+    return lire_calendrier(os.path.join(FIXTURES, 'schedule.csv'))
+
+
+def etat_complet(calendrier):
+    etat = ClassementEquipes('test')
+    etat.mettre_a_jour(calendrier)
+    return etat
+
+
+def assert_etats_egaux(a, b):
+    assert a.classement() == b.classement()
+    for equipe in a.equipes:
+        j = b.indices[equipe]
+        i = a.indices[equipe]
+        assert a.elo[i] == pytest.approx(b.elo[j])
+        assert a.xg_pour[i] == pytest.approx(b.xg_pour[j])
+        assert a.xg_contre[i] == pytest.approx(b.xg_contre[j])
+        assert a.matchs[i] == b.matchs[j]
+    assert a.matchs_vus == b.matchs_vus
+
+
+def test_calendrier_matchs_joues_seulement(calendrier):
+    assert len(calendrier) == 12
+    assert 'm13' not in set(calendrier['match_id'])
+    assert calendrier['date'].is_monotonic_increasing
+    assert calendrier.loc[calendrier['match_id'] == 'm04', ['buts_dom', 'buts_ext']].values.tolist() == [[0, 3]]
+
+
+def test_elo_par_journee_identique_au_match_par_match(calendrier):
+    elo = {}
+    for m in calendrier.itertuples():
+        dom, ext = elo.get(m.domicile, ELO_INITIAL), elo.get(m.exterieur, ELO_INITIAL)
+        resultat = 1.0 if m.buts_dom > m.buts_ext else 0.5 if m.buts_dom == m.buts_ext else 0.0
+        delta = ELO_K * multiplicateur_ecart(m.buts_dom - m.buts_ext) * (resultat - elo_attendu(dom, ext))
+        elo[m.domicile], elo[m.exterieur] = dom + delta, ext - delta
+
+    etat = etat_complet(calendrier)
+    for equipe, attendu in elo.items():
+        assert etat.elo[etat.indices[equipe]] == pytest.approx(float(attendu))
+
+
+def test_mise_a_jour_incrementale_egale_rejeu_complet(calendrier):
+    etat = ClassementEquipes('test')
+    assert etat.mettre_a_jour(calendrier.iloc[:6]) == {'ajoutes': 6, 'corriges': 0, 'recalcul': False}
+    # Les matchs déjà vus sont ignorés
+    assert etat.mettre_a_jour(calendrier) == {'ajoutes': 6, 'corriges': 0, 'recalcul': False}
+    assert etat.mettre_a_jour(calendrier) == {'ajoutes': 0, 'corriges': 0, 'recalcul': False}
+    assert_etats_egaux(etat, etat_complet(calendrier))
+
+
+def test_resultat_en_retard_rejoue_l_historique(calendrier):
+    en_retard = calendrier['match_id'] == 'm03'
+    etat = ClassementEquipes('test')
+    etat.mettre_a_jour(calendrier[~en_retard])
+    assert etat.mettre_a_jour(calendrier) == {'ajoutes': 1, 'corriges': 0, 'recalcul': True}
+    assert [ligne[0] for ligne in etat.historique] == list(calendrier['match_id'])
+    assert_etats_egaux(etat, etat_complet(calendrier))
+
+
+def test_score_corrige_rejoue_l_historique(calendrier):
+    etat = etat_complet(calendrier)
+    corrige = calendrier.copy()
+    ligne = corrige.index[corrige['match_id'] == 'm03'][0]
+    corrige.loc[ligne, ['buts_dom', 'buts_ext', 'xg_dom', 'xg_ext']] = [2, 1, 1.6, 1.0]
+
+    assert etat.mettre_a_jour(corrige) == {'ajoutes': 0, 'corriges': 1, 'recalcul': True}
+    assert etat.historique[2][:6] == ['m03', '2024-08-24', 'Chelsea', 'Atlético Madrid', 2.0, 1.0]
+    assert_etats_egaux(etat, etat_complet(corrige))
+    assert etat.mettre_a_jour(corrige)['corriges'] == 0
+
+
+def test_etat_persiste_puis_complete(calendrier, tmp_path):
+    chemin = str(tmp_path / 'test.json')
+    etat = ClassementEquipes('test')
+    etat.mettre_a_jour(calendrier.iloc[:8])
+    etat.sauvegarder(chemin)
+
+    recharge = ClassementEquipes.charger('test', chemin)
+    recharge.mettre_a_jour(calendrier)
+    assert_etats_egaux(recharge, etat_complet(calendrier))
+
+
+def test_confrontation(calendrier):
+    etat = etat_complet(calendrier)
+    prevision = etat.confrontation('arsenal', 'Atletico Madrid')
+    assert (prevision['domicile'], prevision['exterieur']) == ('Arsenal', 'Atlético Madrid')
+    assert sum(prevision['probabilites'].values()) == pytest.approx(1, abs=0.002)
+
+    # Arsenal (meilleure attaque et défense) favori contre Brentford, dans les deux sens
+    favori = etat.confrontation('Arsenal', 'Brentford')
+    assert favori['probabilites']['domicile'] > favori['probabilites']['exterieur']
+    assert favori['buts_attendus']['domicile'] > favori['buts_attendus']['exterieur']
+    assert favori['elo']['attendu_domicile'] > 0.5
+    inverse = etat.confrontation('Brentford', 'Arsenal')
+    assert inverse['probabilites']['exterieur'] > inverse['probabilites']['domicile']
+
+    assert 'error' in etat.confrontation('Arsenal', 'Inconnu FC')
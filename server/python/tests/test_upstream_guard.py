@@ -0,0 +1,197 @@
+import socket
+import threading
+import multiprocessing
+
+import pytest
+
+import upstream_guard
+from upstream_guard import GardeAmont, Disjoncteur, LimitationAmont, CircuitOuvert, est_erreur_limitation
+from fbref_report_generator import rate_limited_request
+from load_replay import ServeurFBrefFactice
+
+
+class Horloge:
+    def __init__(self, debut=1000.0):
+        self.maintenant = debut
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def amont():
+    serveur = ServeurFBrefFactice([], latence=0.0, graine=0).demarrer()
+    yield serveur
+    serveur.arreter()
+
+
+@pytest.fixture
+def horloge():
+    return Horloge()
+
+
+@pytest.fixture
+def garde(tmp_path, horloge):
+    disjoncteur = Disjoncteur('test', str(tmp_path), seuil=3, duree_ouverture=60, horloge=horloge)
+    return GardeAmont('test', str(tmp_path), disjoncteur=disjoncteur, horloge=horloge)
+
+
+def recuperation(amont, page='/en/comps/Big5/stats'):
+    return lambda: rate_limited_request(amont.url + page, delay=0, max_retries=2).content
+
+
+def test_429_persistants_leves_en_erreur_typee(amont):
+    amont.taux_429 = 1.0
+    with pytest.raises(LimitationAmont) as erreur:
+        rate_limited_request(amont.url + '/en/', delay=0, max_retries=2)
+    assert est_erreur_limitation(erreur.value)
+    assert amont.requetes == 2
+
+
+def test_erreur_reseau_autre_non_comptee():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    with pytest.raises(Exception) as erreur:
+        rate_limited_request(f"http://127.0.0.1:{port}/en/", delay=0, max_retries=1)
+    assert not isinstance(erreur.value, LimitationAmont)
+    assert not est_erreur_limitation(erreur.value)
+
+
+def test_ouverture_puis_repli_sans_appel_amont(amont, garde):
+    cle = ('Big 5', 2024, 'page')
+    valeur, meta = garde.obtenir(cle, recuperation(amont))
+    assert meta['source'] == 'amont' and b'stats_standard' in valeur
+
+    amont.taux_429 = 1.0
+    for _ in range(3):
+        repli, meta = garde.obtenir(cle, recuperation(amont))
+        assert meta['stale'] and repli == valeur
+    assert garde.disjoncteur.est_ouvert()
+
+    requetes = amont.requetes
+    _, meta = garde.obtenir(cle, recuperation(amont))
+    assert meta['raison'] == 'disjoncteur_ouvert'
+    assert amont.requetes == requetes
+
+
+def test_meme_cle_threads_concurrents_un_seul_appel(amont, garde):
+    amont.latence = 0.3
+    nb = 8
+    depart = threading.Barrier(nb)
+    resultats = []
+
+    def appel():
+        depart.wait()
+        resultats.append(garde.obtenir(('Big 5', 2024, 'page'), recuperation(amont)))
+
+    fils = [threading.Thread(target=appel) for _ in range(nb)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+
+    assert amont.requetes == 1
+    assert len({valeur for valeur, _ in resultats}) == 1
+    assert sum(bool(meta.get('coalesce')) for _, meta in resultats) == nb - 1
+
+
+def _appel_processus(dossier, url, depart, sortie):
+    garde = GardeAmont('test', dossier)
+    depart.wait()
+    valeur, meta = garde.obtenir(('Big 5', 2024, 'page'),
+                                 lambda: rate_limited_request(url, delay=0, max_retries=1).content)
+    sortie.put((len(valeur), meta['source']))
+
+
+@pytest.mark.skipif(not upstream_guard.FCNTL_AVAILABLE, reason="verrou fichier requis")
+def test_meme_cle_processus_concurrents_un_seul_appel(amont, tmp_path):
+    amont.latence = 0.5
+    nb = 4
+    contexte = multiprocessing.get_context('fork')
+    depart, sortie = contexte.Barrier(nb), contexte.Queue()
+    processus = [contexte.Process(target=_appel_processus,
+                                  args=(str(tmp_path), amont.url + '/en/comps/Big5/stats', depart, sortie))
+                 for _ in range(nb)]
+    for p in processus:
+        p.start()
+    resultats = [sortie.get(timeout=30) for _ in processus]
+    for p in processus:
+        p.join()
+
+    assert amont.requetes == 1
+    assert len({taille for taille, _ in resultats}) == 1
+    assert sorted(source for _, source in resultats) == ['amont'] + ['coalesce'] * (nb - 1)
+
+
+def test_sans_valeur_de_repli_circuit_ouvert(amont, garde):
+    amont.taux_429 = 1.0
+    with pytest.raises(CircuitOuvert):
+        garde.obtenir(('absente',), recuperation(amont))
+
+
+def ouvrir(garde, amont, cles, horloge):
+    """Valeurs en cache pour chaque clé, disjoncteur ouvert puis période écoulée"""
+    for cle in cles:
+        garde.obtenir(cle, recuperation(amont, f"/en/{cle}"))
+    amont.taux_429 = 1.0
+    for _ in range(garde.disjoncteur.seuil):
+        garde.obtenir(cles[0], recuperation(amont, f"/en/{cles[0]}"))
+    horloge.maintenant += garde.disjoncteur.duree_ouverture + 1
+    assert garde.disjoncteur.est_semi_ouvert()
+
+
+@pytest.mark.skipif(not upstream_guard.FCNTL_AVAILABLE, reason="verrou fichier requis")
+def test_semi_ouvert_un_seul_essai(amont, garde, horloge):
+    ouvrir(garde, amont, ['a', 'b'], horloge)
+    amont.taux_429 = 0.0
+    requetes = amont.requetes
+
+    # Essai en cours ailleurs (autre processus): repli sans appel amont
+    essai = garde.disjoncteur.prendre_essai()
+    _, meta = garde.obtenir('b', recuperation(amont, '/en/b'))
+    assert meta['raison'] == 'disjoncteur_semi_ouvert'
+    assert amont.requetes == requetes
+    garde.disjoncteur.rendre_essai(essai)
+
+    # Essai réussi: disjoncteur refermé
+    _, meta = garde.obtenir('b', recuperation(amont, '/en/b'))
+    assert meta['source'] == 'amont'
+    assert amont.requetes == requetes + 1
+    assert not garde.disjoncteur.est_semi_ouvert() and not garde.disjoncteur.est_ouvert()
+
+
+@pytest.mark.skipif(not upstream_guard.FCNTL_AVAILABLE, reason="verrou fichier requis")
+def test_semi_ouvert_appelants_concurrents(amont, garde, horloge):
+    cles = [f"cle{i}" for i in range(6)]
+    ouvrir(garde, amont, cles, horloge)
+    amont.taux_429 = 0.0
+    amont.latence = 0.3
+    requetes = amont.requetes
+
+    depart = threading.Barrier(len(cles))
+    sources = []
+
+    def appel(cle):
+        depart.wait()
+        sources.append(garde.obtenir(cle, recuperation(amont, f"/en/{cle}"))[1]['source'])
+
+    fils = [threading.Thread(target=appel, args=(cle,)) for cle in cles]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+
+    assert amont.requetes == requetes + 1
+    assert sorted(sources) == ['amont'] + ['derniere_bonne_valeur'] * (len(cles) - 1)
+
+
+@pytest.mark.skipif(not upstream_guard.FCNTL_AVAILABLE, reason="verrou fichier requis")
+def test_essai_en_echec_rouvre(amont, garde, horloge):
+    ouvrir(garde, amont, ['a'], horloge)
+    requetes = amont.requetes
+
+    _, meta = garde.obtenir('a', recuperation(amont, '/en/a'))
+    assert meta['stale']
+    assert amont.requetes == requetes + 2  # un seul essai (deux tentatives HTTP)
+    assert garde.disjoncteur.est_ouvert()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Upstream Guard - Coalescence des requêtes et disjoncteur pour les appels FBref
+Les appelants concurrents d'une même clé (ligue, saison, table) partagent une seule
+récupération, entre threads comme entre processus (verrou fichier). Après des 429 ou
+timeouts répétés, le disjoncteur s'ouvre et sert la dernière bonne valeur, marquée périmée;
+à la fin de la période d'ouverture, un seul appelant (verrou fichier) tente l'appel amont.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+
+from player_dataset import CACHE_DIR
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+GUARD_DIR = os.environ.get('UPSTREAM_GUARD_DIR', os.path.join(CACHE_DIR, 'upstream'))
+
+# Backend FBref de remplacement (ex: serveur factice de load_replay.py): http://127.0.0.1:8765
+FBREF_URL = 'https://fbref.com'
+FBREF_BASE_URL = os.environ.get('FBREF_BASE_URL', '').rstrip('/')
+
+# Échecs consécutifs (429 / timeout) avant ouverture, et durée d'ouverture en secondes
+SEUIL_ECHECS = 3
+DUREE_OUVERTURE = 300
+
+
+class CircuitOuvert(Exception):
+    """Le disjoncteur est ouvert et aucune valeur de repli n'est disponible"""
+
+
+class LimitationAmont(Exception):
+    """Échec définitif d'un appel limité par l'amont (429 ou timeout à chaque tentative)"""
+
+
+def est_erreur_limitation(erreur):
+    """Vrai pour les erreurs qui doivent faire compter le disjoncteur (429, timeouts)"""
+    if isinstance(erreur, LimitationAmont):
+        return True
+    reponse = getattr(erreur, 'response', None)
+    if getattr(reponse, 'status_code', None) == 429:
+        return True
+    if isinstance(erreur, TimeoutError) or 'timeout' in type(erreur).__name__.lower():
+        return True
+    message = str(erreur).lower()
+    return '429' in message or 'too many requests' in message or 'timed out' in message
+
+
+def url_fbref(url):
+    """Redirige une URL fbref.com vers FBREF_BASE_URL quand il est défini"""
+    if FBREF_BASE_URL and url.startswith(FBREF_URL):
+        return FBREF_BASE_URL + url[len(FBREF_URL):]
+    return url
+
+
+def configurer_soccerdata(sd):
+    """Fait pointer le lecteur FBref de soccerdata vers FBREF_BASE_URL quand il est défini"""
+    module_fbref = getattr(sd, 'fbref', None)
+    if FBREF_BASE_URL and module_fbref is not None and hasattr(module_fbref, 'FBREF_API'):
+        module_fbref.FBREF_API = FBREF_BASE_URL
+
+
+def _nom_fichier(cle):
+    return hashlib.sha256(json.dumps(cle, default=str).encode()).hexdigest()[:24]
+
+
+class Disjoncteur:
+    """Disjoncteur partagé entre processus (état dans un fichier JSON)"""
+
+    def __init__(self, nom, dossier=None, seuil=SEUIL_ECHECS, duree_ouverture=DUREE_OUVERTURE,
+                 horloge=time.time):
+        self.chemin = os.path.join(dossier or GUARD_DIR, f"disjoncteur_{nom}.json")
+        self.chemin_essai = os.path.join(dossier or GUARD_DIR, f"disjoncteur_{nom}.essai.lock")
+        self.seuil = seuil
+        self.duree_ouverture = duree_ouverture
+        self.horloge = horloge
+
+    def _lire(self):
+        try:
+            with open(self.chemin, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'echecs': 0, 'ouvert_jusqua': 0}
+
+    def _ecrire(self, etat):
+        os.makedirs(os.path.dirname(self.chemin), exist_ok=True)
+        tmp = f"{self.chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(etat, f)
+        os.replace(tmp, self.chemin)
+
+    def est_ouvert(self):
+        """Ouvert tant que la période d'ouverture n'est pas écoulée (ensuite: semi-ouvert)"""
+        return self.horloge() < self._lire()['ouvert_jusqua']
+
+    def est_semi_ouvert(self):
+        """Période d'ouverture écoulée sans succès depuis: un seul essai autorisé"""
+        ouvert_jusqua = self._lire()['ouvert_jusqua']
+        return 0 < ouvert_jusqua <= self.horloge()
+
+    def prendre_essai(self):
+        """Verrou de l'essai semi-ouvert (tous processus), ou None s'il est déjà pris;
+        à rendre avec rendre_essai après succes() ou echec()"""
+        if not FCNTL_AVAILABLE:
+            return True
+        os.makedirs(os.path.dirname(self.chemin_essai), exist_ok=True)
+        verrou = open(self.chemin_essai, 'w')
+        try:
+            fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            verrou.close()
+            return None
+        return verrou
+
+    @staticmethod
+    def rendre_essai(verrou):
+        if FCNTL_AVAILABLE and verrou:
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+            verrou.close()
+
+    def succes(self):
+        self._ecrire({'echecs': 0, 'ouvert_jusqua': 0})
+
+    def echec(self):
+        etat = self._lire()
+        etat['echecs'] += 1
+        if etat['echecs'] >= self.seuil:
+            etat['ouvert_jusqua'] = self.horloge() + self.duree_ouverture
+        self._ecrire(etat)
+
+    def etat(self):
+        etat = self._lire()
+        return {**etat, 'ouvert': self.horloge() < etat['ouvert_jusqua'],
+                'semi_ouvert': 0 < etat['ouvert_jusqua'] <= self.horloge()}
+
+
+class GardeAmont:
+    """Coalescence single-flight + dernière bonne valeur + disjoncteur"""
+
+    def __init__(self, nom='fbref', dossier=None, disjoncteur=None, horloge=time.time):
+        self.dossier = dossier or GUARD_DIR
+        self.horloge = horloge
+        self.disjoncteur = disjoncteur or Disjoncteur(nom, self.dossier, horloge=horloge)
+        self._verrou = threading.Lock()
+        self._en_vol = {}
+
+    # --- Dernière bonne valeur ---
+
+    def _chemin_valeur(self, cle):
+        return os.path.join(self.dossier, f"{_nom_fichier(cle)}.pkl")
+
+    def _lire_valeur(self, cle):
+        try:
+            with open(self._chemin_valeur(cle), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _ecrire_valeur(self, cle, valeur):
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin = self._chemin_valeur(cle)
+        tmp = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump({'valeur': valeur, 'obtenu_le': self.horloge()}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin)
+
+    def _repli(self, cle, raison):
+        """Dernière bonne valeur marquée périmée, ou CircuitOuvert"""
+        stocke = self._lire_valeur(cle)
+        if stocke is None:
+            raise CircuitOuvert(f"Upstream indisponible ({raison}) et aucune donnée en cache")
+        return stocke['valeur'], {'stale': True, 'source': 'derniere_bonne_valeur',
+                                  'age': round(self.horloge() - stocke['obtenu_le'], 1),
+                                  'raison': raison}
+
+    # --- Appel ---
+
+    def obtenir(self, cle, recuperer):
+        """Retourne (valeur, meta); une seule récupération pour tous les appelants concurrents"""
+        with self._verrou:
+            vol = self._en_vol.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = {'evenement': threading.Event(), 'resultat': None, 'erreur': None}
+                self._en_vol[cle] = vol
+
+        if not meneur:
+            # Un autre thread récupère déjà cette clé: on attend son résultat
+            vol['evenement'].wait()
+            if vol['erreur'] is not None:
+                raise vol['erreur']
+            valeur, meta = vol['resultat']
+            return valeur, {**meta, 'coalesce': True}
+
+        try:
+            vol['resultat'] = self._obtenir_inter_processus(cle, recuperer)
+            return vol['resultat']
+        except Exception as e:
+            vol['erreur'] = e
+            raise
+        finally:
+            with self._verrou:
+                self._en_vol.pop(cle, None)
+            vol['evenement'].set()
+
+    def _obtenir_inter_processus(self, cle, recuperer):
+        if self.disjoncteur.est_ouvert():
+            return self._repli(cle, 'disjoncteur_ouvert')
+        if not self.disjoncteur.est_semi_ouvert():
+            return self._obtenir_coalesce(cle, recuperer)
+
+        # Semi-ouvert: un seul essai amont, les autres appelants restent sur le repli
+        essai = self.disjoncteur.prendre_essai()
+        if essai is None:
+            return self._repli(cle, 'disjoncteur_semi_ouvert')
+        try:
+            # Essai précédent terminé entre-temps en échec: disjoncteur rouvert
+            if self.disjoncteur.est_ouvert():
+                return self._repli(cle, 'disjoncteur_ouvert')
+            return self._obtenir_coalesce(cle, recuperer)
+        finally:
+            self.disjoncteur.rendre_essai(essai)
+
+    def _obtenir_coalesce(self, cle, recuperer):
+        if not FCNTL_AVAILABLE:
+            return self._recuperer(cle, recuperer)
+
+        os.makedirs(self.dossier, exist_ok=True)
+        debut_attente = self.horloge()
+        with open(os.path.join(self.dossier, f"{_nom_fichier(cle)}.lock"), 'w') as verrou:
+            try:
+                fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Un autre processus récupère la même clé: attendre puis relire son résultat
+                fcntl.flock(verrou, fcntl.LOCK_EX)
+                stocke = self._lire_valeur(cle)
+                if stocke is not None and stocke['obtenu_le'] >= debut_attente:
+                    return stocke['valeur'], {'stale': False, 'source': 'coalesce', 'age': 0}
+                if self.disjoncteur.est_ouvert():
+                    return self._repli(cle, 'disjoncteur_ouvert')
+            return self._recuperer(cle, recuperer)
+
+    def _recuperer(self, cle, recuperer):
+        try:
+            valeur = recuperer()
+        except Exception as e:
+            if not est_erreur_limitation(e):
+                raise
+            self.disjoncteur.echec()
+            return self._repli(cle, str(e))
+        self.disjoncteur.succes()
+        self._ecrire_valeur(cle, valeur)
+        return valeur, {'stale': False, 'source': 'amont', 'age': 0}
+
+
+_GARDES = {}
+
+
+def garde(nom='fbref'):
+    """Garde partagée par le processus pour un upstream donné"""
+    if nom not in _GARDES:
+        _GARDES[nom] = GardeAmont(nom)
+    return _GARDES[nom]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Vectorized Profiles - Calculs du profil joueur pour tous les joueurs en une passe
+Mêmes règles que EnhancedPlayerAnalyzer (percentiles par poste, note globale, forces et
+faiblesses), mais en opérations pandas sur colonnes entières.
+"""
+
+import numpy as np
+import pandas as pd
+
+from player_dataset import STATS_PERCENTILES, MIN_JOUEURS_POSTE
+
+# Libellés des statistiques (identiques à identify_strengths / identify_weaknesses)
+NOMS_STATS = {
+    'Gls': 'Finition',
+    'Ast': 'Passes décisives',
+    'xG': 'Occasions créées',
+    'xAG': 'Création offensive',
+    'PrgP': 'Passes progressives',
+    'PrgC': 'Courses vers l\'avant',
+    'PrgR': 'Réceptions avancées'
+}
+
+# Seuils de percentile pour les forces et faiblesses
+SEUIL_FORCE = 80
+SEUIL_FAIBLESSE = 20
+
+
+def percentiles_par_poste(df, stats=None):
+    """Percentile de chaque joueur parmi son poste (tous les joueurs si moins de 5 au poste)"""
+    stats = [s for s in (stats or STATS_PERCENTILES) if s in df.columns]
+    valeurs = df[stats].apply(pd.to_numeric, errors='coerce')
+    remplies = valeurs.fillna(0)
+    postes = df['Pos'].fillna('')
+
+    # Nombre de valeurs strictement inférieures = rang 'min' - 1
+    rang_poste = remplies.groupby(postes).rank(method='min') - 1
+    taille_poste = postes.map(postes.value_counts())
+    rang_global = remplies.rank(method='min') - 1
+
+    petit_poste = (taille_poste < MIN_JOUEURS_POSTE).to_numpy()[:, None]
+    rang = np.where(petit_poste, rang_global, rang_poste)
+    taille = np.where(petit_poste, len(df), taille_poste.to_numpy()[:, None])
+
+    percentiles = pd.DataFrame(rang / taille * 100, index=df.index, columns=stats).round(1)
+    return percentiles.where(valeurs.notna())
+
+
+def stats_par_90(df, stats=('Gls', 'Ast', 'xG', 'xAG')):
+    """Taux par 90 minutes (NaN pour les joueurs sans minutes)"""
+    minutes = pd.to_numeric(df['Min'], errors='coerce')
+    minutes = minutes.where(minutes > 0)
+    stats = [s for s in stats if s in df.columns]
+    valeurs = df[stats].apply(pd.to_numeric, errors='coerce').fillna(0)
+    return valeurs.div(minutes, axis=0).mul(90).round(2)
+
+
+def notes_globales(percentiles):
+    """Moyenne des percentiles disponibles (50 sans données, comme calculate_overall_rating)"""
+    return percentiles.mean(axis=1).round(1).fillna(50)
+
+
+def forces_faiblesses(percentiles):
+    """Tableaux booléens des forces (>= 80) et faiblesses (<= 20) par statistique"""
+    forces = percentiles.ge(SEUIL_FORCE) & percentiles.notna()
+    faiblesses = percentiles.le(SEUIL_FAIBLESSE) & percentiles.notna()
+    return forces, faiblesses
+
+
+def libelles_tags(tags, defaut):
+    """Liste des libellés des tags vrais par joueur (défaut si aucun)"""
+    colonnes = list(tags.columns)
+    noms = [NOMS_STATS.get(c, c) for c in colonnes]
+    return [
+        [noms[i] for i in np.flatnonzero(ligne)] or [defaut]
+        for ligne in tags.to_numpy()
+    ]
+
+
+def percentiles_contre(df, population, stats=None):
+    """Percentiles des lignes de df parmi une autre population (mêmes règles par poste)"""
+    stats = [s for s in (stats or STATS_PERCENTILES) if s in df.columns and s in population.columns]
+    valeurs = df[stats].apply(pd.to_numeric, errors='coerce')
+    reference = population[stats].apply(pd.to_numeric, errors='coerce').fillna(0)
+    postes = df['Pos'].fillna('').to_numpy()
+    postes_reference = population['Pos'].fillna('').to_numpy()
+    tailles = pd.Series(postes_reference).value_counts()
+
+    percentiles = np.full(valeurs.shape, np.nan)
+    for poste in pd.unique(postes):
+        lignes = postes == poste
+        taille = tailles.get(poste, 0)
+        groupe = reference[postes_reference == poste] if taille >= MIN_JOUEURS_POSTE else reference
+        for j, stat in enumerate(stats):
+            # Nombre de valeurs strictement inférieures dans la population triée
+            triees = np.sort(groupe[stat].to_numpy())
+            inferieurs = np.searchsorted(triees, valeurs[stat].to_numpy()[lignes], side='left')
+            percentiles[lignes, j] = inferieurs / len(triees) * 100
+    return pd.DataFrame(percentiles, index=df.index, columns=stats).round(1).where(valeurs.notna())
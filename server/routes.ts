@@ -1,4 +1,4 @@
-import type { Express } from "express";
+import type { Express, Request, Response } from "express";
 import { createServer, type Server } from "http";
 import { storage } from "./storage";
 import { scraper } from "./services/scraper";
@@ -16,6 +16,26 @@ import { comparisonService } from "./services/comparisonService";
 import { insertPlayerSchema, insertComparisonSchema } from "@shared/schema";
 import { z } from "zod";
 
+// Version envoyée par le client (If-None-Match: "abc" ou W/"abc")
+function requestVersion(req: Request): string | undefined {
+  const header = req.headers['if-none-match'];
+  if (!header || typeof header !== 'string') return undefined;
+  return header.replace(/^W\//, '').replace(/"/g, '').trim() || undefined;
+}
+
+// 304 si la version n'a pas changé, sinon ETag = version de la réponse Python
+function notModified(res: Response, result: any): boolean {
+  if (result?.not_modified) {
+    res.setHeader('ETag', `"${result.version}"`);
+    res.status(304).end();
+    return true;
+  }
+  if (result?.version) {
+    res.setHeader('ETag', `"${result.version}"`);
+  }
+  return false;
+}
+
 export async function registerRoutes(app: Express): Promise<Server> {
 
   // Search players endpoint
@@ -393,6 +413,59 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Forces des équipes (Elo + attaque/défense xG) d'un championnat
+  app.get("/api/teams/ratings", async (req, res) => {
+    try {
+      const league = (req.query.league as string) || 'ENG-Premier League';
+      const limit = req.query.limit !== undefined ? parseInt(req.query.limit as string) : undefined;
+      if (limit !== undefined && (isNaN(limit) || limit <= 0)) {
+        return res.status(400).json({ error: "limit must be a positive integer" });
+      }
+
+      const result = await soccerDataService.getTeamRatings(league, undefined, req.query.refresh === 'true', limit);
+      if (result && result.success) {
+        res.json(result);
+      } else {
+        res.status(503).json({ error: result?.error || "Team ratings not available" });
+      }
+    } catch (error) {
+      console.error('Error getting team ratings:', error);
+      res.status(500).json({ error: "Failed to get team ratings" });
+    }
+  });
+
+  app.get("/api/teams/:teamName/rating", async (req, res) => {
+    try {
+      const league = (req.query.league as string) || 'ENG-Premier League';
+      const result = await soccerDataService.getTeamRatings(league, req.params.teamName, req.query.refresh === 'true');
+      if (result && result.success) {
+        res.json(result);
+      } else {
+        res.status(404).json({ error: result?.error || "Team rating not available" });
+      }
+    } catch (error) {
+      console.error('Error getting team rating:', error);
+      res.status(500).json({ error: "Failed to get team rating" });
+    }
+  });
+
+  // Buts attendus et probabilités 1N2 d'une confrontation domicile / extérieur
+  app.get("/api/teams/matchup/:homeTeam/:awayTeam", async (req, res) => {
+    try {
+      const { homeTeam, awayTeam } = req.params;
+      const league = (req.query.league as string) || 'ENG-Premier League';
+      const result = await soccerDataService.predictMatchup(homeTeam, awayTeam, league);
+      if (result && result.success) {
+        res.json(result);
+      } else {
+        res.status(404).json({ error: result?.error || "Matchup prediction not available" });
+      }
+    } catch (error) {
+      console.error('Error predicting matchup:', error);
+      res.status(500).json({ error: "Failed to predict matchup" });
+    }
+  });
+
   // Get position comparison
   app.get("/api/players/:id/position-comparison", async (req, res) => {
     try {
@@ -446,9 +519,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
       const report = await enhancedReportService.generateCompletePlayerReport(
         player.name,
         player.team,
-        2024
+        2024,
+        requestVersion(req)
       );
 
+      if (notModified(res, report)) return;
+
       if (report && report.success) {
         res.json(report);
       } else {
@@ -565,10 +641,14 @@ export async function registerRoutes(app: Express): Promise<Server> {
     try {
       const playerName = decodeURIComponent(req.params.playerName);
       const team = req.query.team as string;
+      // ?sections=percentiles,forces : seules ces sections sont calculées et renvoyées
+      const sections = req.query.sections ? String(req.query.sections).split(',') : undefined;
 
       console.log(`Getting CSV player profile: ${playerName}${team ? ` in team ${team}` : ''}`);
 
-      const profile = await csvPlayerAnalyzer.getCompletePlayerProfile(playerName, team);
+      const profile = await csvPlayerAnalyzer.getCompletePlayerProfile(playerName, team, sections, requestVersion(req));
+
+      if (notModified(res, profile)) return;
 
       if (profile.error) {
         res.status(404).json({ error: profile.error });
@@ -581,6 +661,55 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Rechercher les joueurs par forces / faiblesses (ex: q=force:PrgP AND force:PrgC&position=MF)
+  app.get("/api/csv/players/tags", async (req, res) => {
+    try {
+      const { q, position, limit } = req.query;
+
+      if (!q || typeof q !== 'string') {
+        return res.status(400).json({ error: "Tag query is required" });
+      }
+
+      const result = await csvPlayerAnalyzer.queryTags(
+        q,
+        position as string,
+        limit ? parseInt(limit as string) : 20
+      );
+
+      if (result.error) {
+        res.status(400).json({ error: result.error });
+      } else {
+        res.json({ success: true, ...result });
+      }
+    } catch (error) {
+      console.error('CSV tag query error:', error);
+      res.status(500).json({ error: "Internal server error" });
+    }
+  });
+
+  // Joueurs au profil similaire (toutes saisons indexées)
+  app.get("/api/csv/players/similar/:playerName", async (req, res) => {
+    try {
+      const playerName = decodeURIComponent(req.params.playerName);
+      const { team, limit } = req.query;
+
+      const result = await csvPlayerAnalyzer.getSimilarPlayers(
+        playerName,
+        team as string,
+        limit ? parseInt(limit as string) : 10
+      );
+
+      if (result.error) {
+        res.status(404).json({ error: result.error });
+      } else {
+        res.json({ success: true, ...result });
+      }
+    } catch (error) {
+      console.error('CSV similar players error:', error);
+      res.status(500).json({ error: "Internal server error" });
+    }
+  });
+
   // Générer la heatmap d'un joueur
   app.get("/api/csv/players/:playerName/heatmap", async (req, res) => {
     try {
@@ -588,7 +717,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
 
       console.log(`Generating heatmap for CSV player: ${playerName}`);
 
-      const heatmapData = await csvPlayerAnalyzer.generateHeatmap(playerName);
+      const heatmapData = await csvPlayerAnalyzer.generateHeatmap(playerName, requestVersion(req));
+
+      if (notModified(res, heatmapData)) return;
 
       if (heatmapData.error) {
         res.status(404).json({ error: heatmapData.error });
@@ -1218,6 +1349,51 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Flux NDJSON paginé (curseur) des tables soccerdata: une ligne JSON par objet, puis '_meta'
+  const streamActions = {
+    schedule: 'stream_schedule',
+    'league-table': 'stream_league_table',
+    players: 'stream_player_table'
+  } as const;
+
+  app.get("/api/stream/:table", async (req, res) => {
+    const action = streamActions[req.params.table as keyof typeof streamActions];
+    if (!action) {
+      return res.status(404).json({ error: `Unknown stream table: ${req.params.table}` });
+    }
+
+    const params: { limit?: number; cursor?: string; columns?: string[]; league?: string } = {};
+    if (req.query.limit !== undefined) {
+      const limit = parseInt(req.query.limit as string);
+      if (isNaN(limit) || limit <= 0) {
+        return res.status(400).json({ error: "limit must be a positive integer" });
+      }
+      params.limit = limit;
+    }
+    if (typeof req.query.cursor === 'string') params.cursor = req.query.cursor;
+    if (typeof req.query.league === 'string') params.league = req.query.league;
+    if (typeof req.query.columns === 'string') {
+      params.columns = req.query.columns.split(',').map(c => c.trim()).filter(Boolean);
+    }
+
+    res.setHeader('Content-Type', 'application/x-ndjson; charset=utf-8');
+    res.setHeader('Cache-Control', 'no-cache');
+
+    try {
+      const meta = await soccerDataService.streamRows(action, params, (row) => {
+        res.write(JSON.stringify(row) + '\n');
+      });
+      res.end(JSON.stringify({ _meta: meta }) + '\n');
+    } catch (error) {
+      console.error('Error streaming rows:', error);
+      if (!res.headersSent) {
+        res.status(500).json({ error: "Failed to stream rows" });
+      } else {
+        res.end(JSON.stringify({ _meta: { error: "Failed to stream rows" } }) + '\n');
+      }
+    }
+  });
+
   // Player PDF Generation Route
   app.get("/api/csv-direct/player/:name/pdf", async (req, res) => {
     try {
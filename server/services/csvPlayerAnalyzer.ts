@@ -7,6 +7,7 @@ const __dirname = path.dirname(fileURLToPath(import.meta.url));
 
 export class CSVPlayerAnalyzer {
   private pythonScriptPath = path.join(__dirname, '../python/enhanced_player_analyzer.py');
+  private profileStorePath = path.join(__dirname, '../python/profile_store.py');
   private csvDataPath = path.join(process.cwd(), 'players_data_light.csv');
 
   async searchPlayer(playerName: string, team?: string): Promise<any> {
@@ -22,12 +23,24 @@ export class CSVPlayerAnalyzer {
     }
   }
 
-  async getCompletePlayerProfile(playerName: string, team?: string): Promise<any> {
+  async getCompletePlayerProfile(playerName: string, team?: string, sections?: string[], ifNoneMatch?: string): Promise<any> {
     try {
-      const args = ['get_complete_profile', playerName];
+      const args = [playerName];
       if (team) args.push(team);
+      const sectionList = sections && sections.length ? sections.join(',') : '';
+      // Version déjà connue de l'appelant: réponse { not_modified, version } sans calcul
+      const versionArgs = ifNoneMatch ? [`--if-none-match=${ifNoneMatch}`] : [];
       
-      const result = await this.runPythonScript(args);
+      // Store de profils précalculés (lecture SQLite sans pandas), sinon analyse complète
+      try {
+        const storeArgs = sectionList ? [playerName, team || '', sectionList] : args;
+        return await this.runPythonScript(['get', ...storeArgs, ...versionArgs], this.profileStorePath);
+      } catch (storeError) {
+        console.warn('Profile store unavailable, falling back to analyzer:', storeError.message);
+      }
+      
+      const analyzerArgs = sectionList ? [...args, `--sections=${sectionList}`] : args;
+      const result = await this.runPythonScript(['get_complete_profile', ...analyzerArgs, ...versionArgs]);
       return result;
     } catch (error) {
       console.error('Error getting player profile:', error);
@@ -35,9 +48,10 @@ export class CSVPlayerAnalyzer {
     }
   }
 
-  async generateHeatmap(playerName: string): Promise<any> {
+  async generateHeatmap(playerName: string, ifNoneMatch?: string): Promise<any> {
     try {
-      const result = await this.runPythonScript(['generate_heatmap', playerName]);
+      const versionArgs = ifNoneMatch ? [`--if-none-match=${ifNoneMatch}`] : [];
+      const result = await this.runPythonScript(['generate_heatmap', playerName, ...versionArgs]);
       return result;
     } catch (error) {
       console.error('Error generating heatmap:', error);
@@ -45,9 +59,31 @@ export class CSVPlayerAnalyzer {
     }
   }
 
-  private async runPythonScript(args: string[]): Promise<any> {
+  async queryTags(expression: string, position?: string, limit: number = 20): Promise<any> {
+    try {
+      const args = ['query_tags', expression, position || '*', String(limit)];
+      const result = await this.runPythonScript(args);
+      return result;
+    } catch (error) {
+      console.error('Error querying player tags:', error);
+      return { error: error.message };
+    }
+  }
+
+  async getSimilarPlayers(playerName: string, team?: string, limit: number = 10): Promise<any> {
+    try {
+      const args = ['similar_players', playerName, team || '', String(limit)];
+      const result = await this.runPythonScript(args);
+      return result;
+    } catch (error) {
+      console.error('Error finding similar players:', error);
+      return { error: error.message };
+    }
+  }
+
+  private async runPythonScript(args: string[], scriptPath: string = this.pythonScriptPath): Promise<any> {
     return new Promise((resolve, reject) => {
-      const python = spawn('python3', [this.pythonScriptPath, ...args]);
+      const python = spawn('python3', [scriptPath, ...args]);
       
       let stdout = '';
       let stderr = '';
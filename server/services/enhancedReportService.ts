@@ -10,7 +10,7 @@ const __dirname = path.dirname(__filename);
 export class EnhancedReportService {
   private pythonScriptPath = path.join(__dirname, '../python/fbref_report_generator.py');
 
-  async generateCompletePlayerReport(playerName: string, team?: string, season: number = 2024): Promise<any> {
+  async generateCompletePlayerReport(playerName: string, team?: string, season: number = 2024, ifNoneMatch?: string): Promise<any> {
     try {
       console.log(`Generating complete report for ${playerName} with enhanced rate limiting`);
       
@@ -22,7 +22,9 @@ export class EnhancedReportService {
         return this.runPythonScript('generer_rapport_complet', {
           nom_joueur: playerName,
           equipe: team,
-          saison: season
+          saison: season,
+          // Version déjà connue: { not_modified, version } sans générer le rapport
+          ...(ifNoneMatch ? { if_none_match: ifNoneMatch } : {})
         });
       }, 'high');
       
@@ -60,6 +60,41 @@ export class SoccerDataService {
     }
   }
 
+  async getTeamRatings(league: string, team?: string, refresh: boolean = false, limit?: number): Promise<any> {
+    try {
+      console.log(`Getting team ratings for ${team || 'all teams'} in ${league}`);
+
+      const result = await this.runPythonScript('get_team_ratings', {
+        league: league,
+        team: team,
+        refresh: refresh,
+        limit: limit
+      });
+
+      return result;
+    } catch (error) {
+      console.error('Error getting team ratings:', error);
+      return null;
+    }
+  }
+
+  async predictMatchup(homeTeam: string, awayTeam: string, league: string): Promise<any> {
+    try {
+      console.log(`Predicting ${homeTeam} vs ${awayTeam} in ${league}`);
+
+      const result = await this.runPythonScript('predict_matchup', {
+        home_team: homeTeam,
+        away_team: awayTeam,
+        league: league
+      });
+
+      return result;
+    } catch (error) {
+      console.error('Error predicting matchup:', error);
+      return null;
+    }
+  }
+
   async getPlayerPerformanceAnalysis(playerName: string, position: string): Promise<any> {
     try {
       console.log(`Getting performance analysis for ${playerName} (${position})`);
@@ -102,6 +137,63 @@ export class SoccerDataService {
     }
   }
 
+  async streamRows(
+    action: 'stream_schedule' | 'stream_league_table' | 'stream_player_table' | 'stream_batch_results',
+    params: { limit?: number; cursor?: string; columns?: string[]; [key: string]: any },
+    onRow: (row: any) => void
+  ): Promise<{ lignes: number; next_cursor: string | null; error?: string }> {
+    return rateLimitManager.executeWithRateLimit('soccerdata', async () => {
+      return new Promise((resolve, reject) => {
+        const python = spawn('python3', [this.pythonScriptPath, action, JSON.stringify(params)]);
+        
+        let buffer = '';
+        let stderr = '';
+        let meta: any = null;
+        
+        // NDJSON: each complete line is forwarded as soon as it arrives
+        python.stdout.on('data', (data) => {
+          buffer += data.toString();
+          let newline = buffer.indexOf('\n');
+          while (newline !== -1) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) {
+              try {
+                const row = JSON.parse(line);
+                if (row._meta) {
+                  meta = row._meta;
+                } else {
+                  onRow(row);
+                }
+              } catch (parseError) {
+                console.error('Skipping non-JSON output line:', line);
+              }
+            }
+            newline = buffer.indexOf('\n');
+          }
+        });
+        
+        python.stderr.on('data', (data) => {
+          stderr += data.toString();
+        });
+        
+        python.on('close', (code) => {
+          if (code === 0 && meta) {
+            resolve(meta);
+          } else {
+            console.error('Python stream error:', stderr);
+            reject(new Error(`Python stream failed with code ${code}: ${stderr}`));
+          }
+        });
+        
+        python.on('error', (error) => {
+          console.error('Failed to start Python script:', error);
+          reject(error);
+        });
+      });
+    });
+  }
+
   private async runPythonScript(action: string, params: any): Promise<any> {
     return rateLimitManager.executeWithRateLimit('soccerdata', async () => {
       return new Promise((resolve, reject) => {
@@ -1,21 +1,145 @@
+import io
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# Statistiques affichées (libellé, colonne du CSV, clé par 90)
+cols_metrics = [
+    ("Buts", "Gls", "Goals_per90"),
+    ("Passes déc.", "Ast", "Assists_per90"),
+    ("xG", "xG", "xG_per90"),
+    ("xA", "xAG", "xA_per90"),
+    ("Passes progressives", "PrgP", "Progressive_passes_per90"),
+    ("Dribbles réussis", "Succ", "Dribbles_per90"),
+    ("Tacles", "Tkl", "Tackles_per90"),
+    ("Interceptions", "Int", "Interceptions_per90"),
+]
+
+# Colonne de saison éventuelle (fichiers multi-saisons)
+SEASON_COLUMNS = ["Season", "season", "saison"]
+
+
+def file_key(uploaded):
+    """Identifiant du fichier chargé (évite de hacher tout le contenu à chaque rerun)"""
+    return f"{uploaded.name}-{uploaded.size}-{getattr(uploaded, 'file_id', '')}"
+
+
+@st.cache_data(show_spinner="Chargement du fichier...", max_entries=4)
+def load_csv(key, _uploaded):
+    """Lit le CSV une seule fois par fichier chargé"""
+    return pd.read_csv(io.BytesIO(_uploaded.getvalue()), low_memory=False)
+
+
+@st.cache_data(show_spinner="Calcul des percentiles...", max_entries=4)
+def compute_leaderboard(key, _uploaded):
+    """Stats par 90 et percentiles par poste de tous les joueurs, en une passe vectorisée"""
+    # Lecture limitée aux colonnes du classement (fichiers multi-saisons volumineux)
+    needed = {"Player", "Squad", "Comp", "Pos", "Age", "Min", *SEASON_COLUMNS, *(c for _, c, _ in cols_metrics)}
+    df = pd.read_csv(io.BytesIO(_uploaded.getvalue()), usecols=lambda c: c in needed, low_memory=False)
+    season_col = next((c for c in SEASON_COLUMNS if c in df.columns), None)
+
+    columns = {}
+    for col in ["Player", "Squad", "Comp", "Pos"]:
+        columns[col] = df[col].astype("category") if col in df.columns else pd.Categorical([None] * len(df))
+    if season_col:
+        columns["Saison"] = df[season_col].astype("category")
+    columns["Groupe"] = df["Pos"].fillna("").astype(str).str[:2].astype("category")
+    columns["Age"] = pd.to_numeric(df.get("Age"), errors="coerce").astype("float32")
+    minutes = pd.to_numeric(df.get("Min"), errors="coerce").fillna(0)
+    columns["Min"] = minutes.astype("int32")
+
+    # Percentile dans le même poste (et la même saison si le fichier en contient plusieurs)
+    group_keys = [df["Pos"].fillna("")] + ([df[season_col]] if season_col else [])
+    per_90_factor = 90 / minutes.where(minutes > 0)
+    for label, col_val, col_per90 in cols_metrics:
+        if col_val not in df.columns:
+            continue
+        values = pd.to_numeric(df[col_val], errors="coerce")
+        columns[f"{label} /90"] = (values * per_90_factor).round(2).astype("float32")
+        columns[f"{label} pct"] = np.floor(values.groupby(group_keys).rank(pct=True) * 100).astype("float32")
+    return pd.DataFrame(columns, index=df.index)
+
+
+def filter_leaderboard(table, groups, comps, min_minutes, age_range):
+    """Masque des filtres (poste, championnat, minutes, âge)"""
+    mask = table["Min"].to_numpy() >= min_minutes
+    if groups:
+        mask &= table["Groupe"].isin(groups).to_numpy()
+    if comps:
+        mask &= table["Comp"].isin(comps).to_numpy()
+    ages = table["Age"].to_numpy()
+    mask &= np.isnan(ages) | ((ages >= age_range[0]) & (ages <= age_range[1]))
+    return np.flatnonzero(mask)
+
+
+def leaderboard_page(table, rows, sort_col, ascending, page, page_size):
+    """Trie uniquement les lignes filtrées et ne renvoie que la page visible"""
+    values = table[sort_col].to_numpy()[rows]
+    if values.dtype.kind in "fiu":
+        order = np.argsort(values, kind="stable")
+        # NaN toujours en fin de classement
+        nan_count = int(np.isnan(values).sum()) if values.dtype.kind == "f" else 0
+        order = order if ascending else np.concatenate(
+            [order[:len(order) - nan_count][::-1], order[len(order) - nan_count:]])
+    else:
+        order = np.argsort(pd.Series(values).astype(str).to_numpy(), kind="stable")
+        order = order if ascending else order[::-1]
+    start = page * page_size
+    return table.iloc[rows[order[start:start + page_size]]]
+
+
+def show_leaderboard(uploaded):
+    """Page classement: filtres, tri et pagination côté serveur"""
+    table = compute_leaderboard(file_key(uploaded), uploaded)
+
+    st.sidebar.markdown("### 🔎 Filtres")
+    groups = st.sidebar.multiselect("Poste", ["GK", "DF", "MF", "FW"])
+    comps = st.sidebar.multiselect("Championnat", sorted(table["Comp"].dropna().unique()))
+    max_minutes = int(table["Min"].max()) if len(table) else 0
+    min_minutes = st.sidebar.slider("Minutes minimum", 0, max(max_minutes, 1), min(450, max_minutes), step=90)
+    ages = table["Age"].dropna()
+    age_min, age_max = (int(ages.min()), int(ages.max())) if len(ages) else (15, 45)
+    age_range = st.sidebar.slider("Âge", age_min, max(age_max, age_min + 1), (age_min, max(age_max, age_min + 1)))
+
+    rows = filter_leaderboard(table, groups, comps, min_minutes, age_range)
+
+    stat_cols = [c for c in table.columns if c.endswith(" /90") or c.endswith(" pct")]
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        sort_col = st.selectbox("Trier par", stat_cols + ["Min", "Age", "Player"])
+    with col2:
+        ascending = st.radio("Ordre", ["Décroissant", "Croissant"], horizontal=True) == "Croissant"
+    with col3:
+        page_size = st.selectbox("Lignes par page", [25, 50, 100], index=1)
+
+    page_count = max(1, -(-len(rows) // page_size))
+    page = st.number_input(f"Page (sur {page_count})", min_value=1, max_value=page_count, value=1) - 1
+
+    st.caption(f"{len(rows)} joueurs correspondent aux filtres")
+    st.dataframe(leaderboard_page(table, rows, sort_col, ascending, page, page_size),
+                 use_container_width=True, hide_index=True)
+
+
 # Config Streamlit
 st.set_page_config(layout="wide")
-st.title("📊 Fiche Joueur - Saison 2024/25")
+page_choice = st.sidebar.radio("Vue", ["Fiche joueur", "Classement"])
+st.title("🏆 Classement des joueurs" if page_choice == "Classement" else "📊 Fiche Joueur - Saison 2024/25")
 
 # ⬆️ Upload du fichier CSV
 uploaded_file = st.file_uploader("Charge ton fichier CSV de joueurs", type=["csv"])
 
-if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+if uploaded_file and page_choice == "Classement":
+    show_leaderboard(uploaded_file)
+
+elif uploaded_file:
+    df = load_csv(file_key(uploaded_file), uploaded_file)
+    leaderboard = compute_leaderboard(file_key(uploaded_file), uploaded_file)
 
     # ➕ Sélection joueur
-    joueur = st.selectbox("Choisis un joueur", sorted(df["Player"].unique()))
-    data = df[df["Player"] == joueur].squeeze()
+    joueur = st.selectbox("Choisis un joueur", sorted(df["Player"].dropna().unique()))
+    data = df[df["Player"] == joueur].iloc[0]
 
     st.header(f"🧑‍💼 {joueur} - {data['Squad']} ({data['Pos']})")
 
@@ -29,28 +153,12 @@ if uploaded_file:
     # 🎯 Statistiques par 90 minutes
     st.subheader("📈 Statistiques avancées (par 90 min) + Percentiles")
 
-    # Utilisation des colonnes disponibles dans votre CSV
-    cols_metrics = [
-        ("Buts", "Gls", "Goals_per90"),
-        ("Passes déc.", "Ast", "Assists_per90"),
-        ("xG", "xG", "xG_per90"),
-        ("xA", "xAG", "xA_per90"),
-        ("Passes progressives", "PrgP", "Progressive_passes_per90"),
-        ("Dribbles réussis", "Succ", "Dribbles_per90"),
-        ("Tacles", "Tkl", "Tackles_per90"),
-        ("Interceptions", "Int", "Interceptions_per90"),
-    ]
-
     for label, col_val, col_per90 in cols_metrics:
         if col_val in data:
             val = round(data[col_val], 2) if pd.notna(data[col_val]) else 0
-            # Calcul simple de percentile basé sur la position relative dans l'équipe
-            position_players = df[df['Pos'] == data['Pos']]
-            if len(position_players) > 1 and col_val in position_players.columns:
-                rank = position_players[col_val].rank(pct=True)[data.name] * 100
-                pct = int(rank) if pd.notna(rank) else 50
-            else:
-                pct = 50  # Valeur par défaut
+            # Percentile dans le même poste, lu dans le calcul mis en cache pour le fichier
+            rank = leaderboard.at[data.name, f"{label} pct"]
+            pct = int(rank) if pd.notna(rank) else 50
             
             color = "🟥" if pct < 40 else "🟨" if pct < 70 else "🟩"
             st.write(f"**{label}** : {val} — {color} {pct}ᵉ percentile")
@@ -134,6 +242,7 @@ else:
     1. Chargez votre fichier CSV contenant les données des joueurs
     2. Sélectionnez un joueur dans la liste déroulante
     3. Explorez ses statistiques et analyses automatiques
+    4. Ou choisissez la vue **Classement** pour comparer tous les joueurs (filtres, tri, pagination)
     
     ### Colonnes attendues dans le CSV:
     - `Player`: Nom du joueur